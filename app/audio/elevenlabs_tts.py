@@ -29,33 +29,293 @@
 # print(f"Saved multi-speaker audio to {output_path}")
 
 
-from dotenv import load_dotenv
-from elevenlabs.client import ElevenLabs
+import asyncio
+import inspect
 import os
+import sys
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+from dotenv import load_dotenv
+from elevenlabs.client import AsyncElevenLabs, ElevenLabs
+
+from core.clients import shared
+from schemas.podcast import PodcastScript
 
 load_dotenv()
 
-elevenlabs = ElevenLabs(
-    api_key=os.getenv("ELEVENLABS_API_KEY"),
-)
-
-audio = elevenlabs.text_to_speech.convert(
-    text="The first move is what sets everything in motion.",
-    voice_id="JBFqnCBsd6RMkjVDRZzb",
-    model_id="eleven_multilingual_v2",
-    output_format="mp3_44100_128",
-)
-
-# Save audio to file
-output_path = "output.mp3"
-with open(output_path, "wb") as f:
-    if isinstance(audio, bytes):
-        f.write(audio)
-    else:
-        # If audio is a generator/iterator of bytes
+
+class ElevenLabsTTS:
+    """
+    Thin execution-only wrapper over the ElevenLabs speech APIs.
+    Voice IDs are ElevenLabs voice IDs; mapping from our voice names
+    must be resolved by the caller.
+    """
+
+    def __init__(self, api_key: Optional[str] = None):
+        api_key = api_key or os.getenv("ELEVENLABS_API_KEY")
+        if not api_key:
+            raise RuntimeError("ELEVENLABS_API_KEY is missing")
+
+        self.client = shared("elevenlabs", api_key, lambda: ElevenLabs(api_key=api_key))
+        self.async_client = shared("elevenlabs-async", api_key, lambda: AsyncElevenLabs(api_key=api_key))
+
+    # ------------------------------------------------------------------
+    # Single Voice
+    # ------------------------------------------------------------------
+
+    def convert(
+        self,
+        text: str,
+        voice_id: str,
+        model_id: str = "eleven_multilingual_v2",
+        output_format: str = "mp3_44100_128",
+    ) -> Iterator[bytes]:
+        """
+        Stream audio chunks for text spoken by one voice.
+        """
+        return self.client.text_to_speech.convert(
+            text=text,
+            voice_id=voice_id,
+            model_id=model_id,
+            output_format=output_format,
+        )
+
+    def aconvert(
+        self,
+        text: str,
+        voice_id: str,
+        model_id: str = "eleven_multilingual_v2",
+        output_format: str = "mp3_44100_128",
+    ) -> AsyncIterator[bytes]:
+        """
+        Async counterpart of convert.
+        """
+        return self.async_client.text_to_speech.convert(
+            text=text,
+            voice_id=voice_id,
+            model_id=model_id,
+            output_format=output_format,
+        )
+
+    # ------------------------------------------------------------------
+    # Multi-Voice Dialogue
+    # ------------------------------------------------------------------
+
+    def convert_dialogue(
+        self,
+        inputs: List[dict],
+        model_id: str = "eleven_v3",
+        output_format: str = "mp3_44100_128",
+    ) -> Iterator[bytes]:
+        """
+        Stream audio chunks for [{"text": ..., "voice_id": ...}] turns.
+        """
+        return self.client.text_to_dialogue.convert(
+            inputs=inputs,
+            model_id=model_id,
+            output_format=output_format,
+        )
+
+    def aconvert_dialogue(
+        self,
+        inputs: List[dict],
+        model_id: str = "eleven_v3",
+        output_format: str = "mp3_44100_128",
+    ) -> AsyncIterator[bytes]:
+        """
+        Async counterpart of convert_dialogue.
+        """
+        return self.async_client.text_to_dialogue.convert(
+            inputs=inputs,
+            model_id=model_id,
+            output_format=output_format,
+        )
+
+
+class ElevenLabsDialogueBackend:
+    """
+    Render a PodcastScript through the ElevenLabs text-to-dialogue API.
+
+    The script is split into request-sized chunks which are rendered
+    concurrently. Audio is forwarded to the sink as it streams in, in
+    script order; each in-flight chunk buffers at most max_buffered_chunks
+    pieces, so memory stays bounded no matter how long the episode is.
+    """
+
+    def __init__(
+        self,
+        voice_ids: Optional[Dict[str, str]] = None,
+        tts: Optional[ElevenLabsTTS] = None,
+        model_id: str = "eleven_v3",
+        output_format: str = "mp3_44100_128",
+        max_chars_per_request: int = 3000,
+        max_concurrency: int = 3,
+        max_buffered_chunks: int = 64,
+    ):
+        """
+        Args:
+            voice_ids: Our voice name -> ElevenLabs voice ID. Voices not in
+                the map are passed through as ElevenLabs voice IDs.
+            tts: ElevenLabsTTS instance (created if omitted)
+            model_id: Dialogue model
+            output_format: ElevenLabs output format (mp3_*, pcm_*, opus_*)
+            max_chars_per_request: Character budget per dialogue request
+            max_concurrency: Chunks rendered at the same time
+            max_buffered_chunks: Audio pieces buffered per in-flight chunk
+        """
+        self.tts = tts or ElevenLabsTTS()
+        self.voice_ids = {k.lower(): v for k, v in (voice_ids or {}).items()}
+        self.model_id = model_id
+        self.output_format = output_format
+        self.max_chars_per_request = max_chars_per_request
+        self.max_concurrency = max_concurrency
+        self.max_buffered_chunks = max_buffered_chunks
+
+    # ------------------------------------------------------------------
+    # Chunking
+    # ------------------------------------------------------------------
+
+    def _voice_id(self, voice: str) -> str:
+        return self.voice_ids.get(voice.lower(), voice)
+
+    def chunk_script(self, script: PodcastScript) -> List[List[dict]]:
+        """
+        Split the dialogue into dialogue-API inputs under the character
+        budget, breaking only between turns.
+        """
+        speaker_voices = {
+            speaker.name: self._voice_id(speaker.voice_id)
+            for speaker in script.speakers
+        }
+
+        chunks: List[List[dict]] = []
+        current: List[dict] = []
+        size = 0
+        for turn in script.dialogue:
+            if current and size + len(turn.text) > self.max_chars_per_request:
+                chunks.append(current)
+                current, size = [], 0
+            current.append({"text": turn.text, "voice_id": speaker_voices[turn.speaker]})
+            size += len(turn.text)
+
+        if current:
+            chunks.append(current)
+        return chunks
+
+    # ------------------------------------------------------------------
+    # Rendering
+    # ------------------------------------------------------------------
+
+    async def render_script(
+        self,
+        script: PodcastScript,
+        sink: Callable[[bytes], Any],
+    ) -> dict:
+        """
+        Stream the rendered episode into sink, in order.
+
+        Args:
+            script: Podcast script to render
+            sink: Called with each audio piece; may be a coroutine function
+
+        Returns:
+            Metadata dict (chunks, bytes, characters)
+        """
+        chunks = self.chunk_script(script)
+        queues = [asyncio.Queue(maxsize=self.max_buffered_chunks) for _ in chunks]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        done = object()
+
+        async def produce(index: int, inputs: List[dict]) -> None:
+            # The semaphore is FIFO, so chunks start in script order and the
+            # chunk the writer is draining always holds a slot.
+            async with semaphore:
+                try:
+                    stream = self.tts.aconvert_dialogue(
+                        inputs=inputs,
+                        model_id=self.model_id,
+                        output_format=self.output_format,
+                    )
+                    async for piece in stream:
+                        if piece:
+                            await queues[index].put(piece)
+                except Exception as e:
+                    await queues[index].put(e)
+                    return
+                await queues[index].put(done)
+
+        producers = [
+            asyncio.create_task(produce(i, inputs))
+            for i, inputs in enumerate(chunks)
+        ]
+
+        written = 0
+        try:
+            for queue in queues:
+                while True:
+                    piece = await queue.get()
+                    if piece is done:
+                        break
+                    if isinstance(piece, Exception):
+                        raise piece
+                    result = sink(piece)
+                    if inspect.isawaitable(result):
+                        await result
+                    written += len(piece)
+        finally:
+            for task in producers:
+                task.cancel()
+            await asyncio.gather(*producers, return_exceptions=True)
+
+        return {
+            "chunks": len(chunks),
+            "bytes": written,
+            "characters": sum(len(turn.text) for turn in script.dialogue),
+        }
+
+    async def render_to_file(self, script: PodcastScript, output_file: str) -> dict:
+        """
+        Stream the rendered episode straight to output_file.
+        """
+        with open(output_file, "wb") as f:
+            metadata = await self.render_script(script, f.write)
+        return {"output_file": output_file, **metadata}
+
+
+# ----------------------------------------------------------------------
+# Simple Manual Test (CLI)
+# ----------------------------------------------------------------------
+
+def main():
+    """
+    Minimal example. Pass a saved PodcastScript JSON path to render it
+    through the dialogue backend instead.
+    """
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as f:
+            script = PodcastScript.model_validate_json(f.read())
+
+        backend = ElevenLabsDialogueBackend()
+        result = asyncio.run(backend.render_to_file(script, "dialogue.mp3"))
+        print(f"Dialogue saved to {result['output_file']} ({result['chunks']} chunks)")
+        return
+
+    tts = ElevenLabsTTS()
+
+    audio = tts.convert(
+        text="The first move is what sets everything in motion.",
+        voice_id="JBFqnCBsd6RMkjVDRZzb",
+        model_id="eleven_multilingual_v2",
+        output_format="mp3_44100_128",
+    )
+
+    # Save audio to file
+    output_path = "output.mp3"
+    with open(output_path, "wb") as f:
         for chunk in audio:
             f.write(chunk)
 
-print(f"Audio saved to {output_path}")
+    print(f"Audio saved to {output_path}")
 
 
+if __name__ == "__main__":
+    main()
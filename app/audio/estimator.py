@@ -0,0 +1,327 @@
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from schemas.podcast import PodcastScript
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+DEFAULT_HISTORY_PATH = os.getenv("TTS_HISTORY_PATH", os.path.join(".cache", "tts_history.jsonl"))
+
+DEFAULT_MANIFEST_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "assets",
+    "voice_samples",
+    "manifest.json",
+)
+
+# USD per 1M tokens (text in, audio out)
+TTS_PRICING = {
+    "gemini-2.5-flash-preview-tts": {"input": 0.50, "output": 10.00},
+    "gemini-2.5-pro-preview-tts": {"input": 1.00, "output": 20.00},
+}
+
+# Gemini bills generated audio at a fixed 25 tokens per second
+AUDIO_TOKENS_PER_SECOND = 25
+
+# Priors used until we have measurements
+DEFAULT_SECONDS_PER_CHAR = 1 / 15
+DEFAULT_INPUT_TOKENS_PER_CHAR = 0.25
+
+# Voice samples are short and padded with silence, so they count for
+# less than the same number of characters of real episodes
+SAMPLE_WEIGHT = 0.25
+
+# "TTS the following conversation between A, B:\n" per request
+PROMPT_HEADER_CHARS = 45
+DEFAULT_TURNS_PER_SEGMENT = 8
+
+# ----------------------------------------------------------------------
+# Results
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class TTSEstimate:
+    tts_model: str
+    duration_seconds: float
+    input_tokens: int
+    output_tokens: int
+    cost_usd: float
+    voice_seconds: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+# ----------------------------------------------------------------------
+# Estimator
+# ----------------------------------------------------------------------
+
+
+class TTSEstimator:
+    """
+    Predict duration, tokens and cost of a script before synthesising it.
+
+    Speaking rate is tracked as seconds per character for each
+    (model, voice), falling back to the voice on any model, then the model
+    on any voice, then a global prior. Rates are calibrated from the
+    voice-sample manifest and from measured runs in the history log.
+
+    Estimating is a single pass over the turns with dict lookups, so it
+    is cheap enough to call on every rerun or scheduling decision.
+    """
+
+    def __init__(
+        self,
+        default_seconds_per_char: float = DEFAULT_SECONDS_PER_CHAR,
+        input_tokens_per_char: float = DEFAULT_INPUT_TOKENS_PER_CHAR,
+    ):
+        self.default_seconds_per_char = default_seconds_per_char
+        self.input_tokens_per_char = input_tokens_per_char
+
+        # key -> [seconds, characters]; keys are (model, voice),
+        # (None, voice) and (model, None)
+        self._totals: Dict[Tuple[Optional[str], Optional[str]], list] = {}
+        self._rates: Dict[Tuple[Optional[str], Optional[str]], float] = {}
+        self._input_totals = [0.0, 0.0]
+
+    # ------------------------------------------------------------------
+    # Calibration
+    # ------------------------------------------------------------------
+
+    def observe(
+        self,
+        tts_model: str,
+        voice_characters: Dict[str, int],
+        duration_seconds: float,
+        weight: float = 1.0,
+    ) -> None:
+        """
+        Add one measured rendering. Duration is attributed to voices in
+        proportion to the characters each one spoke.
+        """
+        total_chars = sum(voice_characters.values())
+        if total_chars <= 0 or duration_seconds <= 0:
+            return
+
+        rate = duration_seconds / total_chars
+        for voice, chars in voice_characters.items():
+            weighted_chars = chars * weight
+            voice = voice.lower()
+            for key in ((tts_model, voice), (None, voice), (tts_model, None)):
+                totals = self._totals.setdefault(key, [0.0, 0.0])
+                totals[0] += rate * weighted_chars
+                totals[1] += weighted_chars
+                self._rates[key] = totals[0] / totals[1]
+
+    def observe_input(self, prompt_characters: int, input_tokens: int) -> None:
+        if prompt_characters > 0 and input_tokens > 0:
+            self._input_totals[0] += input_tokens
+            self._input_totals[1] += prompt_characters
+            self.input_tokens_per_char = self._input_totals[0] / self._input_totals[1]
+
+    def calibrate_from_manifest(self, path: str = DEFAULT_MANIFEST_PATH) -> int:
+        """
+        Use the bundled voice samples (text + measured duration) as a
+        per-voice prior.
+
+        Returns:
+            Number of samples used
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f).get("voices", {})
+
+        for entry in entries.values():
+            self.observe(
+                entry["model"],
+                {entry["voice"]: len(entry["text"])},
+                entry["duration_seconds"],
+                weight=SAMPLE_WEIGHT,
+            )
+        return len(entries)
+
+    def calibrate_from_history(self, path: str = DEFAULT_HISTORY_PATH) -> int:
+        """
+        Replay measured runs recorded by record_run().
+
+        Returns:
+            Number of runs used
+        """
+        if not os.path.exists(path):
+            return 0
+
+        runs = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    run = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.observe(run["model"], run["voice_characters"], run["duration_seconds"])
+                # Token counts only cover what was synthesised, not cache hits
+                if not run.get("cached_segments"):
+                    self.observe_input(run["prompt_characters"], run["input_tokens"])
+                runs += 1
+        return runs
+
+    # ------------------------------------------------------------------
+    # Estimation
+    # ------------------------------------------------------------------
+
+    def seconds_per_char(self, tts_model: str, voice: Optional[str]) -> float:
+        rates = self._rates
+        if voice:
+            voice = voice.lower()
+            rate = rates.get((tts_model, voice)) or rates.get((None, voice))
+            if rate:
+                return rate
+        return rates.get((tts_model, None), self.default_seconds_per_char)
+
+    def turn_seconds(
+        self,
+        turns: Iterable[Tuple[str, str]],
+        speaker_voice_map: Dict[str, str],
+        tts_model: str,
+    ) -> List[float]:
+        """
+        Expected duration of each turn, in order.
+        """
+        rates = {
+            speaker: self.seconds_per_char(tts_model, voice)
+            for speaker, voice in speaker_voice_map.items()
+        }
+        fallback = self.seconds_per_char(tts_model, None)
+        return [len(text) * rates.get(speaker, fallback) for speaker, text in turns]
+
+    def estimate_turns(
+        self,
+        turns: Iterable[Tuple[str, str]],
+        speaker_voice_map: Dict[str, str],
+        tts_model: str,
+        turns_per_segment: int = DEFAULT_TURNS_PER_SEGMENT,
+    ) -> TTSEstimate:
+        rates = {
+            speaker: self.seconds_per_char(tts_model, voice)
+            for speaker, voice in speaker_voice_map.items()
+        }
+        fallback = self.seconds_per_char(tts_model, None)
+
+        voice_seconds: Dict[str, float] = {}
+        prompt_chars = 0
+        n_turns = 0
+        for speaker, text in turns:
+            chars = len(text)
+            voice = speaker_voice_map.get(speaker, speaker)
+            voice_seconds[voice] = voice_seconds.get(voice, 0.0) + chars * rates.get(speaker, fallback)
+            prompt_chars += chars + len(speaker) + 3
+            n_turns += 1
+
+        requests = max(math.ceil(n_turns / turns_per_segment), 1)
+        prompt_chars += requests * PROMPT_HEADER_CHARS
+
+        duration = sum(voice_seconds.values())
+        input_tokens = math.ceil(prompt_chars * self.input_tokens_per_char)
+        output_tokens = math.ceil(duration * AUDIO_TOKENS_PER_SECOND)
+
+        return TTSEstimate(
+            tts_model=tts_model,
+            duration_seconds=duration,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cost_usd=estimate_cost(tts_model, input_tokens, output_tokens),
+            voice_seconds=voice_seconds,
+        )
+
+    def estimate(
+        self,
+        script: PodcastScript,
+        tts_model: str,
+        speaker_voice_map: Optional[Dict[str, str]] = None,
+        turns_per_segment: int = DEFAULT_TURNS_PER_SEGMENT,
+    ) -> TTSEstimate:
+        """
+        Estimate a PodcastScript. Voices default to the ones assigned in
+        script.speakers.
+        """
+        if speaker_voice_map is None:
+            speaker_voice_map = {s.name: s.voice_id for s in script.speakers}
+        return self.estimate_turns(
+            ((turn.speaker, turn.text) for turn in script.dialogue),
+            speaker_voice_map,
+            tts_model,
+            turns_per_segment,
+        )
+
+
+def estimate_cost(tts_model: str, input_tokens: int, output_tokens: int) -> float:
+    pricing = TTS_PRICING.get(tts_model)
+    if pricing is None:
+        return 0.0
+    return (input_tokens * pricing["input"] + output_tokens * pricing["output"]) / 1_000_000
+
+# ----------------------------------------------------------------------
+# History
+# ----------------------------------------------------------------------
+
+_history_lock = threading.Lock()
+
+
+def record_run(
+    turns: Sequence[Tuple[str, str]],
+    speaker_voice_map: Dict[str, str],
+    tts_model: str,
+    result: dict,
+    path: str = DEFAULT_HISTORY_PATH,
+) -> None:
+    """
+    Append a measured run (the metadata returned by
+    MultiSpeakerTTS.generate_tts_segments) to the history log.
+    """
+    if not result.get("duration_seconds"):
+        return
+
+    voice_characters: Dict[str, int] = {}
+    prompt_characters = 0
+    for speaker, text in turns:
+        voice = speaker_voice_map.get(speaker, speaker)
+        voice_characters[voice] = voice_characters.get(voice, 0) + len(text)
+        prompt_characters += len(text) + len(speaker) + 3
+    prompt_characters += result.get("segments", 1) * PROMPT_HEADER_CHARS
+
+    run = {
+        "time": time.time(),
+        "model": tts_model,
+        "voice_characters": voice_characters,
+        "prompt_characters": prompt_characters,
+        "duration_seconds": result["duration_seconds"],
+        "input_tokens": result.get("input_tokens", 0),
+        "output_tokens": result.get("output_tokens", 0),
+        "segments": result.get("segments", 0),
+        "cached_segments": result.get("cached_segments", 0),
+    }
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _history_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+
+
+def load_estimator(
+    manifest_path: str = DEFAULT_MANIFEST_PATH,
+    history_path: str = DEFAULT_HISTORY_PATH,
+) -> TTSEstimator:
+    """
+    Estimator calibrated from the voice samples, then measured history.
+    """
+    estimator = TTSEstimator()
+    estimator.calibrate_from_manifest(manifest_path)
+    estimator.calibrate_from_history(history_path)
+    return estimator
@@ -0,0 +1,261 @@
+import os
+import shutil
+import subprocess
+import threading
+import wave
+from typing import Iterable, Iterator, Optional, Union
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+
+PCM_RATE = 24000
+PCM_CHANNELS = 1
+PCM_SAMPLE_WIDTH = 2
+
+EXPORT_FORMATS = {
+    "wav": {
+        "extension": ".wav",
+        "mime": "audio/wav",
+    },
+    "mp3": {
+        "codec": "libmp3lame",
+        "container": "mp3",
+        "bitrate": "64k",
+        "extension": ".mp3",
+        "mime": "audio/mpeg",
+    },
+    "opus": {
+        "codec": "libopus",
+        "container": "ogg",
+        "bitrate": "32k",
+        "extension": ".ogg",
+        "mime": "audio/ogg",
+    },
+    "aac": {
+        # ADTS rather than MP4 so the output can be written to a pipe
+        "codec": "aac",
+        "container": "adts",
+        "bitrate": "64k",
+        "extension": ".aac",
+        "mime": "audio/aac",
+    },
+}
+
+PCMSource = Union[bytes, bytearray, memoryview, Iterable[bytes]]
+
+# ----------------------------------------------------------------------
+# Helpers
+# ----------------------------------------------------------------------
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which(FFMPEG_BIN) is not None
+
+
+def available_formats() -> list[str]:
+    """
+    Export formats usable on this machine, compressed formats first
+    (WAV only without ffmpeg).
+    """
+    if ffmpeg_available():
+        return [f for f in EXPORT_FORMATS if f != "wav"] + ["wav"]
+    return ["wav"]
+
+
+def _format_spec(output_format: str) -> dict:
+    try:
+        return EXPORT_FORMATS[output_format]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported audio format '{output_format}'. "
+            f"Choose one of: {', '.join(EXPORT_FORMATS)}"
+        )
+
+
+def _ffmpeg_command(
+    output_format: str,
+    output: str,
+    bitrate: Optional[str] = None,
+    rate: int = PCM_RATE,
+    channels: int = PCM_CHANNELS,
+) -> list[str]:
+    spec = _format_spec(output_format)
+    return [
+        FFMPEG_BIN,
+        "-hide_banner",
+        "-loglevel", "error",
+        "-f", "s16le",
+        "-ar", str(rate),
+        "-ac", str(channels),
+        "-i", "pipe:0",
+        "-c:a", spec["codec"],
+        "-b:a", bitrate or spec["bitrate"],
+        "-f", spec["container"],
+        "-y", output,
+    ]
+
+
+def _iter_chunks(pcm: PCMSource, chunk_size: int = 1 << 16) -> Iterator[bytes]:
+    if isinstance(pcm, (bytes, bytearray, memoryview)):
+        view = memoryview(pcm)
+        for start in range(0, len(view), chunk_size):
+            yield view[start:start + chunk_size]
+    else:
+        yield from pcm
+
+
+def iter_wav_pcm(path: str, chunk_frames: int = 1 << 15) -> Iterator[bytes]:
+    """
+    Stream the PCM frames of a WAV file without loading it whole.
+    """
+    with wave.open(path, "rb") as wf:
+        while True:
+            frames = wf.readframes(chunk_frames)
+            if not frames:
+                break
+            yield frames
+
+# ----------------------------------------------------------------------
+# Streaming Encoder
+# ----------------------------------------------------------------------
+
+
+class StreamingEncoder:
+    """
+    Pipe raw 16-bit PCM through ffmpeg into a compressed file.
+
+    PCM is written to ffmpeg's stdin as it becomes available, so no
+    intermediate WAV is ever produced and memory stays bounded by the
+    size of the chunks the caller writes.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        output_format: str = "mp3",
+        bitrate: Optional[str] = None,
+        rate: int = PCM_RATE,
+        channels: int = PCM_CHANNELS,
+    ):
+        if output_format == "wav":
+            raise ValueError("Use a wave writer for WAV output")
+        if not ffmpeg_available():
+            raise RuntimeError(f"{FFMPEG_BIN} not found; cannot encode {output_format}")
+
+        self.output_file = output_file
+        self._process = subprocess.Popen(
+            _ffmpeg_command(output_format, output_file, bitrate, rate, channels),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+
+    def write(self, pcm: bytes) -> None:
+        self._process.stdin.write(pcm)
+
+    # Lets the encoder stand in for a wave writer
+    writeframes = write
+
+    def close(self) -> None:
+        if self._process.stdin and not self._process.stdin.closed:
+            self._process.stdin.close()
+        stderr = self._process.stderr.read()
+        self._process.stderr.close()
+        if self._process.wait() != 0:
+            raise RuntimeError(
+                f"ffmpeg failed encoding {self.output_file}: "
+                f"{stderr.decode(errors='replace').strip()}"
+            )
+
+    def __enter__(self) -> "StreamingEncoder":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._process.kill()
+            self._process.wait()
+
+
+def open_audio_writer(
+    output_file: str,
+    output_format: str = "wav",
+    bitrate: Optional[str] = None,
+    rate: int = PCM_RATE,
+    channels: int = PCM_CHANNELS,
+):
+    """
+    Open a sink with writeframes()/close() for the requested format.
+    """
+    if output_format == "wav":
+        wf = wave.open(output_file, "wb")
+        wf.setnchannels(channels)
+        wf.setsampwidth(PCM_SAMPLE_WIDTH)
+        wf.setframerate(rate)
+        return wf
+    return StreamingEncoder(output_file, output_format, bitrate, rate, channels)
+
+
+def encode_pcm(
+    pcm: PCMSource,
+    output_file: str,
+    output_format: str = "mp3",
+    bitrate: Optional[str] = None,
+    rate: int = PCM_RATE,
+    channels: int = PCM_CHANNELS,
+) -> str:
+    """
+    Encode PCM bytes (or an iterable of PCM chunks) to output_file.
+
+    Returns:
+        The output file path
+    """
+    with open_audio_writer(output_file, output_format, bitrate, rate, channels) as writer:
+        for chunk in _iter_chunks(pcm):
+            writer.writeframes(chunk)
+    return output_file
+
+
+def encode_pcm_to_bytes(
+    pcm: PCMSource,
+    output_format: str = "mp3",
+    bitrate: Optional[str] = None,
+    rate: int = PCM_RATE,
+    channels: int = PCM_CHANNELS,
+) -> bytes:
+    """
+    Encode PCM in memory, e.g. for a download button.
+    """
+    process = subprocess.Popen(
+        _ffmpeg_command(output_format, "pipe:1", bitrate, rate, channels),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    # Feed stdin from a thread so stdout can be drained concurrently
+    def feed() -> None:
+        try:
+            for chunk in _iter_chunks(pcm):
+                process.stdin.write(chunk)
+        except BrokenPipeError:
+            pass
+        finally:
+            process.stdin.close()
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    encoded = process.stdout.read()
+    stderr = process.stderr.read()
+    feeder.join()
+
+    if process.wait() != 0:
+        raise RuntimeError(
+            f"ffmpeg failed encoding {output_format}: "
+            f"{stderr.decode(errors='replace').strip()}"
+        )
+    return encoded
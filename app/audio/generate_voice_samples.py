@@ -1,9 +1,19 @@
+import argparse
+import asyncio
+import hashlib
+import json
 import os
 import wave
+from typing import Dict, Optional
+
+import httpx
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
-from google.genai.errors import ClientError
+from google.genai.errors import APIError
+
+from core.clients import genai_client
+from core.rate_limit import AsyncRateLimiter
 
 # -------------------------------------------------
 # Load environment variables
@@ -12,9 +22,6 @@ from google.genai.errors import ClientError
 load_dotenv()
 API_KEY = os.getenv("GEMINI_API_KEY")
 
-if not API_KEY:
-    raise RuntimeError("❌ GEMINI_API_KEY not found in environment")
-
 # -------------------------------------------------
 # Config
 # -------------------------------------------------
@@ -31,8 +38,17 @@ VOICE_IDS = [
     "zephyr", "zubenelgenubi",
 ]
 
-OUTPUT_DIR = "assets/voice_samples"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+SAMPLE_TEXT = "Hello, this is a sample of the {name} voice for podcast narration."
+
+OUTPUT_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "assets",
+    "voice_samples",
+)
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "manifest.json")
+
+# Anything shorter than this per character is treated as truncated
+MIN_SECONDS_PER_CHAR = 0.02
 
 # -------------------------------------------------
 # Helpers
@@ -54,31 +70,113 @@ def save_wave_file(
 def display_name(voice_id: str) -> str:
     return voice_id.capitalize()
 
+def sample_text(voice_id: str, template: str = SAMPLE_TEXT) -> str:
+    return template.format(name=display_name(voice_id))
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def sample_path(voice_id: str) -> str:
+    return os.path.join(OUTPUT_DIR, f"{voice_id}.wav")
+
 # -------------------------------------------------
-# Main
+# Manifest
 # -------------------------------------------------
 
-def main():
-    client = genai.Client(api_key=API_KEY)
+def load_manifest(path: str = MANIFEST_PATH) -> Dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("voices", {})
 
-    for voice_id in VOICE_IDS:
-        output_path = os.path.join(OUTPUT_DIR, f"{voice_id}.wav")
+def save_manifest(entries: Dict[str, dict], path: str = MANIFEST_PATH) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"voices": dict(sorted(entries.items()))}, f, indent=2)
+    os.replace(tmp_path, path)
 
-        # ✅ SKIP IF ALREADY GENERATED
-        if os.path.exists(output_path):
-            print(f"⏭️  Skipping {voice_id} (already exists)")
-            continue
+def describe_sample(voice_id: str, model: str, text: str, path: str) -> dict:
+    with wave.open(path, "rb") as wf:
+        duration = wf.getnframes() / wf.getframerate()
+    return {
+        "voice": voice_id,
+        "model": model,
+        "text": text,
+        "text_sha256": sha256_text(text),
+        "duration_seconds": round(duration, 3),
+        "bytes": os.path.getsize(path),
+        "sha256": sha256_file(path),
+    }
 
+def stale_reason(
+    voice_id: str,
+    entry: Optional[dict],
+    model: str,
+    text: str,
+) -> Optional[str]:
+    """
+    Why the sample for voice_id must be regenerated, or None if current.
+    """
+    path = sample_path(voice_id)
+    if entry is None:
+        return "not in manifest"
+    if not os.path.exists(path):
+        return "file missing"
+    if entry.get("model") != model:
+        return f"model changed ({entry.get('model')} -> {model})"
+    if entry.get("text_sha256") != sha256_text(text):
+        return "sample text changed"
+    if os.path.getsize(path) != entry.get("bytes"):
+        return "size mismatch (truncated or replaced)"
+    if sha256_file(path) != entry.get("sha256"):
+        return "checksum mismatch"
+    if entry.get("duration_seconds", 0) < MIN_SECONDS_PER_CHAR * len(text):
+        return "audio too short"
+    return None
+
+def adopt_existing(model: str, template: str = SAMPLE_TEXT) -> Dict[str, dict]:
+    """
+    Record existing, readable samples in the manifest as-is, assuming they
+    were rendered with the current model and text.
+    """
+    entries = load_manifest()
+    for voice_id in VOICE_IDS:
+        path = sample_path(voice_id)
+        if voice_id in entries or not os.path.exists(path):
+            continue
         try:
-            print(f"🔊 Generating sample for voice: {voice_id}")
+            entries[voice_id] = describe_sample(voice_id, model, sample_text(voice_id, template), path)
+        except (wave.Error, EOFError):
+            continue
+    save_manifest(entries)
+    return entries
 
-            text = (
-                f"Hello, this is a sample of the {display_name(voice_id)} voice "
-                f"for podcast narration."
-            )
+# -------------------------------------------------
+# Rendering
+# -------------------------------------------------
 
-            response = client.models.generate_content(
-                model=TTS_MODEL,
+async def render_sample(
+    client: genai.Client,
+    voice_id: str,
+    model: str,
+    text: str,
+    limiter: AsyncRateLimiter,
+    retries: int = 3,
+) -> dict:
+    path = sample_path(voice_id)
+
+    for attempt in range(retries + 1):
+        await limiter.acquire()
+        try:
+            response = await client.aio.models.generate_content(
+                model=model,
                 contents=text,
                 config=types.GenerateContentConfig(
                     response_modalities=["AUDIO"],
@@ -91,19 +189,115 @@ def main():
                     ),
                 ),
             )
+            break
+        except APIError as e:
+            if e.code not in (429, 500, 503) or attempt == retries:
+                raise
+            await asyncio.sleep(2 ** attempt)
 
-            pcm = response.candidates[0].content.parts[0].inline_data.data
-            save_wave_file(output_path, pcm)
+    pcm = response.candidates[0].content.parts[0].inline_data.data
 
-            usage = response.usage_metadata
-            print(
-                f"   ✅ Saved {voice_id}.wav | "
-                f"in={usage.prompt_token_count}, "
-                f"out={usage.candidates_token_count}"
-            )
+    # Write next to the target and swap in, so readers never see half a file
+    tmp_path = f"{path}.tmp"
+    await asyncio.to_thread(save_wave_file, tmp_path, pcm)
+    os.replace(tmp_path, path)
+
+    usage = response.usage_metadata
+    print(
+        f"   ✅ Saved {voice_id}.wav | "
+        f"in={usage.prompt_token_count}, "
+        f"out={usage.candidates_token_count}"
+    )
+    return describe_sample(voice_id, model, text, path)
+
+async def generate_samples(
+    voice_ids: list[str] = VOICE_IDS,
+    model: str = TTS_MODEL,
+    template: str = SAMPLE_TEXT,
+    concurrency: int = 8,
+    requests_per_minute: float = 30,
+    force: bool = False,
+) -> Dict[str, dict]:
+    """
+    Render every stale sample concurrently and update the manifest.
+
+    Returns:
+        The updated manifest entries
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    entries = load_manifest()
+
+    pending = []
+    for voice_id in voice_ids:
+        text = sample_text(voice_id, template)
+        reason = "forced" if force else stale_reason(voice_id, entries.get(voice_id), model, text)
+        if reason is None:
+            print(f"⏭️  Skipping {voice_id} (up to date)")
+            continue
+        print(f"🔊 Queued {voice_id}: {reason}")
+        pending.append((voice_id, text))
+
+    if not pending:
+        return entries
+
+    client = genai_client(API_KEY)
+    limiter = AsyncRateLimiter(requests_per_minute)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(voice_id: str, text: str) -> None:
+        async with semaphore:
+            try:
+                entries[voice_id] = await render_sample(client, voice_id, model, text, limiter)
+            except APIError as e:
+                print(f"   ⚠️ Skipping {voice_id}: {e.code} {e.message}")
+                return
+            except (httpx.TransportError, ConnectionError, TimeoutError, asyncio.TimeoutError) as e:
+                # One voice's network failure shouldn't abort the rest of the batch
+                print(f"   ⚠️ Skipping {voice_id}: {type(e).__name__}: {e}")
+                return
+        # Persist progress as we go so an interrupted run resumes
+        save_manifest(entries)
+
+    await asyncio.gather(*(run(voice_id, text) for voice_id, text in pending))
+    return entries
+
+# -------------------------------------------------
+# Main
+# -------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate voice preview samples")
+    parser.add_argument("--model", default=TTS_MODEL)
+    parser.add_argument("--text", default=SAMPLE_TEXT, help="Template with a {name} placeholder")
+    parser.add_argument("--voices", nargs="*", default=VOICE_IDS)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rpm", type=float, default=30, help="Max TTS requests per minute")
+    parser.add_argument("--force", action="store_true", help="Regenerate every sample")
+    parser.add_argument(
+        "--adopt-existing",
+        action="store_true",
+        help="Record existing samples in the manifest without regenerating them",
+    )
+    args = parser.parse_args()
+
+    if args.adopt_existing:
+        entries = adopt_existing(args.model, args.text)
+        print(f"📒 Manifest now tracks {len(entries)} samples")
+        return
+
+    if not API_KEY:
+        raise RuntimeError("❌ GEMINI_API_KEY not found in environment")
 
-        except ClientError as e:
-            print(f"   ⚠️ Skipping {voice_id}: {e.message}")
+    asyncio.run(
+        generate_samples(
+            voice_ids=args.voices,
+            model=args.model,
+            template=args.text,
+            concurrency=args.concurrency,
+            requests_per_minute=args.rpm,
+            force=args.force,
+        )
+    )
 
     print("\n🎉 Voice sample generation completed.")
 
@@ -143,14 +143,24 @@
 #     tts.generate_tts(dialogue_text, speaker_voice_mapping, output_file="out.wav")
 
 
-import os
+import asyncio
+import hashlib
 import wave
-from typing import Dict
+from typing import Dict, Generator, List, Optional, Sequence, Tuple
 from dotenv import load_dotenv
 
-from google import genai
 from google.genai import types
 
+from audio.estimator import TTSEstimator
+from audio.export import encode_pcm, open_audio_writer
+from audio.postprocess import AudioPostProcessor
+from audio.spill import SPILL_THRESHOLD_BYTES, SegmentBuffer, projected_pcm_bytes, should_spill
+from audio.truncation import check_truncation
+from audio.tts_cache import TTSSegmentCache
+from core.clients import genai_client
+from core.memory import memory_stage
+from core.tracing import span, trace_context, traced
+
 load_dotenv()
 
 
@@ -160,18 +170,16 @@ class MultiSpeakerTTS:
     All decisions (model, voices) must be resolved by the caller.
     """
 
-    def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise RuntimeError("GEMINI_API_KEY is missing")
-
-        self.client = genai.Client(api_key=api_key)
+    def __init__(self, api_key: Optional[str] = None):
+        # Shared per API key, so building a TTS object is cheap
+        self.client = genai_client(api_key)
 
     # ------------------------------------------------------------------
     # Audio Utils
     # ------------------------------------------------------------------
 
     @staticmethod
+    @traced("audio.write_wav")
     def save_wave_file(
         filename: str,
         pcm: bytes,
@@ -188,63 +196,580 @@ class MultiSpeakerTTS:
             wf.setframerate(rate)
             wf.writeframes(pcm)
 
+    @classmethod
+    def _write_audio(
+        cls,
+        filename: str,
+        pcm: bytes,
+        output_format: str = "wav",
+        bitrate: Optional[str] = None,
+    ) -> None:
+        """
+        Write PCM as WAV, or stream it through the encoder.
+        """
+        if output_format == "wav":
+            cls.save_wave_file(filename, pcm)
+        else:
+            encode_pcm(pcm, filename, output_format, bitrate)
+
+    @staticmethod
+    def build_dialogue_prompt(
+        turns: Sequence[Tuple[str, str]],
+        speakers: Sequence[str],
+    ) -> str:
+        """
+        Build the multi-speaker TTS prompt for (speaker, text) turns.
+        """
+        dialogue_lines = "\n".join(
+            f"{speaker}: {text}" for speaker, text in turns
+        )
+        return (
+            f"TTS the following conversation between "
+            f"{', '.join(speakers)}:\n{dialogue_lines}"
+        )
+
+    @staticmethod
+    def parse_dialogue_prompt(
+        dialogue: str,
+        speakers: Sequence[str],
+    ) -> List[Tuple[str, str]]:
+        """
+        Recover (speaker, text) turns from a multi-speaker TTS prompt.
+        Lines that don't start with a known speaker continue the previous
+        turn.
+        """
+        turns: List[Tuple[str, str]] = []
+        for line in dialogue.splitlines():
+            line = line.strip()
+            if not line or line.startswith("TTS the following conversation"):
+                continue
+            speaker, sep, text = line.partition(":")
+            if sep and speaker.strip() in speakers:
+                turns.append((speaker.strip(), text.strip()))
+            elif turns:
+                turns[-1] = (turns[-1][0], f"{turns[-1][1]} {line}")
+        return turns
+
+    @staticmethod
+    def segment_turns(
+        turns: Sequence[Tuple[str, str]],
+        turns_per_segment: int = 8,
+    ) -> List[List[Tuple[str, str]]]:
+        """
+        Split turns into segments using content-defined boundaries.
+
+        A segment ends after a turn whose text hash hits the boundary
+        condition (or when it reaches twice the target size), so editing,
+        inserting or removing a turn only moves the boundaries around it
+        and the remaining segments keep their cache keys.
+        """
+        segments: List[List[Tuple[str, str]]] = []
+        current: List[Tuple[str, str]] = []
+
+        for speaker, text in turns:
+            current.append((speaker, text))
+            digest = hashlib.sha1(f"{speaker}: {text}".encode("utf-8")).digest()
+            at_boundary = int.from_bytes(digest[:4], "big") % turns_per_segment == 0
+            if at_boundary or len(current) >= 2 * turns_per_segment:
+                segments.append(current)
+                current = []
+
+        if current:
+            segments.append(current)
+        return segments
+
     # ------------------------------------------------------------------
     # Main TTS API
     # ------------------------------------------------------------------
 
+    @staticmethod
+    def _generation_config(
+        speaker_voice_map: Dict[str, str],
+    ) -> types.GenerateContentConfig:
+        speaker_voice_configs = [
+            types.SpeakerVoiceConfig(
+                speaker=speaker,
+                voice_config=types.VoiceConfig(
+                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                        voice_name=voice
+                    )
+                ),
+            )
+            for speaker, voice in speaker_voice_map.items()
+        ]
+        return types.GenerateContentConfig(
+            response_modalities=["AUDIO"],
+            speech_config=types.SpeechConfig(
+                multi_speaker_voice_config=types.MultiSpeakerVoiceConfig(
+                    speaker_voice_configs=speaker_voice_configs
+                )
+            ),
+        )
+
+    @staticmethod
+    def _parse_response(response) -> Tuple[bytes, dict]:
+        pcm_audio = response.candidates[0].content.parts[0].inline_data.data
+        usage = {
+            "input_tokens": response.usage_metadata.prompt_token_count,
+            "output_tokens": response.usage_metadata.candidates_token_count,
+            "total_tokens": response.usage_metadata.total_token_count,
+        }
+        return pcm_audio, usage
+
+    def synthesize_pcm(
+        self,
+        dialogue: str,
+        speaker_voice_map: Dict[str, str],
+        tts_model: str,
+    ) -> Tuple[bytes, dict]:
+        """
+        Run one multi-speaker TTS call and return (pcm, token usage).
+        """
+        with span("tts.synthesize", model=tts_model, chars=len(dialogue)):
+            response = self.client.models.generate_content(
+                model=tts_model,
+                contents=dialogue,
+                config=self._generation_config(speaker_voice_map),
+            )
+        return self._parse_response(response)
+
+    async def asynthesize_pcm(
+        self,
+        dialogue: str,
+        speaker_voice_map: Dict[str, str],
+        tts_model: str,
+    ) -> Tuple[bytes, dict]:
+        """
+        Async variant of synthesize_pcm using the SDK's async client.
+        """
+        with span("tts.synthesize", model=tts_model, chars=len(dialogue)):
+            response = await self.client.aio.models.generate_content(
+                model=tts_model,
+                contents=dialogue,
+                config=self._generation_config(speaker_voice_map),
+            )
+        return self._parse_response(response)
+
+    # ------------------------------------------------------------------
+    # Truncation Repair
+    # ------------------------------------------------------------------
+
+    def _repair_steps(
+        self,
+        pcm_audio: bytes,
+        usage: dict,
+        turns: Sequence[Tuple[str, str]],
+        speaker_voice_map: Dict[str, str],
+        tts_model: str,
+        estimator: TTSEstimator,
+        max_repairs: int,
+    ) -> Generator[List[Tuple[str, str]], Tuple[bytes, dict], Tuple[bytes, dict]]:
+        """
+        Shared truncation check and splice for repair_truncated and
+        arepair_truncated. Yields each tail of turns to re-render, expects
+        its (pcm, usage) to be sent back, and returns the repaired result.
+        """
+        usage = {**usage, "repaired_turns": 0}
+        head = b""
+        remaining = list(turns)
+
+        for _ in range(max_repairs):
+            check = check_truncation(
+                pcm_audio,
+                estimator.turn_seconds(remaining, speaker_voice_map, tts_model),
+            )
+            if not check.truncated:
+                break
+
+            print(
+                f"⚠️ TTS render truncated ({check.actual_seconds:.1f}s of "
+                f"~{check.expected_seconds:.1f}s); re-rendering "
+                f"{len(remaining) - check.first_missing_turn} trailing turns"
+            )
+            head += pcm_audio[:check.cut_bytes]
+            remaining = remaining[check.first_missing_turn:]
+            usage["repaired_turns"] += len(remaining)
+
+            pcm_audio, tail_usage = yield remaining
+            for name, value in tail_usage.items():
+                usage[name] = (usage.get(name) or 0) + (value or 0)
+
+        return head + pcm_audio, usage
+
+    def repair_truncated(
+        self,
+        pcm_audio: bytes,
+        usage: dict,
+        turns: Sequence[Tuple[str, str]],
+        speaker_voice_map: Dict[str, str],
+        tts_model: str,
+        estimator: TTSEstimator,
+        max_repairs: int = 2,
+    ) -> Tuple[bytes, dict]:
+        """
+        Check a render of turns against the expected duration and, if it
+        stopped early, re-synthesise only the missing tail and splice it
+        on at a pause.
+
+        Returns:
+            (pcm, usage) with the tail's tokens added and the number of
+            re-rendered turns under "repaired_turns"
+        """
+        steps = self._repair_steps(
+            pcm_audio, usage, turns, speaker_voice_map, tts_model, estimator, max_repairs
+        )
+        try:
+            tail = next(steps)
+            while True:
+                with span("tts.repair", turns=len(tail)):
+                    rendered = self.synthesize_pcm(
+                        self.build_dialogue_prompt(tail, list(speaker_voice_map)),
+                        speaker_voice_map,
+                        tts_model,
+                    )
+                tail = steps.send(rendered)
+        except StopIteration as done:
+            return done.value
+
+    async def arepair_truncated(
+        self,
+        pcm_audio: bytes,
+        usage: dict,
+        turns: Sequence[Tuple[str, str]],
+        speaker_voice_map: Dict[str, str],
+        tts_model: str,
+        estimator: TTSEstimator,
+        max_repairs: int = 2,
+    ) -> Tuple[bytes, dict]:
+        """
+        Async counterpart of repair_truncated.
+        """
+        steps = self._repair_steps(
+            pcm_audio, usage, turns, speaker_voice_map, tts_model, estimator, max_repairs
+        )
+        try:
+            tail = next(steps)
+            while True:
+                with span("tts.repair", turns=len(tail)):
+                    rendered = await self.asynthesize_pcm(
+                        self.build_dialogue_prompt(tail, list(speaker_voice_map)),
+                        speaker_voice_map,
+                        tts_model,
+                    )
+                tail = steps.send(rendered)
+        except StopIteration as done:
+            return done.value
+
+    @traced("tts.generate_tts")
     def generate_tts(
         self,
         dialogue: str,
         speaker_voice_map: Dict[str, str],
         tts_model: str = "gemini-2.5-pro-preview-tts",
         output_file: str = "out.wav",
+        output_format: str = "wav",
+        bitrate: Optional[str] = None,
+        estimator: Optional[TTSEstimator] = None,
+        spill_threshold: Optional[int] = SPILL_THRESHOLD_BYTES,
     ) -> dict:
         """
         Generate multi-speaker TTS audio.
 
+        A single call holds the whole episode's PCM in memory, so dialogue
+        projected above spill_threshold is rendered segment by segment
+        and streamed to the output instead (see generate_tts_segments).
+
         Args:
             dialogue: Full dialogue text
             speaker_voice_map: {"Speaker": "VoiceName"}
             tts_model: Gemini TTS model name
-            output_file: Output WAV path
+            output_file: Output audio path
+            output_format: "wav", or a compressed format ("mp3", "opus", "aac")
+            bitrate: Encoder bitrate, e.g. "64k" (format default if None)
+            estimator: If set, truncated renders are detected and only the
+                missing trailing turns are re-synthesised
+            spill_threshold: Projected PCM bytes above which rendering
+                streams segment by segment (None never switches)
 
         Returns:
             Metadata dict (tokens, output file)
         """
         print(speaker_voice_map)
-        speaker_voice_configs = [
-            types.SpeakerVoiceConfig(
-                speaker=speaker,
-                voice_config=types.VoiceConfig(
-                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                        voice_name=voice
-                    )
-                ),
+        turns = self.parse_dialogue_prompt(dialogue, list(speaker_voice_map))
+        projected = projected_pcm_bytes(turns, speaker_voice_map, tts_model, estimator)
+        if should_spill(projected, spill_threshold):
+            return self.generate_tts_segments(
+                turns,
+                speaker_voice_map,
+                tts_model,
+                output_file,
+                output_format=output_format,
+                bitrate=bitrate,
+                estimator=estimator,
             )
-            for speaker, voice in speaker_voice_map.items()
-        ]
-        print(speaker_voice_configs)
-        response = self.client.models.generate_content(
-            model=tts_model,
-            contents=dialogue,
-            config=types.GenerateContentConfig(
-                response_modalities=["AUDIO"],
-                speech_config=types.SpeechConfig(
-                    multi_speaker_voice_config=types.MultiSpeakerVoiceConfig(
-                        speaker_voice_configs=speaker_voice_configs
-                    )
-                ),
-            ),
+
+        with memory_stage("tts.synthesize"):
+            pcm_audio, usage = self.synthesize_pcm(
+                dialogue, speaker_voice_map, tts_model
+            )
+        if estimator is not None:
+            pcm_audio, usage = self.repair_truncated(
+                pcm_audio, usage, turns, speaker_voice_map, tts_model, estimator
+            )
+        with memory_stage("audio.write"):
+            self._write_audio(output_file, pcm_audio, output_format, bitrate)
+
+        return {"output_file": output_file, **usage}
+
+    @traced("tts.generate_tts")
+    async def agenerate_tts(
+        self,
+        dialogue: str,
+        speaker_voice_map: Dict[str, str],
+        tts_model: str = "gemini-2.5-pro-preview-tts",
+        output_file: str = "out.wav",
+        output_format: str = "wav",
+        bitrate: Optional[str] = None,
+        estimator: Optional[TTSEstimator] = None,
+        spill_threshold: Optional[int] = SPILL_THRESHOLD_BYTES,
+    ) -> dict:
+        """
+        Async counterpart of generate_tts; does not block the event loop.
+        Dialogue projected above spill_threshold is rendered segment by
+        segment (see agenerate_tts_segments).
+
+        Returns:
+            Metadata dict (tokens, output file)
+        """
+        turns = self.parse_dialogue_prompt(dialogue, list(speaker_voice_map))
+        projected = projected_pcm_bytes(turns, speaker_voice_map, tts_model, estimator)
+        if should_spill(projected, spill_threshold):
+            return await self.agenerate_tts_segments(
+                turns,
+                speaker_voice_map,
+                tts_model,
+                output_file,
+                output_format=output_format,
+                bitrate=bitrate,
+                estimator=estimator,
+                spill_threshold=spill_threshold,
+            )
+
+        pcm_audio, usage = await self.asynthesize_pcm(
+            dialogue, speaker_voice_map, tts_model
+        )
+        if estimator is not None:
+            pcm_audio, usage = await self.arepair_truncated(
+                pcm_audio, usage, turns, speaker_voice_map, tts_model, estimator
+            )
+        await asyncio.to_thread(
+            self._write_audio, output_file, pcm_audio, output_format, bitrate
         )
 
-        pcm_audio = response.candidates[0].content.parts[0].inline_data.data
-        self.save_wave_file(output_file, pcm_audio)
+        return {"output_file": output_file, **usage}
+
+    @traced("tts.generate_tts_segments")
+    def generate_tts_segments(
+        self,
+        turns: Sequence[Tuple[str, str]],
+        speaker_voice_map: Dict[str, str],
+        tts_model: str = "gemini-2.5-pro-preview-tts",
+        output_file: str = "out.wav",
+        cache: Optional[TTSSegmentCache] = None,
+        turns_per_segment: int = 8,
+        output_format: str = "wav",
+        bitrate: Optional[str] = None,
+        postprocessor: Optional[AudioPostProcessor] = None,
+        estimator: Optional[TTSEstimator] = None,
+    ) -> dict:
+        """
+        Generate multi-speaker TTS audio segment by segment.
+
+        Each segment is looked up in the cache first; only segments whose
+        model, voices or text changed are synthesised. Segments are written
+        (or streamed through the encoder) as they are produced.
+
+        Args:
+            turns: Ordered (speaker, text) dialogue turns
+            speaker_voice_map: {"Speaker": "VoiceName"}
+            tts_model: Gemini TTS model name
+            output_file: Output audio path
+            cache: Segment cache (optional)
+            turns_per_segment: Target number of turns per TTS call
+            output_format: "wav", or a compressed format ("mp3", "opus", "aac")
+            bitrate: Encoder bitrate, e.g. "64k" (format default if None)
+            postprocessor: Loudness/silence/crossfade stage (optional)
+            estimator: If set, truncated segments are repaired before they
+                are cached or written
+
+        Returns:
+            Metadata dict (tokens, output file, segment counts, duration)
+        """
+        speakers = list(speaker_voice_map.keys())
+        header = self.build_dialogue_prompt([], speakers)
+        segments = self.segment_turns(turns, turns_per_segment)
+
+        totals = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        cached_segments = 0
+        rendered_bytes = 0
+
+        def rendered():
+            nonlocal cached_segments, rendered_bytes
+
+            for index, segment in enumerate(segments):
+                key = None
+                pcm_audio = None
+
+                if cache is not None:
+                    segment_text = "\n".join(
+                        f"{speaker}: {text}" for speaker, text in segment
+                    )
+                    key = cache.make_key(
+                        tts_model, speaker_voice_map, segment_text, context=header
+                    )
+                    pcm_audio = cache.get(key)
+
+                if pcm_audio is not None:
+                    cached_segments += 1
+                else:
+                    with trace_context(segment=index):
+                        pcm_audio, usage = self.synthesize_pcm(
+                            self.build_dialogue_prompt(segment, speakers),
+                            speaker_voice_map,
+                            tts_model,
+                        )
+                        if estimator is not None:
+                            pcm_audio, usage = self.repair_truncated(
+                                pcm_audio, usage, segment, speaker_voice_map, tts_model, estimator
+                            )
+                    for name, value in usage.items():
+                        totals[name] = totals.get(name, 0) + (value or 0)
+                    if cache is not None:
+                        cache.put(key, pcm_audio)
+
+                rendered_bytes += len(pcm_audio)
+                yield pcm_audio
+
+        stream = rendered()
+        if postprocessor is not None:
+            stream = postprocessor.process(stream)
+
+        with span("audio.encode", format=output_format), \
+                open_audio_writer(output_file, output_format, bitrate) as wf:
+            for pcm_audio in stream:
+                wf.writeframes(pcm_audio)
 
         return {
             "output_file": output_file,
-            "input_tokens": response.usage_metadata.prompt_token_count,
-            "output_tokens": response.usage_metadata.candidates_token_count,
-            "total_tokens": response.usage_metadata.total_token_count,
+            **totals,
+            "segments": len(segments),
+            "cached_segments": cached_segments,
+            # Synthesised speech before post-processing
+            "duration_seconds": rendered_bytes / (2 * 24000),
+        }
+
+    @traced("tts.generate_tts_segments")
+    async def agenerate_tts_segments(
+        self,
+        turns: Sequence[Tuple[str, str]],
+        speaker_voice_map: Dict[str, str],
+        tts_model: str = "gemini-2.5-pro-preview-tts",
+        output_file: str = "out.wav",
+        cache: Optional[TTSSegmentCache] = None,
+        turns_per_segment: int = 8,
+        max_concurrency: int = 4,
+        output_format: str = "wav",
+        bitrate: Optional[str] = None,
+        postprocessor: Optional[AudioPostProcessor] = None,
+        estimator: Optional[TTSEstimator] = None,
+        spill_threshold: Optional[int] = SPILL_THRESHOLD_BYTES,
+    ) -> dict:
+        """
+        Async counterpart of generate_tts_segments.
+
+        Segments are synthesised concurrently (bounded by max_concurrency)
+        and written to the output file in script order. Rendered segments
+        are held until the write, on disk if the episode is projected
+        above spill_threshold.
+
+        Returns:
+            Metadata dict (tokens, output file, segment counts, duration)
+        """
+        speakers = list(speaker_voice_map.keys())
+        header = self.build_dialogue_prompt([], speakers)
+        segments = self.segment_turns(turns, turns_per_segment)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        projected = projected_pcm_bytes(turns, speaker_voice_map, tts_model, estimator)
+        buffer = SegmentBuffer(len(segments), should_spill(projected, spill_threshold))
+
+        async def render(index: int, segment) -> Optional[dict]:
+            key = None
+            if cache is not None:
+                segment_text = "\n".join(
+                    f"{speaker}: {text}" for speaker, text in segment
+                )
+                key = cache.make_key(
+                    tts_model, speaker_voice_map, segment_text, context=header
+                )
+                pcm_audio = await asyncio.to_thread(cache.get, key)
+                if pcm_audio is not None:
+                    buffer.put(index, pcm_audio)
+                    return None
+
+            with span("tts.semaphore_wait", segment=index):
+                await semaphore.acquire()
+            try:
+                with trace_context(segment=index):
+                    pcm_audio, usage = await self.asynthesize_pcm(
+                        self.build_dialogue_prompt(segment, speakers),
+                        speaker_voice_map,
+                        tts_model,
+                    )
+                    if estimator is not None:
+                        pcm_audio, usage = await self.arepair_truncated(
+                            pcm_audio, usage, segment, speaker_voice_map, tts_model, estimator
+                        )
+            finally:
+                semaphore.release()
+            if cache is not None:
+                await asyncio.to_thread(cache.put, key, pcm_audio)
+            buffer.put(index, pcm_audio)
+            return usage
+
+        def write() -> None:
+            stream = iter(buffer)
+            if postprocessor is not None:
+                stream = postprocessor.process(stream)
+            with span("audio.encode", format=output_format), \
+                    open_audio_writer(output_file, output_format, bitrate) as wf:
+                for pcm_audio in stream:
+                    wf.writeframes(pcm_audio)
+
+        try:
+            results = await asyncio.gather(
+                *(render(index, segment) for index, segment in enumerate(segments))
+            )
+            await asyncio.to_thread(write)
+        finally:
+            buffer.close()
+
+        totals = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        cached_segments = 0
+        for usage in results:
+            if usage is None:
+                cached_segments += 1
+                continue
+            for name, value in usage.items():
+                totals[name] = totals.get(name, 0) + (value or 0)
+        rendered_bytes = buffer.nbytes
+
+        return {
+            "output_file": output_file,
+            **totals,
+            "segments": len(segments),
+            "cached_segments": cached_segments,
+            # Synthesised speech before post-processing
+            "duration_seconds": rendered_bytes / (2 * 24000),
         }
 
 
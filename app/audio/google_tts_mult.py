@@ -1,18 +1,26 @@
-from google import genai
+import asyncio
 from google.genai import types
 import wave
 import os
+import shutil
+import tempfile
+from typing import Optional, Tuple
 from dotenv import load_dotenv
 
+from audio.postprocess import AudioPostProcessor
+from audio.tts_cache import TTSSegmentCache
+from core.clients import genai_client
+from core.tracing import span, trace_context, traced
+
 load_dotenv()
 
 class SingleSpeakerTTS:
-    def __init__(self):
-        self.client = genai.Client(
-            api_key=os.getenv("GEMINI_API_KEY")
-        )
+    def __init__(self, api_key: Optional[str] = None):
+        # Shared per API key, so building a TTS object is cheap
+        self.client = genai_client(api_key)
 
     @staticmethod
+    @traced("audio.write_wav")
     def save_wave_file(
         filename: str,
         pcm: bytes,
@@ -26,73 +34,213 @@ class SingleSpeakerTTS:
             wf.setframerate(rate)
             wf.writeframes(pcm)
 
-    def synthesize(
-        self,
-        text: str,
-        voice_name: str,
-        output_file: str
-    ):
-        response = self.client.models.generate_content(
-            model="gemini-2.5-pro-preview-tts",
-            contents=text,
-            config=types.GenerateContentConfig(
-                response_modalities=["AUDIO"],
-                speech_config=types.SpeechConfig(
-                    voice_config=types.VoiceConfig(
-                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                            voice_name=voice_name
-                        )
+    @staticmethod
+    def _generation_config(voice_name: str) -> types.GenerateContentConfig:
+        return types.GenerateContentConfig(
+            response_modalities=["AUDIO"],
+            speech_config=types.SpeechConfig(
+                voice_config=types.VoiceConfig(
+                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                        voice_name=voice_name
                     )
                 )
             )
         )
 
+    @staticmethod
+    def _parse_response(response) -> Tuple[bytes, dict]:
         pcm = response.candidates[0].content.parts[0].inline_data.data
+        usage = {
+            "input_tokens": response.usage_metadata.prompt_token_count,
+            "output_tokens": response.usage_metadata.candidates_token_count,
+            "total_tokens": response.usage_metadata.total_token_count,
+        }
+        return pcm, usage
+
+    def synthesize_pcm(
+        self,
+        text: str,
+        voice_name: str,
+        tts_model: str = "gemini-2.5-pro-preview-tts"
+    ) -> Tuple[bytes, dict]:
+        with span("tts.synthesize", model=tts_model, voice=voice_name, chars=len(text)):
+            response = self.client.models.generate_content(
+                model=tts_model,
+                contents=text,
+                config=self._generation_config(voice_name)
+            )
+
+        return self._parse_response(response)
+
+    async def asynthesize_pcm(
+        self,
+        text: str,
+        voice_name: str,
+        tts_model: str = "gemini-2.5-pro-preview-tts"
+    ) -> Tuple[bytes, dict]:
+        with span("tts.synthesize", model=tts_model, voice=voice_name, chars=len(text)):
+            response = await self.client.aio.models.generate_content(
+                model=tts_model,
+                contents=text,
+                config=self._generation_config(voice_name)
+            )
+
+        return self._parse_response(response)
+
+    def synthesize(
+        self,
+        text: str,
+        voice_name: str,
+        output_file: str,
+        tts_model: str = "gemini-2.5-pro-preview-tts"
+    ):
+        pcm, _ = self.synthesize_pcm(text, voice_name, tts_model)
         self.save_wave_file(output_file, pcm)
 
+    async def asynthesize(
+        self,
+        text: str,
+        voice_name: str,
+        output_file: str,
+        tts_model: str = "gemini-2.5-pro-preview-tts"
+    ):
+        pcm, _ = await self.asynthesize_pcm(text, voice_name, tts_model)
+        await asyncio.to_thread(self.save_wave_file, output_file, pcm)
+
 import json
 import wave
 import os
 
 class PodcastTTSBuilder:
-    def __init__(self, speaker_voice_map: dict):
-        self.tts = SingleSpeakerTTS()
+    def __init__(
+        self,
+        speaker_voice_map: dict,
+        tts_model: str = "gemini-2.5-pro-preview-tts",
+        cache: Optional[TTSSegmentCache] = None,
+        postprocessor: Optional[AudioPostProcessor] = None,
+        tts: Optional[SingleSpeakerTTS] = None
+    ):
+        self.tts = tts or SingleSpeakerTTS()
         self.speaker_voice_map = speaker_voice_map
-        self.temp_files = []
+        self.tts_model = tts_model
+        self.cache = cache
+        self.postprocessor = postprocessor
 
-    def generate_from_script(self, script: dict, output_file="podcast.wav"):
-        for i, turn in enumerate(script["dialogue"]):
-            speaker = turn["speaker"]
-            text = turn["text"]
-
-            voice = self.speaker_voice_map[speaker]
-            temp_wav = f"temp_{i:03d}_{speaker}.wav"
-
-            prompt = f"""
+    @staticmethod
+    def _turn_prompt(speaker: str, text: str) -> str:
+        return f"""
 Convert the following text into natural podcast speech.
 
 Speaker: {speaker}
 Text: {text}
 """
-            self.tts.synthesize(prompt, voice, temp_wav)
-            self.temp_files.append(temp_wav)
 
-        self._merge_wavs(output_file)
-        self._cleanup()
+    @traced("builder.generate_from_script")
+    def generate_from_script(self, script: dict, output_file="podcast.wav"):
+        temp_dir = tempfile.mkdtemp(prefix="podcast-turns-")
+        try:
+            temp_files = []
+            for i, turn in enumerate(script["dialogue"]):
+                speaker = turn["speaker"]
+                text = turn["text"]
+
+                voice = self.speaker_voice_map[speaker]
+                temp_wav = os.path.join(temp_dir, f"{i:03d}.wav")
 
-    def _merge_wavs(self, output_file):
-        with wave.open(self.temp_files[0], "rb") as wf:
+                prompt = self._turn_prompt(speaker, text)
+                with trace_context(turn=i, speaker=speaker), span("builder.turn"):
+                    self.tts.save_wave_file(temp_wav, self._render_turn(prompt, voice))
+                temp_files.append(temp_wav)
+
+            self._merge_wavs(output_file, temp_files)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    @traced("builder.generate_from_script")
+    async def agenerate_from_script(
+        self,
+        script: dict,
+        output_file="podcast.wav",
+        max_concurrency: int = 4
+    ):
+        """
+        Async counterpart of generate_from_script; turns are synthesised
+        concurrently (bounded by max_concurrency) and merged in order.
+        Turn files go to a private temporary directory, so concurrent
+        calls never share them.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        temp_dir = tempfile.mkdtemp(prefix="podcast-turns-")
+
+        async def render(i: int, turn: dict) -> str:
+            speaker = turn["speaker"]
+            voice = self.speaker_voice_map[speaker]
+            temp_wav = os.path.join(temp_dir, f"{i:03d}.wav")
+
+            prompt = self._turn_prompt(speaker, turn["text"])
+            with trace_context(turn=i, speaker=speaker):
+                with span("builder.semaphore_wait"):
+                    await semaphore.acquire()
+                try:
+                    with span("builder.turn"):
+                        pcm = await self._arender_turn(prompt, voice)
+                finally:
+                    semaphore.release()
+                await asyncio.to_thread(self.tts.save_wave_file, temp_wav, pcm)
+            return temp_wav
+
+        try:
+            temp_files = list(await asyncio.gather(
+                *(render(i, turn) for i, turn in enumerate(script["dialogue"]))
+            ))
+            await asyncio.to_thread(self._merge_wavs, output_file, temp_files)
+        finally:
+            await asyncio.to_thread(shutil.rmtree, temp_dir, ignore_errors=True)
+
+    def _render_turn(self, prompt: str, voice: str) -> bytes:
+        # Reuse the cached PCM for turns whose prompt, voice and model
+        # are unchanged; only edited turns hit the API.
+        if self.cache is None:
+            return self.tts.synthesize_pcm(prompt, voice, self.tts_model)[0]
+
+        key = self.cache.make_key(self.tts_model, voice, prompt)
+        pcm = self.cache.get(key)
+        if pcm is None:
+            pcm, _ = self.tts.synthesize_pcm(prompt, voice, self.tts_model)
+            self.cache.put(key, pcm)
+        return pcm
+
+    async def _arender_turn(self, prompt: str, voice: str) -> bytes:
+        if self.cache is None:
+            return (await self.tts.asynthesize_pcm(prompt, voice, self.tts_model))[0]
+
+        key = self.cache.make_key(self.tts_model, voice, prompt)
+        pcm = await asyncio.to_thread(self.cache.get, key)
+        if pcm is None:
+            pcm, _ = await self.tts.asynthesize_pcm(prompt, voice, self.tts_model)
+            await asyncio.to_thread(self.cache.put, key, pcm)
+        return pcm
+
+    @staticmethod
+    def _read_turns(temp_files):
+        for wav_file in temp_files:
+            with wave.open(wav_file, "rb") as wf:
+                yield wf.readframes(wf.getnframes())
+
+    @traced("builder.merge_wavs")
+    def _merge_wavs(self, output_file, temp_files):
+        with wave.open(temp_files[0], "rb") as wf:
             params = wf.getparams()
 
         with wave.open(output_file, "wb") as out:
             out.setparams(params)
-            for wav_file in self.temp_files:
-                with wave.open(wav_file, "rb") as wf:
-                    out.writeframes(wf.readframes(wf.getnframes()))
-
-    def _cleanup(self):
-        for f in self.temp_files:
-            os.remove(f)
+            if self.postprocessor is not None:
+                # Level, trim and crossfade turns while merging
+                for block in self.postprocessor.process(self._read_turns(temp_files)):
+                    out.writeframes(block)
+            else:
+                for frames in self._read_turns(temp_files):
+                    out.writeframes(frames)
 
 if __name__ == "__main__":
     scripts_path = r"C:\AI Certs\Rankify-Podcast\app\netcom_podcast_script.json"
@@ -0,0 +1,452 @@
+"""
+Pluggable TTS providers and a per-segment routing scheduler.
+
+Every backend is wrapped in a TTSProvider adapter with one async method,
+render(segment) -> SegmentAudio (24 kHz 16-bit mono PCM plus usage). The
+TTSScheduler routes each segment to a provider that has the segment's
+voices, preferring the one with the shortest expected completion time
+(queue depth x observed latency). A throttled provider is put on a
+cooldown and its segments move to the others, so throughput degrades
+instead of stopping. Transient failures (5xx, dropped connections) are
+retried with backoff; anything else, such as a rejected voice config,
+fails the segment at once.
+"""
+
+import asyncio
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from google.genai.errors import APIError
+
+from audio.google_tts import MultiSpeakerTTS
+from audio.google_tts_mult import SingleSpeakerTTS
+from audio.synthetic_tts import single_speaker_tts_from_env
+from prompts.podcast import voices as GEMINI_VOICE_DESCRIPTIONS
+
+GEMINI_VOICES = frozenset(GEMINI_VOICE_DESCRIPTIONS)
+
+THROTTLE_STATUS_CODES = {429, 503}
+
+# ----------------------------------------------------------------------
+# Data Types
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class TTSSegment:
+    """
+    One unit of TTS work: ordered (speaker, text) turns and their voices.
+    """
+    turns: List[Tuple[str, str]]
+    speaker_voice_map: Dict[str, str]
+    tts_model: str = "gemini-2.5-pro-preview-tts"
+    index: int = 0
+
+    @property
+    def voices(self) -> set[str]:
+        return {voice.lower() for voice in self.speaker_voice_map.values()}
+
+    @property
+    def characters(self) -> int:
+        return sum(len(text) for _, text in self.turns)
+
+
+@dataclass
+class SegmentAudio:
+    pcm: bytes
+    usage: dict
+    provider: str
+    latency: float
+    index: int = 0
+
+
+class ProviderThrottled(Exception):
+    """
+    Raised by a provider when the backend is rate limiting or overloaded.
+    """
+
+    def __init__(self, provider: str, message: str = "", retry_after: Optional[float] = None):
+        super().__init__(f"{provider} throttled: {message}")
+        self.provider = provider
+        self.retry_after = retry_after
+
+# ----------------------------------------------------------------------
+# Provider Interface
+# ----------------------------------------------------------------------
+
+
+class TTSProvider(ABC):
+    """
+    Common interface for TTS backends.
+    """
+
+    name: str = "provider"
+    max_concurrency: int = 4
+
+    @abstractmethod
+    def supports(self, segment: TTSSegment) -> bool:
+        """
+        Whether this provider can render the segment's voices.
+        """
+
+    @abstractmethod
+    async def render(self, segment: TTSSegment) -> SegmentAudio:
+        """
+        Render the segment to 24 kHz 16-bit mono PCM.
+        """
+
+# ----------------------------------------------------------------------
+# Adapters
+# ----------------------------------------------------------------------
+
+
+def _raise_if_throttled(provider: str, error: APIError) -> None:
+    if error.code in THROTTLE_STATUS_CODES:
+        raise ProviderThrottled(provider, str(error)) from error
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Whether a failed render may succeed if retried: server errors and
+    transport failures, but not rejected requests.
+    """
+    status = error.code if isinstance(error, APIError) else getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError, asyncio.TimeoutError))
+
+
+class GeminiMultiSpeakerProvider(TTSProvider):
+    """
+    Adapter over MultiSpeakerTTS for two-speaker segments.
+    """
+
+    name = "gemini-multi"
+
+    def __init__(self, tts: Optional[MultiSpeakerTTS] = None, max_concurrency: int = 4):
+        self.tts = tts or MultiSpeakerTTS()
+        self.max_concurrency = max_concurrency
+
+    def supports(self, segment: TTSSegment) -> bool:
+        # Gemini multi-speaker TTS takes exactly two speakers
+        return len(segment.speaker_voice_map) == 2 and segment.voices <= GEMINI_VOICES
+
+    async def render(self, segment: TTSSegment) -> SegmentAudio:
+        prompt = self.tts.build_dialogue_prompt(
+            segment.turns, list(segment.speaker_voice_map)
+        )
+        start = time.perf_counter()
+        try:
+            pcm, usage = await self.tts.asynthesize_pcm(
+                prompt, segment.speaker_voice_map, segment.tts_model
+            )
+        except APIError as e:
+            _raise_if_throttled(self.name, e)
+            raise
+        return SegmentAudio(pcm, usage, self.name, time.perf_counter() - start, segment.index)
+
+
+class GeminiSingleSpeakerProvider(TTSProvider):
+    """
+    Adapter over SingleSpeakerTTS for single-voice segments.
+    """
+
+    name = "gemini-single"
+
+    def __init__(self, tts: Optional[SingleSpeakerTTS] = None, max_concurrency: int = 4):
+        self.tts = tts or SingleSpeakerTTS()
+        self.max_concurrency = max_concurrency
+
+    def supports(self, segment: TTSSegment) -> bool:
+        return len(segment.voices) == 1 and segment.voices <= GEMINI_VOICES
+
+    async def render(self, segment: TTSSegment) -> SegmentAudio:
+        voice = next(iter(segment.speaker_voice_map.values()))
+        text = "\n".join(text for _, text in segment.turns)
+        start = time.perf_counter()
+        try:
+            pcm, usage = await self.tts.asynthesize_pcm(text, voice, segment.tts_model)
+        except APIError as e:
+            _raise_if_throttled(self.name, e)
+            raise
+        return SegmentAudio(pcm, usage, self.name, time.perf_counter() - start, segment.index)
+
+
+class ElevenLabsProvider(TTSProvider):
+    """
+    Adapter over ElevenLabsTTS (text-to-speech / text-to-dialogue).
+
+    voice_ids maps our voice names to ElevenLabs voice IDs; it defaults to
+    the JSON object in ELEVENLABS_VOICE_MAP. Only mapped voices are routed
+    here.
+    """
+
+    name = "elevenlabs"
+
+    def __init__(
+        self,
+        tts=None,
+        voice_ids: Optional[Dict[str, str]] = None,
+        model_id: str = "eleven_multilingual_v2",
+        dialogue_model_id: str = "eleven_v3",
+        max_concurrency: int = 2,
+    ):
+        from audio.elevenlabs_tts import ElevenLabsTTS
+
+        if voice_ids is None:
+            voice_ids = json.loads(os.getenv("ELEVENLABS_VOICE_MAP", "{}"))
+
+        self.tts = tts or ElevenLabsTTS()
+        self.voice_ids = {name.lower(): voice_id for name, voice_id in voice_ids.items()}
+        self.model_id = model_id
+        self.dialogue_model_id = dialogue_model_id
+        self.max_concurrency = max_concurrency
+
+    def supports(self, segment: TTSSegment) -> bool:
+        return bool(self.voice_ids) and segment.voices <= set(self.voice_ids)
+
+    async def render(self, segment: TTSSegment) -> SegmentAudio:
+        from elevenlabs.core.api_error import ApiError
+
+        start = time.perf_counter()
+        try:
+            if len(segment.voices) == 1:
+                voice = next(iter(segment.speaker_voice_map.values()))
+                stream = self.tts.aconvert(
+                    text="\n".join(text for _, text in segment.turns),
+                    voice_id=self.voice_ids[voice.lower()],
+                    model_id=self.model_id,
+                    output_format="pcm_24000",
+                )
+            else:
+                stream = self.tts.aconvert_dialogue(
+                    inputs=[
+                        {
+                            "text": text,
+                            "voice_id": self.voice_ids[segment.speaker_voice_map[speaker].lower()],
+                        }
+                        for speaker, text in segment.turns
+                    ],
+                    model_id=self.dialogue_model_id,
+                    output_format="pcm_24000",
+                )
+            pcm = b"".join([chunk async for chunk in stream])
+        except ApiError as e:
+            if e.status_code in THROTTLE_STATUS_CODES:
+                raise ProviderThrottled(self.name, str(e.body)) from e
+            raise
+
+        # ElevenLabs bills characters rather than tokens
+        usage = {
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "total_tokens": 0,
+            "characters": segment.characters,
+        }
+        return SegmentAudio(pcm, usage, self.name, time.perf_counter() - start, segment.index)
+
+# ----------------------------------------------------------------------
+# Scheduler
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class ProviderState:
+    inflight: int = 0
+    completed: int = 0
+    failures: int = 0
+    throttles: int = 0
+    # Exponentially weighted seconds of latency per input character
+    seconds_per_char: float = 0.01
+    cooldown_until: float = 0.0
+    consecutive_throttles: int = 0
+    rendered_seconds: float = 0.0
+
+
+@dataclass
+class TTSScheduler:
+    """
+    Route segments to providers by voice support, queue depth and latency.
+
+    Args:
+        providers: Candidate providers, in order of preference on ties
+        latency_alpha: Smoothing factor for the latency estimate
+        base_cooldown: First cooldown after a throttle (doubles per repeat)
+        max_cooldown: Cooldown cap in seconds
+        max_attempts: Attempts per segment before giving up
+        retry_delay: Wait before retrying a transient error (doubles per
+            retry, capped at max_cooldown)
+    """
+    providers: List[TTSProvider]
+    latency_alpha: float = 0.3
+    base_cooldown: float = 2.0
+    max_cooldown: float = 60.0
+    max_attempts: int = 5
+    retry_delay: float = 1.0
+    states: Dict[str, ProviderState] = field(default_factory=dict)
+
+    def __post_init__(self):
+        for provider in self.providers:
+            self.states.setdefault(provider.name, ProviderState())
+        self._changed = asyncio.Condition()
+
+    def _expected_seconds(self, provider: TTSProvider, segment: TTSSegment) -> float:
+        state = self.states[provider.name]
+        return (state.inflight + 1) * state.seconds_per_char * max(segment.characters, 1)
+
+    def _pick(self, segment: TTSSegment) -> Tuple[Optional[TTSProvider], Optional[float]]:
+        """
+        Return (provider, None) when one is free, or (None, wait_seconds)
+        when every capable provider is busy or cooling down.
+        """
+        now = time.monotonic()
+        capable = [p for p in self.providers if p.supports(segment)]
+        if not capable:
+            raise ValueError(
+                f"No TTS provider supports voices {sorted(segment.voices)}"
+            )
+
+        ready = [
+            p for p in capable
+            if self.states[p.name].cooldown_until <= now
+            and self.states[p.name].inflight < p.max_concurrency
+        ]
+        if ready:
+            return min(ready, key=lambda p: self._expected_seconds(p, segment)), None
+
+        cooldowns = [
+            self.states[p.name].cooldown_until - now
+            for p in capable
+            if self.states[p.name].cooldown_until > now
+        ]
+        return None, min(cooldowns) if cooldowns else None
+
+    async def render(self, segment: TTSSegment) -> SegmentAudio:
+        """
+        Render one segment, failing over between providers as needed.
+
+        Raises:
+            ValueError: If no provider supports the segment's voices
+            RuntimeError: If every attempt was throttled or failed transiently
+        """
+        last_error: Optional[Exception] = None
+        retries = 0
+
+        for _ in range(self.max_attempts):
+            if retries:
+                # Backoff without holding a provider slot
+                await asyncio.sleep(min(self.retry_delay * 2 ** (retries - 1), self.max_cooldown))
+            async with self._changed:
+                while True:
+                    provider, wait = self._pick(segment)
+                    if provider is not None:
+                        break
+                    try:
+                        # Woken early when a slot frees up
+                        await asyncio.wait_for(self._changed.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+                state = self.states[provider.name]
+                state.inflight += 1
+
+            try:
+                audio = await provider.render(segment)
+            except ProviderThrottled as e:
+                state.throttles += 1
+                state.consecutive_throttles += 1
+                cooldown = e.retry_after or min(
+                    self.base_cooldown * 2 ** (state.consecutive_throttles - 1),
+                    self.max_cooldown,
+                )
+                state.cooldown_until = time.monotonic() + cooldown
+                last_error = e
+                continue
+            except Exception as e:
+                state.failures += 1
+                if not is_transient(e):
+                    raise
+                last_error = e
+                retries += 1
+                continue
+            else:
+                state.completed += 1
+                state.consecutive_throttles = 0
+                observed = audio.latency / max(segment.characters, 1)
+                state.seconds_per_char += self.latency_alpha * (observed - state.seconds_per_char)
+                state.rendered_seconds += len(audio.pcm) / 48000
+                return audio
+            finally:
+                async with self._changed:
+                    state.inflight -= 1
+                    self._changed.notify_all()
+
+        raise RuntimeError(
+            f"Segment {segment.index} failed after {self.max_attempts} attempts"
+        ) from last_error
+
+    async def render_all(self, segments: Iterable[TTSSegment]) -> List[SegmentAudio]:
+        """
+        Render segments concurrently; results are returned in input order.
+        """
+        return list(await asyncio.gather(*(self.render(s) for s in segments)))
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "inflight": state.inflight,
+                "completed": state.completed,
+                "failures": state.failures,
+                "throttles": state.throttles,
+                "seconds_per_char": round(state.seconds_per_char, 5),
+                "cooling_down": state.cooldown_until > time.monotonic(),
+                "rendered_seconds": round(state.rendered_seconds, 2),
+            }
+            for name, state in self.states.items()
+        }
+
+
+def segments_from_turns(
+    turns: Iterable[Tuple[str, str]],
+    speaker_voice_map: Dict[str, str],
+    tts_model: str = "gemini-2.5-pro-preview-tts",
+    turns_per_segment: int = 8,
+) -> List[TTSSegment]:
+    """
+    Split dialogue turns into schedulable two-speaker segments.
+    """
+    return [
+        TTSSegment(
+            turns=chunk,
+            speaker_voice_map=speaker_voice_map,
+            tts_model=tts_model,
+            index=index,
+        )
+        for index, chunk in enumerate(
+            MultiSpeakerTTS.segment_turns(list(turns), turns_per_segment)
+        )
+    ]
+
+
+def scheduler_from_env(
+    tts: Optional[MultiSpeakerTTS] = None,
+    max_concurrency: int = 4,
+    single_tts: Optional[SingleSpeakerTTS] = None,
+) -> TTSScheduler:
+    """
+    Scheduler over Gemini multi-speaker (tts) and single-speaker
+    (single_tts, for single-voice segments; env-selected by default),
+    plus ElevenLabs when ELEVENLABS_API_KEY and ELEVENLABS_VOICE_MAP are
+    both set.
+    """
+    providers: List[TTSProvider] = [
+        GeminiMultiSpeakerProvider(tts, max_concurrency),
+        GeminiSingleSpeakerProvider(single_tts or single_speaker_tts_from_env(), max_concurrency),
+    ]
+    if os.getenv("ELEVENLABS_API_KEY") and os.getenv("ELEVENLABS_VOICE_MAP"):
+        providers.append(ElevenLabsProvider())
+    return TTSScheduler(providers)
@@ -0,0 +1,111 @@
+"""
+Guardrails that keep long episodes from holding all of their audio in
+memory.
+
+An hour of 24 kHz 16-bit mono PCM is ~165 MiB, and rendering used to
+hold it several times over (rendered segments, post-processed blocks,
+the writer's input). Before rendering, the episode's PCM size is
+projected from its script; above PODCAST_SPILL_THRESHOLD_MB the
+renderer switches to spill mode: rendered segments go to a temporary
+file as they arrive and are streamed back through post-processing into
+the encoder one segment at a time, so peak memory no longer grows with
+episode length. Set the threshold to 0 to always spill.
+"""
+
+import os
+import tempfile
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from audio.estimator import DEFAULT_SECONDS_PER_CHAR, TTSEstimator
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+SPILL_THRESHOLD_BYTES = int(float(os.getenv("PODCAST_SPILL_THRESHOLD_MB", "256")) * 1024 * 1024)
+SPILL_DIR = os.getenv("PODCAST_SPILL_DIR") or None
+
+# 24 kHz, 16-bit mono
+PCM_BYTES_PER_SECOND = 2 * 24000
+
+
+def projected_pcm_bytes(
+    turns: Sequence[Tuple[str, str]],
+    speaker_voice_map: Dict[str, str],
+    tts_model: str,
+    estimator: Optional[TTSEstimator] = None,
+) -> int:
+    """
+    Expected size of the rendered PCM for these turns, from the
+    estimator's calibrated speaking rates when given.
+    """
+    if estimator is not None:
+        seconds = sum(estimator.turn_seconds(turns, speaker_voice_map, tts_model))
+    else:
+        seconds = sum(len(text) for _, text in turns) * DEFAULT_SECONDS_PER_CHAR
+    return int(seconds * PCM_BYTES_PER_SECOND)
+
+
+def should_spill(projected_bytes: int, threshold: Optional[int] = SPILL_THRESHOLD_BYTES) -> bool:
+    """
+    True when an episode of this size should be rendered in spill mode.
+    A threshold of None disables spilling.
+    """
+    return threshold is not None and projected_bytes >= threshold
+
+# ----------------------------------------------------------------------
+# Segment Buffer
+# ----------------------------------------------------------------------
+
+
+class SegmentBuffer:
+    """
+    Rendered PCM segments of one episode, put in any order and read back
+    in script order.
+
+    In memory by default; with spill=True each segment is appended to an
+    anonymous temporary file as it arrives and only its offset is kept,
+    and iteration reads the segments back one at a time.
+    """
+
+    def __init__(self, count: int, spill: bool = False, directory: Optional[str] = SPILL_DIR):
+        self.spilled = spill
+        self.nbytes = 0
+        self._segments: List[Optional[bytes]] = [None] * count
+        self._offsets: List[Optional[Tuple[int, int]]] = [None] * count
+        self._file = tempfile.TemporaryFile(prefix="podcast-spill-", dir=directory) if spill else None
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def put(self, index: int, pcm: bytes) -> None:
+        self.nbytes += len(pcm)
+        if self._file is None:
+            self._segments[index] = pcm
+            return
+        offset = self._file.seek(0, os.SEEK_END)
+        self._file.write(pcm)
+        self._offsets[index] = (offset, len(pcm))
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self._file is None:
+            for pcm in self._segments:
+                if pcm is not None:
+                    yield pcm
+            return
+        for entry in self._offsets:
+            if entry is None:
+                continue
+            offset, length = entry
+            self._file.seek(offset)
+            yield self._file.read(length)
+
+    def close(self) -> None:
+        """
+        Drop the segments and delete the spill file.
+        """
+        self._segments = [None] * len(self._segments)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._offsets = [None] * len(self._offsets)
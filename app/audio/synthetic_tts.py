@@ -0,0 +1,315 @@
+"""
+Deterministic synthetic TTS backend for offline load and throughput tests.
+
+SyntheticMultiSpeakerTTS and SyntheticSingleSpeakerTTS are drop-in
+replacements for MultiSpeakerTTS and SingleSpeakerTTS: same methods, same
+return metadata, same 24 kHz 16-bit mono PCM. Instead of calling Gemini
+they generate a tone per voice whose duration is proportional to the text
+length, after a configurable latency, and can inject throttling / server
+errors at a fixed rate. Output is a pure function of (voice, text), so
+runs are reproducible.
+
+Set PODCAST_TTS_BACKEND=synthetic to make the *_from_env() factories
+(used by the app and workers) return the synthetic classes.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from google.genai import errors
+
+from audio.google_tts import MultiSpeakerTTS
+from audio.google_tts_mult import SingleSpeakerTTS
+
+PCM_RATE = 24000
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class SyntheticTTSConfig:
+    """
+    Args:
+        chars_per_second: Speaking rate used to size the audio
+        latency: Fixed delay per call, in seconds
+        latency_per_char: Additional delay per input character
+        jitter: Uniform random extra delay (0..jitter seconds)
+        error_rate: Probability that a call fails
+        throttle_share: Share of injected errors that are 429s (rest 503s)
+        seed: Seed for latency jitter and error injection
+    """
+    chars_per_second: float = 15.0
+    latency: float = 0.0
+    latency_per_char: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    throttle_share: float = 0.5
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls) -> "SyntheticTTSConfig":
+        return cls(
+            chars_per_second=float(os.getenv("SYNTHETIC_TTS_CPS", "15")),
+            latency=float(os.getenv("SYNTHETIC_TTS_LATENCY", "0")),
+            latency_per_char=float(os.getenv("SYNTHETIC_TTS_LATENCY_PER_CHAR", "0")),
+            jitter=float(os.getenv("SYNTHETIC_TTS_JITTER", "0")),
+            error_rate=float(os.getenv("SYNTHETIC_TTS_ERROR_RATE", "0")),
+        )
+
+# ----------------------------------------------------------------------
+# Signal Generation
+# ----------------------------------------------------------------------
+
+
+def _digest(*parts: str) -> bytes:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).digest()
+
+
+def synthesize_tone(voice: str, text: str, chars_per_second: float = 15.0) -> bytes:
+    """
+    Deterministic PCM for one voice speaking text.
+
+    Each voice gets its own pitch; each word becomes a short tone burst
+    separated by a gap, so the result has speech-like on/off structure.
+    """
+    voice_seed = int.from_bytes(_digest(voice.lower())[:4], "big")
+    pitch = 110.0 + (voice_seed % 40) * 8.0
+    total = max(int(len(text) / chars_per_second * PCM_RATE), PCM_RATE // 10)
+
+    t = np.arange(total, dtype=np.float32) / PCM_RATE
+    signal = np.sin(2 * np.pi * pitch * t) + 0.3 * np.sin(4 * np.pi * pitch * t)
+
+    # Word envelope: bursts proportional to word length, 60 ms gaps
+    envelope = np.zeros(total, dtype=np.float32)
+    words = text.split() or [text]
+    word_chars = sum(len(w) for w in words) or 1
+    gap = int(0.06 * PCM_RATE)
+    speech = max(total - gap * len(words), len(words))
+    position = 0
+    for word in words:
+        length = max(int(speech * len(word) / word_chars), 1)
+        envelope[position:position + length] = 1.0
+        position += length + gap
+
+    amplitude = 6000 + int.from_bytes(_digest(voice, text)[:2], "big") % 4000
+    return (signal * envelope * amplitude).astype(np.int16).tobytes()
+
+
+def _parse_dialogue(dialogue: str, speaker_voice_map: Dict[str, str]) -> List[Tuple[str, str]]:
+    """
+    Recover (voice, text) pairs from a multi-speaker TTS prompt.
+    """
+    current = next(iter(speaker_voice_map.values()), "synthetic")
+    pairs: List[Tuple[str, str]] = []
+
+    for line in dialogue.splitlines():
+        line = line.strip()
+        if not line or line.startswith("TTS the following conversation"):
+            continue
+        speaker, sep, text = line.partition(":")
+        if sep and speaker.strip() in speaker_voice_map:
+            current = speaker_voice_map[speaker.strip()]
+            line = text.strip()
+        pairs.append((current, line))
+    return pairs
+
+# ----------------------------------------------------------------------
+# Behaviour Shared by Both Backends
+# ----------------------------------------------------------------------
+
+
+class _SyntheticBackend:
+    """
+    Latency, error injection and usage accounting.
+    """
+
+    def _init_synthetic(self, config: Optional[SyntheticTTSConfig]) -> None:
+        self.config = config or SyntheticTTSConfig.from_env()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self.calls = 0
+
+    def _draw(self, text: str) -> Tuple[float, Optional[errors.APIError]]:
+        config = self.config
+        with self._rng_lock:
+            self.calls += 1
+            jitter = self._rng.uniform(0, config.jitter) if config.jitter else 0.0
+            fail = config.error_rate and self._rng.random() < config.error_rate
+            throttle = self._rng.random() < config.throttle_share
+
+        delay = config.latency + config.latency_per_char * len(text) + jitter
+        error = None
+        if fail:
+            code, status = (429, "RESOURCE_EXHAUSTED") if throttle else (503, "UNAVAILABLE")
+            error_cls = errors.ClientError if code == 429 else errors.ServerError
+            error = error_cls(code, {"error": {"code": code, "message": "Synthetic failure", "status": status}})
+        return delay, error
+
+    @staticmethod
+    def _usage(text: str, pcm: bytes) -> dict:
+        # Gemini bills ~4 characters per input token and 25 audio tokens/s
+        input_tokens = max(len(text) // 4, 1)
+        output_tokens = int(len(pcm) / 2 / PCM_RATE * 25)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+# ----------------------------------------------------------------------
+# Drop-in Backends
+# ----------------------------------------------------------------------
+
+
+class SyntheticMultiSpeakerTTS(_SyntheticBackend, MultiSpeakerTTS):
+    """
+    Offline stand-in for MultiSpeakerTTS.
+    """
+
+    def __init__(self, config: Optional[SyntheticTTSConfig] = None):
+        self._init_synthetic(config)
+
+    def _render(self, dialogue: str, speaker_voice_map: Dict[str, str]) -> Tuple[bytes, dict]:
+        pcm = b"".join(
+            synthesize_tone(voice, text, self.config.chars_per_second)
+            for voice, text in _parse_dialogue(dialogue, speaker_voice_map)
+        )
+        return pcm, self._usage(dialogue, pcm)
+
+    def synthesize_pcm(
+        self,
+        dialogue: str,
+        speaker_voice_map: Dict[str, str],
+        tts_model: str,
+    ) -> Tuple[bytes, dict]:
+        delay, error = self._draw(dialogue)
+        time.sleep(delay)
+        if error:
+            raise error
+        return self._render(dialogue, speaker_voice_map)
+
+    async def asynthesize_pcm(
+        self,
+        dialogue: str,
+        speaker_voice_map: Dict[str, str],
+        tts_model: str,
+    ) -> Tuple[bytes, dict]:
+        delay, error = self._draw(dialogue)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return self._render(dialogue, speaker_voice_map)
+
+
+class SyntheticSingleSpeakerTTS(_SyntheticBackend, SingleSpeakerTTS):
+    """
+    Offline stand-in for SingleSpeakerTTS.
+    """
+
+    def __init__(self, config: Optional[SyntheticTTSConfig] = None):
+        self._init_synthetic(config)
+
+    def synthesize_pcm(
+        self,
+        text: str,
+        voice_name: str,
+        tts_model: str = "gemini-2.5-pro-preview-tts"
+    ) -> Tuple[bytes, dict]:
+        delay, error = self._draw(text)
+        time.sleep(delay)
+        if error:
+            raise error
+        pcm = synthesize_tone(voice_name, text, self.config.chars_per_second)
+        return pcm, self._usage(text, pcm)
+
+    async def asynthesize_pcm(
+        self,
+        text: str,
+        voice_name: str,
+        tts_model: str = "gemini-2.5-pro-preview-tts"
+    ) -> Tuple[bytes, dict]:
+        delay, error = self._draw(text)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        pcm = synthesize_tone(voice_name, text, self.config.chars_per_second)
+        return pcm, self._usage(text, pcm)
+
+# ----------------------------------------------------------------------
+# Factories
+# ----------------------------------------------------------------------
+
+
+def use_synthetic_backend() -> bool:
+    return os.getenv("PODCAST_TTS_BACKEND", "gemini").lower() == "synthetic"
+
+
+def multi_speaker_tts_from_env() -> MultiSpeakerTTS:
+    if use_synthetic_backend():
+        return SyntheticMultiSpeakerTTS()
+    return MultiSpeakerTTS()
+
+
+def single_speaker_tts_from_env() -> SingleSpeakerTTS:
+    if use_synthetic_backend():
+        return SyntheticSingleSpeakerTTS()
+    return SingleSpeakerTTS()
+
+# ----------------------------------------------------------------------
+# Simple Load Test (CLI)
+# ----------------------------------------------------------------------
+
+
+async def _load_test(episodes: int, turns: int, config: SyntheticTTSConfig) -> None:
+    tts = SyntheticMultiSpeakerTTS(config)
+    speaker_voice_map = {"Maya": "achernar", "Liam": "enceladus"}
+    script = [
+        ("Maya" if i % 2 else "Liam", f"Turn {i} of a synthetic episode with a few more words in it.")
+        for i in range(turns)
+    ]
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                tts.agenerate_tts_segments(
+                    script,
+                    speaker_voice_map,
+                    output_file=os.path.join(out_dir, f"episode_{i:03d}.wav"),
+                )
+                for i in range(episodes)
+            ),
+            return_exceptions=True,
+        )
+        elapsed = time.perf_counter() - start
+
+    failed = sum(isinstance(r, Exception) for r in results)
+    print(f"🎧 {episodes} episodes x {turns} turns in {elapsed:.2f}s")
+    print(f"   {(episodes - failed) / elapsed:.1f} episodes/s, {failed} failed, {tts.calls} TTS calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline TTS load test")
+    parser.add_argument("--episodes", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = SyntheticTTSConfig(latency=args.latency, error_rate=args.error_rate)
+    asyncio.run(_load_test(args.episodes, args.turns, config))
+
+
+if __name__ == "__main__":
+    main()
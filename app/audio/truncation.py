@@ -0,0 +1,163 @@
+"""
+Detect multi-speaker renders that stop before the end of the script.
+
+Gemini occasionally ends a long multi-speaker render early or drops the
+last few turns. We compare the rendered duration with the duration the
+estimator expects for the turns; when it is clearly short, the audio is
+cut at the pause nearest to where the first incomplete turn should start,
+so the caller can re-synthesise only the remaining turns and splice them
+on.
+
+Turn boundaries are inferred from nominal per-turn durations, so the cut
+is a best guess: it always lands in a pause (never mid-word) and the
+turn it maps to is re-rendered in full.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+from audio.postprocess import PCM_RATE, dbfs_to_energy, frame_energies, pcm_to_array
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+# Renders shorter than this share of the expected duration are truncated
+MIN_DURATION_RATIO = 0.8
+
+# ... and so are renders that stop mid-speech and are below this share
+ABRUPT_DURATION_RATIO = 0.95
+
+SILENCE_THRESHOLD_DBFS = -45.0
+MIN_PAUSE_MS = 250.0
+FRAME_MS = 10.0
+ABRUPT_TAIL_MS = 60.0
+
+# ----------------------------------------------------------------------
+# Result
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class TruncationCheck:
+    expected_seconds: float
+    actual_seconds: float
+    ends_mid_speech: bool
+    first_missing_turn: Optional[int] = None
+    cut_samples: Optional[int] = None
+
+    @property
+    def truncated(self) -> bool:
+        return self.first_missing_turn is not None
+
+    @property
+    def cut_bytes(self) -> int:
+        return 2 * (self.cut_samples or 0)
+
+# ----------------------------------------------------------------------
+# Helpers
+# ----------------------------------------------------------------------
+
+
+def find_pauses(
+    samples: np.ndarray,
+    rate: int = PCM_RATE,
+    threshold_dbfs: float = SILENCE_THRESHOLD_DBFS,
+    min_pause_ms: float = MIN_PAUSE_MS,
+    frame_ms: float = FRAME_MS,
+) -> np.ndarray:
+    """
+    Sample positions of the midpoints of interior pauses (silent runs of
+    at least min_pause_ms between speech).
+    """
+    frame = max(int(rate * frame_ms / 1000), 1)
+    energies = frame_energies(samples, frame)
+    if energies.size == 0:
+        return np.empty(0, dtype=np.int64)
+
+    silent = energies <= dbfs_to_energy(threshold_dbfs)
+    # Run boundaries: +1 where silence starts, -1 where it ends
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1)
+
+    min_frames = max(int(min_pause_ms / frame_ms), 1)
+    interior = (starts > 0) & (stops < len(silent)) & (stops - starts >= min_frames)
+    return ((starts[interior] + stops[interior]) // 2) * frame
+
+
+def ends_mid_speech(
+    samples: np.ndarray,
+    rate: int = PCM_RATE,
+    threshold_dbfs: float = SILENCE_THRESHOLD_DBFS,
+    tail_ms: float = ABRUPT_TAIL_MS,
+) -> bool:
+    tail = samples[-max(int(rate * tail_ms / 1000), 1):].astype(np.float32)
+    if tail.size == 0:
+        return False
+    return float(np.dot(tail, tail) / tail.size) > dbfs_to_energy(threshold_dbfs)
+
+# ----------------------------------------------------------------------
+# Check
+# ----------------------------------------------------------------------
+
+
+def check_truncation(
+    pcm: bytes,
+    turn_seconds: Sequence[float],
+    rate: int = PCM_RATE,
+    min_ratio: float = MIN_DURATION_RATIO,
+    abrupt_ratio: float = ABRUPT_DURATION_RATIO,
+) -> TruncationCheck:
+    """
+    Compare rendered PCM with the expected per-turn durations.
+
+    Args:
+        pcm: Rendered 16-bit mono PCM
+        turn_seconds: Expected duration of each turn, in script order
+        rate: Sample rate
+        min_ratio: Below this share of the expected duration the render
+            is considered truncated
+        abrupt_ratio: Share below which a render that ends mid-speech is
+            also considered truncated
+
+    Returns:
+        TruncationCheck; when truncated, first_missing_turn is the index
+        of the first turn to re-synthesise and cut_samples the position
+        (at a pause) where the re-rendered tail should be spliced
+    """
+    samples = pcm_to_array(pcm)
+    expected = float(sum(turn_seconds))
+    actual = len(samples) / rate
+    abrupt = ends_mid_speech(samples, rate)
+
+    check = TruncationCheck(expected, actual, abrupt)
+    if expected <= 0 or len(turn_seconds) < 2:
+        return check
+
+    ratio = actual / expected
+    if ratio >= min_ratio and not (abrupt and ratio < abrupt_ratio):
+        return check
+
+    # Nominal start of each turn, and of the first turn not fully covered
+    starts = np.concatenate(([0.0], np.cumsum(turn_seconds)[:-1]))
+    ends = starts + np.asarray(turn_seconds)
+    incomplete = int(np.searchsorted(ends, actual, side="right"))
+    target = min(starts[min(incomplete, len(starts) - 1)], actual)
+
+    pauses = find_pauses(samples, rate)
+    if pauses.size == 0:
+        # Nowhere safe to cut: re-render everything
+        check.first_missing_turn = 0
+        check.cut_samples = 0
+        return check
+
+    cut = int(pauses[np.argmin(np.abs(pauses / rate - target))])
+
+    # Treat the cut as a turn boundary and resume from the nearest one
+    first_missing = int(np.argmin(np.abs(starts - cut / rate)))
+    check.first_missing_turn = first_missing
+    check.cut_samples = cut if first_missing else 0
+    return check
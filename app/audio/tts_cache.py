@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from typing import Dict, Optional
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+DEFAULT_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(".cache", "tts_segments"))
+DEFAULT_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+CACHE_KEY_VERSION = 1
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalise text so cosmetic edits (whitespace, unicode forms) don't
+    change the cache key.
+    """
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(text.split())
+
+
+class TTSSegmentCache:
+    """
+    Content-addressed on-disk cache of rendered PCM segments.
+
+    Entries are keyed on the TTS model, the voice (or speaker-voice map),
+    the normalised segment text and any conditioning context sent with it,
+    so a re-render only has to synthesise segments whose inputs changed.
+    The cache is bounded by total size; least recently used entries are
+    evicted first.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._total_bytes = sum(
+            entry["size"] for entry in self._scan().values()
+        )
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(
+        tts_model: str,
+        voices,
+        text: str,
+        context: str = "",
+    ) -> str:
+        """
+        Build the cache key for one segment.
+
+        Args:
+            tts_model: TTS model name
+            voices: Voice name, or {"Speaker": "VoiceName"} map
+            text: Segment text
+            context: Conditioning text sent alongside the segment
+                (prompt header, neighbouring turns)
+
+        Returns:
+            Hex digest identifying the rendered audio
+        """
+        if isinstance(voices, dict):
+            voices = sorted(voices.items())
+
+        material = json.dumps(
+            [
+                CACHE_KEY_VERSION,
+                tts_model,
+                voices,
+                normalize_text(text),
+                normalize_text(context),
+            ],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pcm")
+
+    def _scan(self) -> Dict[str, dict]:
+        entries = {}
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".pcm"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries[path] = {"size": stat.st_size, "mtime": stat.st_mtime}
+        return entries
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Return cached PCM for key, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                pcm = f.read()
+        except FileNotFoundError:
+            return None
+
+        # Refresh mtime so eviction is least-recently-used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return pcm
+
+    def put(self, key: str, pcm: bytes) -> None:
+        """
+        Store PCM under key and evict old entries if over budget.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pcm)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total_bytes += len(pcm) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        entries = self._scan()
+        self._total_bytes = sum(entry["size"] for entry in entries.values())
+
+        for path, entry in sorted(entries.items(), key=lambda item: item[1]["mtime"]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self._total_bytes -= entry["size"]
+
+    def clear(self) -> None:
+        """
+        Remove every cached segment.
+        """
+        with self._lock:
+            for path in self._scan():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._total_bytes = 0
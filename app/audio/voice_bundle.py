@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import struct
+import wave
+from typing import Dict, Optional
+
+from audio.export import (
+    EXPORT_FORMATS,
+    encode_pcm_to_bytes,
+    ffmpeg_available,
+    iter_wav_pcm,
+)
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+DEFAULT_SAMPLE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "assets",
+    "voice_samples",
+)
+DEFAULT_BUNDLE_DIR = os.getenv("VOICE_BUNDLE_DIR", os.path.join(".cache", "voice_bundle"))
+
+BUNDLE_MAGIC = b"VBUNDLE1"
+BUNDLE_VERSION = 1
+
+# Previews are short speech clips; this is plenty for a sidebar player
+PREVIEW_BITRATE = "24k"
+
+# ----------------------------------------------------------------------
+# Building
+# ----------------------------------------------------------------------
+
+
+def _sample_files(sample_dir: str) -> Dict[str, str]:
+    """
+    Map voice id (lower-cased file stem) to WAV path.
+    """
+    files = {}
+    for name in sorted(os.listdir(sample_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() == ".wav":
+            files[stem.lower()] = os.path.join(sample_dir, name)
+    return files
+
+
+def source_signature(sample_dir: str, output_format: str) -> str:
+    """
+    Cheap fingerprint of the sample directory (names, sizes, mtimes) so a
+    bundle is rebuilt whenever a sample is added, removed or re-rendered.
+    """
+    digest = hashlib.sha256(f"{BUNDLE_VERSION}:{output_format}".encode())
+    for voice, path in _sample_files(sample_dir).items():
+        stat = os.stat(path)
+        digest.update(f"{voice}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def _wav_duration(path: str) -> float:
+    with wave.open(path, "rb") as wf:
+        return wf.getnframes() / wf.getframerate()
+
+
+def _encode_preview(path: str, output_format: str) -> bytes:
+    if output_format == "wav":
+        with open(path, "rb") as f:
+            return f.read()
+    return encode_pcm_to_bytes(iter_wav_pcm(path), output_format, PREVIEW_BITRATE)
+
+
+def build_bundle(
+    sample_dir: str,
+    bundle_path: str,
+    output_format: str = "opus",
+) -> None:
+    """
+    Pack every WAV in sample_dir into a single indexed file.
+
+    Layout: magic, 4-byte big-endian index length, JSON index, then the
+    encoded previews back to back. The index maps each voice to its
+    (offset, length) in the data section.
+    """
+    index = {
+        "format": output_format,
+        "mime": EXPORT_FORMATS[output_format]["mime"],
+        "source": source_signature(sample_dir, output_format),
+        "voices": {},
+    }
+    blobs = []
+    offset = 0
+
+    for voice, path in _sample_files(sample_dir).items():
+        try:
+            blob = _encode_preview(path, output_format)
+            duration = _wav_duration(path)
+        except (wave.Error, EOFError, RuntimeError) as e:
+            print(f"⚠️ Skipping voice sample {path}: {e}")
+            continue
+        index["voices"][voice] = {
+            "offset": offset,
+            "length": len(blob),
+            "duration_seconds": round(duration, 3),
+        }
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = json.dumps(index, separators=(",", ":")).encode("utf-8")
+
+    os.makedirs(os.path.dirname(bundle_path) or ".", exist_ok=True)
+    tmp_path = f"{bundle_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(struct.pack(">I", len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, bundle_path)
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+
+
+class VoiceBundle:
+    """
+    In-memory view over a packed voice-preview bundle.
+
+    The whole file is read once; previews are sliced out of that buffer
+    on first request and the slices are kept, so repeated lookups (e.g.
+    on every Streamlit rerun) return the same bytes object without any
+    disk access or copying.
+    """
+
+    def __init__(self, data: bytes):
+        if data[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+            raise ValueError("Not a voice bundle")
+        start = len(BUNDLE_MAGIC)
+        (header_len,) = struct.unpack(">I", data[start:start + 4])
+        start += 4
+        self.index = json.loads(data[start:start + header_len])
+        self._data = memoryview(data)[start + header_len:]
+        self._previews: Dict[str, bytes] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> "VoiceBundle":
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    @property
+    def format(self) -> str:
+        return self.index["format"]
+
+    @property
+    def mime(self) -> str:
+        return self.index["mime"]
+
+    @property
+    def source(self) -> str:
+        return self.index["source"]
+
+    def voices(self) -> list[str]:
+        return list(self.index["voices"])
+
+    def duration(self, voice: str) -> Optional[float]:
+        entry = self.index["voices"].get(voice.lower())
+        return entry["duration_seconds"] if entry else None
+
+    def preview(self, voice: str) -> Optional[bytes]:
+        voice = voice.lower()
+        preview = self._previews.get(voice)
+        if preview is None:
+            entry = self.index["voices"].get(voice)
+            if entry is None:
+                return None
+            offset = entry["offset"]
+            preview = self._data[offset:offset + entry["length"]].tobytes()
+            self._previews[voice] = preview
+        return preview
+
+
+def load_voice_bundle(
+    sample_dir: str = DEFAULT_SAMPLE_DIR,
+    bundle_dir: str = DEFAULT_BUNDLE_DIR,
+    output_format: Optional[str] = None,
+) -> VoiceBundle:
+    """
+    Load the preview bundle for sample_dir, (re)building it if it is
+    missing or the samples changed since it was packed.
+
+    Previews are packed as Opus when ffmpeg is available, otherwise the
+    original WAVs are packed as-is.
+    """
+    if output_format is None:
+        output_format = "opus" if ffmpeg_available() else "wav"
+
+    bundle_path = os.path.join(bundle_dir, f"voice_samples.{output_format}.bundle")
+    signature = source_signature(sample_dir, output_format)
+
+    if os.path.exists(bundle_path):
+        try:
+            bundle = VoiceBundle.from_file(bundle_path)
+            if bundle.source == signature:
+                return bundle
+        except (ValueError, struct.error):
+            pass
+
+    build_bundle(sample_dir, bundle_path, output_format)
+    return VoiceBundle.from_file(bundle_path)
@@ -0,0 +1,77 @@
+"""
+Benchmark: near-duplicate index lookups as the index grows.
+
+Fills a NearDuplicateIndex with random signatures (plus one real
+document and an edited copy of it) and times lookups for both hits and
+misses, alongside the cost of computing a signature.
+
+Usage (from app/):
+    python -m benchmarks.bench_near_duplicates --documents 200000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from services.near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex
+
+
+def make_article(words: int, seed: int) -> str:
+    rng = np.random.default_rng(seed)
+    vocabulary = [f"w{index}" for index in range(5000)]
+    return " ".join(vocabulary[i] for i in rng.integers(0, len(vocabulary), words))
+
+
+def lightly_edited(text: str) -> str:
+    words = text.split()
+    words[10:12] = ["syndicated", "copy"]
+    return "Republished from Example News. " + " ".join(words[:-20])
+
+
+def timed_queries(index: NearDuplicateIndex, signatures: list, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for signature in signatures:
+            index.query(signature)
+    return (time.perf_counter() - started) / (repeat * len(signatures))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate lookups")
+    parser.add_argument("--documents", type=int, default=200_000)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--words", type=int, default=1500, help="Words per synthetic article")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    index = NearDuplicateIndex(args.threshold)
+    rng = np.random.default_rng(0)
+
+    article = make_article(args.words, seed=1)
+    started = time.perf_counter()
+    signature = index.signature(article)
+    signature_ms = 1000 * (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    random_signatures = rng.integers(0, 2 ** 32, (args.documents, index.num_perm), dtype=np.uint32)
+    index.add("article", signature)
+    for row, random_signature in enumerate(random_signatures):
+        index.add(f"doc-{row}", random_signature)
+    add_seconds = time.perf_counter() - started
+
+    hits = [index.signature(lightly_edited(article))]
+    misses = [index.signature(make_article(args.words, seed)) for seed in range(2, 12)]
+    match = index.query(hits[0])
+
+    print(f"\n🔎 Near-duplicate index: {len(index):,} documents, "
+          f"{index.bands} bands x {index.rows} rows (threshold {args.threshold})")
+    print(f"  signature   : {signature_ms:8.2f} ms per {args.words}-word document")
+    print(f"  add         : {1e6 * add_seconds / len(index):8.2f} µs per document")
+    print(f"  lookup hit  : {1e6 * timed_queries(index, hits, args.repeat):8.1f} µs"
+          f"  ({match.doc_id if match else 'no match'}, similarity {match.similarity if match else 0:.2f})")
+    print(f"  lookup miss : {1e6 * timed_queries(index, misses, args.repeat):8.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: NumPy post-processing vs a pure-Python baseline.
+
+Both implementations trim silence, level each segment and join segments
+with a gap and fades. The baseline measures plain RMS (it has no FFT to
+K-weight with), so it does strictly less work than the NumPy version.
+
+Usage (from app/):
+    python -m benchmarks.bench_postprocess --minutes 2 --turns 40
+"""
+
+import argparse
+import math
+import time
+from array import array
+
+import numpy as np
+
+from audio.postprocess import AudioPostProcessor, PCM_RATE
+
+# ----------------------------------------------------------------------
+# Synthetic Input
+# ----------------------------------------------------------------------
+
+
+def make_turns(minutes: float, turns: int, seed: int = 0) -> list[bytes]:
+    """
+    Noise bursts with padded silence and varying levels, one per turn.
+    """
+    rng = np.random.default_rng(seed)
+    samples_per_turn = int(PCM_RATE * minutes * 60 / turns)
+    pad = PCM_RATE // 4
+    out = []
+    for i in range(turns):
+        level = 1000 + 6000 * (i % 3)
+        voiced = rng.normal(0, level, samples_per_turn - 2 * pad)
+        turn = np.concatenate((np.zeros(pad), voiced, np.zeros(pad)))
+        out.append(np.clip(turn, -32768, 32767).astype(np.int16).tobytes())
+    return out
+
+# ----------------------------------------------------------------------
+# Pure-Python Baseline
+# ----------------------------------------------------------------------
+
+
+def python_postprocess(
+    segments: list[bytes],
+    target_dbfs: float = -20.0,
+    threshold_dbfs: float = -45.0,
+    gap_ms: float = 250.0,
+    fade_ms: float = 15.0,
+    frame_ms: float = 10.0,
+) -> bytes:
+    frame = int(PCM_RATE * frame_ms / 1000)
+    fade = int(PCM_RATE * fade_ms / 1000)
+    threshold = (32768 * 10 ** (threshold_dbfs / 20)) ** 2
+    target = 32768 * 10 ** (target_dbfs / 20)
+    out = array("h")
+
+    for index, pcm in enumerate(segments):
+        samples = array("h", pcm)
+
+        # Trim
+        loud = []
+        for f in range(len(samples) // frame):
+            chunk = samples[f * frame:(f + 1) * frame]
+            if sum(x * x for x in chunk) / frame > threshold:
+                loud.append(f)
+        if not loud:
+            continue
+        samples = samples[loud[0] * frame:(loud[-1] + 1) * frame]
+
+        # Level
+        rms = math.sqrt(sum(x * x for x in samples) / len(samples))
+        gain = target / rms if rms else 1.0
+        leveled = [max(-32768, min(32767, round(x * gain))) for x in samples]
+
+        # Fades + gap
+        n = min(fade, len(leveled) // 2)
+        for i in range(n):
+            t = (i + 0.5) / n
+            leveled[i] = round(leveled[i] * math.sin(t * math.pi / 2))
+            leveled[-1 - i] = round(leveled[-1 - i] * math.sin(t * math.pi / 2))
+        if index:
+            out.extend([0] * int(PCM_RATE * gap_ms / 1000))
+        out.extend(leveled)
+
+    return out.tobytes()
+
+# ----------------------------------------------------------------------
+# Main
+# ----------------------------------------------------------------------
+
+
+def timed(fn, *args) -> tuple[float, bytes]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=float, default=2.0, help="Audio length for the comparison")
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--long-minutes", type=float, default=60.0, help="Audio length for the NumPy-only run")
+    args = parser.parse_args()
+
+    segments = make_turns(args.minutes, args.turns)
+    audio_seconds = args.minutes * 60
+
+    processor = AudioPostProcessor()
+    numpy_time, _ = timed(lambda s: b"".join(processor.process(s)), segments)
+    python_time, _ = timed(python_postprocess, segments)
+
+    print(f"{args.minutes:g} min, {args.turns} turns")
+    print(f"  pure Python : {python_time:8.3f}s  ({audio_seconds / python_time:8.1f}x real time)")
+    print(f"  NumPy       : {numpy_time:8.3f}s  ({audio_seconds / numpy_time:8.1f}x real time)")
+    print(f"  speedup     : {python_time / numpy_time:8.1f}x")
+
+    long_segments = make_turns(args.long_minutes, max(args.turns, int(args.long_minutes * 20)))
+    long_time, _ = timed(
+        lambda s: sum(len(block) for block in processor.process(s)), long_segments
+    )
+    print(f"{args.long_minutes:g} min NumPy: {long_time:.3f}s ({args.long_minutes * 60 / long_time:.1f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
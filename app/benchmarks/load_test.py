@@ -0,0 +1,438 @@
+"""
+Concurrent-session load test for streamlit_app.py.
+
+Simulates N browser sessions, each loading the page, entering its own
+text and pressing Generate, against local stand-ins for the model
+backends: a small HTTP server answers the Gemini generateContent call
+(so run_gemini_agent runs unchanged) and TTS uses the synthetic backend.
+Sessions run through Streamlit's AppTest, each on its own script thread
+in this process, which plays the role of the server. The worker pool
+runs as child processes as in the deployment, but is started by the
+harness rather than by the app: AppTest executes the script as
+__main__, which spawned workers would re-run on start-up.
+
+Reports per-session page-load and generation latency, CPU and RSS of the
+server process and its workers, and error and collision rates. A
+collision is a session that was handed another session's script or
+audio file.
+
+Usage (from app/):
+    python -m benchmarks.load_test --sessions 8
+    python -m benchmarks.load_test --sweep 1 2 4 8 16 --slo 60 --json load.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+
+DEFAULT_SESSIONS = 8
+DEFAULT_TIMEOUT = 600.0
+SAMPLE_INTERVAL = 0.5
+# How often a session reruns the page while its job is in progress
+POLL_INTERVAL = 0.5
+
+
+def input_marker(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+# ----------------------------------------------------------------------
+# Stand-In Gemini Text Endpoint
+# ----------------------------------------------------------------------
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    server: "StandInGemini"
+
+    def do_POST(self) -> None:
+        from benchmarks.offline import make_script
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        input_text = body["contents"][0]["parts"][0]["text"]
+        marker = input_marker(input_text)
+
+        time.sleep(self.server.latency)
+        script = make_script(self.server.turns, seed=int(marker, 16) % 10_000)
+        # Title carries the input marker so each session can check it got its own script
+        script.title = f"Load test {marker}"
+        text = script.model_dump_json()
+
+        payload = json.dumps({
+            "candidates": [{"content": {"parts": [{"text": text}]}}],
+            "usageMetadata": {"promptTokenCount": len(input_text) // 4, "candidatesTokenCount": len(text) // 4},
+            "modelVersion": "stand-in",
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        self.server.calls += 1
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class StandInGemini(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float, turns: int):
+        super().__init__(("127.0.0.1", 0), _StandInHandler)
+        self.latency = latency
+        self.turns = turns
+        self.calls = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1beta"
+
+    def start(self) -> "StandInGemini":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+# ----------------------------------------------------------------------
+# Resource Sampling
+# ----------------------------------------------------------------------
+
+
+def _is_worker(process: psutil.Process) -> bool:
+    # Skip multiprocessing's resource tracker, which is also a child
+    try:
+        return "spawn_main" in " ".join(process.cmdline())
+    except psutil.Error:
+        return False
+
+
+class ResourceSampler:
+    """
+    Samples CPU and RSS of this process (the Streamlit server) and of
+    its child processes (workers) in a background thread.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.samples: List[Dict[str, float]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._children: Dict[int, psutil.Process] = {}
+
+    def _run(self) -> None:
+        self.process.cpu_percent()
+        while not self._stop.wait(self.interval):
+            for child in self.process.children(recursive=True):
+                if child.pid not in self._children and _is_worker(child):
+                    self._children[child.pid] = child
+                    child.cpu_percent()
+            worker_cpu = worker_rss = 0.0
+            for pid, child in list(self._children.items()):
+                try:
+                    worker_cpu += child.cpu_percent()
+                    worker_rss += child.memory_info().rss
+                except psutil.Error:
+                    del self._children[pid]
+            self.samples.append({
+                "server_cpu": self.process.cpu_percent(),
+                "server_rss": float(self.process.memory_info().rss),
+                "worker_cpu": worker_cpu,
+                "worker_rss": worker_rss,
+                "workers": float(len(self._children)),
+            })
+
+    def __enter__(self) -> "ResourceSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {}
+
+        def column(name: str) -> List[float]:
+            return [sample[name] for sample in self.samples]
+
+        mib = 1024 * 1024
+        return {
+            "server_cpu_mean_pct": statistics.fmean(column("server_cpu")),
+            "server_cpu_peak_pct": max(column("server_cpu")),
+            "server_rss_peak_mib": max(column("server_rss")) / mib,
+            "worker_cpu_mean_pct": statistics.fmean(column("worker_cpu")),
+            "worker_rss_peak_mib": max(column("worker_rss")) / mib,
+            "workers": max(column("workers")),
+        }
+
+# ----------------------------------------------------------------------
+# Sessions
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class SessionResult:
+    session: int
+    input_marker: str
+    load_seconds: float = 0.0
+    generate_seconds: float = 0.0
+    ok: bool = False
+    error: Optional[str] = None
+    title: Optional[str] = None
+    audio_file: Optional[str] = None
+    audio_sha1: Optional[str] = None
+
+
+def session_text(level: int, index: int) -> str:
+    return (
+        f"Load test level {level}, session {index}, started {time.time()}.\n"
+        "Autonomous agents plan, execute and verify multi-step tasks."
+    )
+
+
+def run_session(level: int, index: int, delay: float, timeout: float) -> SessionResult:
+    """
+    One user: load the page, enter text, press Generate and wait for
+    the audio to appear.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    from services.ingest import normalize_text
+
+    text = session_text(level, index)
+    # The app normalises pasted text before submitting, so that is what
+    # the stand-in sees and marks the script with
+    result = SessionResult(index, input_marker(normalize_text(text)))
+    time.sleep(delay)
+    try:
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        started = time.perf_counter()
+        at.run()
+        result.load_seconds = time.perf_counter() - started
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+        at.text_area[0].input(text)
+        generate = next(button for button in at.button if "Generate" in button.label)
+        started = time.perf_counter()
+        generate.click().run()
+        # The page returns at once and polls the job; rerun as a
+        # browser would until the audio (or an error) shows up
+        deadline = started + timeout
+        while True:
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+            errors = [element.value for element in at.error]
+            if "audio_file" in at.session_state or errors:
+                break
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"No audio after {timeout:g}s")
+            time.sleep(POLL_INTERVAL)
+            at.run()
+        result.generate_seconds = time.perf_counter() - started
+
+        if "audio_file" not in at.session_state:
+            raise RuntimeError(errors[0] if errors else "No audio produced")
+
+        result.title = at.session_state["script"].title
+        result.audio_file = at.session_state["audio_file"]
+        with open(result.audio_file, "rb") as f:
+            result.audio_sha1 = hashlib.sha1(f.read()).hexdigest()
+        result.ok = True
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def find_collisions(results: List[SessionResult]) -> List[int]:
+    """
+    Sessions that received another session's script, or whose audio
+    file or audio content is shared with another session.
+    """
+    collided = set()
+    by_path: Dict[str, List[int]] = {}
+    by_digest: Dict[str, List[int]] = {}
+    for result in results:
+        if not result.ok:
+            continue
+        if result.title != f"Load test {result.input_marker}":
+            collided.add(result.session)
+        by_path.setdefault(result.audio_file, []).append(result.session)
+        by_digest.setdefault(result.audio_sha1, []).append(result.session)
+    for sessions in (*by_path.values(), *by_digest.values()):
+        if len(sessions) > 1:
+            collided.update(sessions)
+    return sorted(collided)
+
+# ----------------------------------------------------------------------
+# Load Levels
+# ----------------------------------------------------------------------
+
+
+def percentile(values: List[float], share: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def run_level(sessions: int, ramp: float, timeout: float) -> Dict[str, Any]:
+    """
+    Run sessions concurrent users (started evenly over ramp seconds).
+    """
+    results: List[Optional[SessionResult]] = [None] * sessions
+
+    def user(index: int) -> None:
+        delay = ramp * index / max(sessions - 1, 1)
+        results[index] = run_session(sessions, index, delay, timeout)
+
+    threads = [threading.Thread(target=user, args=(index,)) for index in range(sessions)]
+    started = time.perf_counter()
+    with ResourceSampler() as sampler:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.perf_counter() - started
+
+    finished = [result for result in results if result is not None]
+    ok = [result for result in finished if result.ok]
+    collisions = find_collisions(finished)
+    generate = [result.generate_seconds for result in ok]
+    load = [result.load_seconds for result in finished if result.load_seconds]
+    return {
+        "sessions": sessions,
+        "wall_seconds": wall,
+        "succeeded": len(ok),
+        "error_rate": 1 - len(ok) / sessions,
+        "collision_rate": len(collisions) / sessions,
+        "load_p50_s": percentile(load, 0.5),
+        "load_p95_s": percentile(load, 0.95),
+        "generate_p50_s": percentile(generate, 0.5),
+        "generate_p95_s": percentile(generate, 0.95),
+        "generate_max_s": max(generate, default=0.0),
+        "sessions_per_min": 60 * len(ok) / wall if wall else 0.0,
+        **sampler.summary(),
+        "collided_sessions": collisions,
+        "results": [asdict(result) for result in finished],
+    }
+
+
+def print_level(level: Dict[str, Any]) -> None:
+    print(
+        f"👥 {level['sessions']:>3} sessions | ok {level['succeeded']}/{level['sessions']} "
+        f"| errors {level['error_rate']:.0%} | collisions {level['collision_rate']:.0%}"
+    )
+    print(
+        f"   page load p50 {level['load_p50_s']:.2f}s p95 {level['load_p95_s']:.2f}s | "
+        f"generate p50 {level['generate_p50_s']:.1f}s p95 {level['generate_p95_s']:.1f}s "
+        f"max {level['generate_max_s']:.1f}s | {level['sessions_per_min']:.1f} sessions/min"
+    )
+    if "server_cpu_mean_pct" in level:
+        print(
+            f"   server cpu {level['server_cpu_mean_pct']:.0f}% (peak {level['server_cpu_peak_pct']:.0f}%) "
+            f"rss {level['server_rss_peak_mib']:.0f} MiB | {level['workers']:.0f} workers "
+            f"cpu {level['worker_cpu_mean_pct']:.0f}% rss {level['worker_rss_peak_mib']:.0f} MiB"
+        )
+    for result in level["results"]:
+        if result["error"]:
+            print(f"   ❌ session {result['session']}: {result['error']}")
+
+# ----------------------------------------------------------------------
+# Main
+# ----------------------------------------------------------------------
+
+
+def configure_environment(workdir: str, args: argparse.Namespace, base_url: str) -> None:
+    """
+    Point the app at the stand-ins and at a scratch job DB, output,
+    checkpoint and cache directory. Must run before the app is imported.
+    """
+    os.environ.update({
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "load-test"),
+        "GEMINI_API_BASE_URL": base_url,
+        "PODCAST_TTS_BACKEND": "synthetic",
+        "SYNTHETIC_TTS_LATENCY": str(args.tts_latency),
+        "SYNTHETIC_TTS_JITTER": str(args.tts_latency / 2),
+        "PODCAST_EMBEDDED_WORKERS": "0",
+        "PODCAST_JOB_DB": os.path.join(workdir, "jobs.sqlite3"),
+        "PODCAST_OUTPUT_DIR": os.path.join(workdir, "podcasts"),
+        "PODCAST_CHECKPOINT_DIR": os.path.join(workdir, "checkpoints"),
+        "TTS_CACHE_DIR": os.path.join(workdir, "tts_cache"),
+        "TTS_HISTORY_PATH": os.path.join(workdir, "tts_history.jsonl"),
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the Streamlit app")
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS)
+    parser.add_argument("--sweep", type=int, nargs="+", help="Run several session counts in turn")
+    parser.add_argument("--ramp", type=float, default=0.0, help="Seconds over which sessions start")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PODCAST_EMBEDDED_WORKERS", "2")),
+                        help="Worker processes")
+    parser.add_argument("--turns", type=int, default=24, help="Dialogue turns per stand-in script")
+    parser.add_argument("--script-latency", type=float, default=2.0, help="Stand-in script call seconds")
+    parser.add_argument("--tts-latency", type=float, default=1.0, help="Synthetic TTS call seconds")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Per-session generation timeout")
+    parser.add_argument("--slo", type=float, default=None,
+                        help="p95 generation seconds a level must meet (with no errors/collisions)")
+    parser.add_argument("--json", default=None, help="Write the full report here")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory")
+    args = parser.parse_args()
+
+    stand_in = StandInGemini(args.script_latency, args.turns).start()
+    workdir = tempfile.mkdtemp(prefix="podcast-load-")
+    configure_environment(workdir, args, stand_in.base_url)
+    print(f"🧪 Stand-in Gemini at {stand_in.base_url}, scratch dir {workdir}")
+
+    from services.worker import WorkerPool
+
+    pool = WorkerPool(args.workers, os.environ["PODCAST_JOB_DB"], os.environ["PODCAST_OUTPUT_DIR"]).start()
+
+    levels = []
+    try:
+        for sessions in args.sweep or [args.sessions]:
+            level = run_level(sessions, args.ramp, args.timeout)
+            print_level(level)
+            levels.append(level)
+    finally:
+        stand_in.shutdown()
+        pool.stop()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.slo is not None:
+        passing = [
+            level["sessions"] for level in levels
+            if level["generate_p95_s"] <= args.slo
+            and level["error_rate"] == 0
+            and level["collision_rate"] == 0
+        ]
+        if passing:
+            print(f"✅ Max sessions meeting p95 ≤ {args.slo:g}s: {max(passing)}")
+        else:
+            print(f"❌ No level met p95 ≤ {args.slo:g}s")
+
+    if args.json:
+        report = {"config": vars(args), "levels": levels}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Offline stand-ins for the Gemini endpoints, for benchmarks and load
+tests.
+
+The script endpoint is replaced by patching post() on the shared HTTP
+session, so run_gemini_agent still builds the payload, posts it, parses
+and validates the response; only the network hop is simulated. TTS uses the
+synthetic backend, which returns speech-like PCM sized to the text.
+"""
+
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Sequence
+
+# core.gemini_client refuses to import without a key; none is sent offline
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+
+from audio.synthetic_tts import SyntheticMultiSpeakerTTS, SyntheticTTSConfig
+from core import gemini_client
+from core.clients import http_session
+from schemas.podcast import PodcastScript
+
+WORDS = (
+    "agent model planner data voice system market energy network signal "
+    "research policy design customer product future risk trust workflow "
+    "benchmark latency audio story question answer example pattern"
+).split()
+
+# ----------------------------------------------------------------------
+# Scripts
+# ----------------------------------------------------------------------
+
+
+def make_script(
+    turns: int,
+    words_per_turn: int = 30,
+    speakers: Sequence[str] = ("Alex", "Jamie"),
+    voices: Sequence[str] = ("kore", "puck"),
+    seed: int = 0,
+) -> PodcastScript:
+    """
+    A deterministic script of roughly turns * words_per_turn words.
+    """
+    rng = random.Random(seed)
+    dialogue = []
+    for index in range(turns):
+        words = [rng.choice(WORDS) for _ in range(words_per_turn)]
+        dialogue.append({
+            "speaker": speakers[index % len(speakers)],
+            "text": " ".join(words).capitalize() + ".",
+        })
+    return PodcastScript(
+        title=f"Synthetic episode {seed}",
+        description="Generated offline for benchmarking.",
+        speakers=[
+            {"name": name, "voice_id": voice} for name, voice in zip(speakers, voices)
+        ],
+        dialogue=dialogue,
+    )
+
+# ----------------------------------------------------------------------
+# Gemini Text Endpoint
+# ----------------------------------------------------------------------
+
+
+class OfflineResponse:
+    status_code = 200
+
+    def __init__(self, body: dict):
+        self._body = body
+        self.text = json.dumps(body)
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def json(self) -> dict:
+        return self._body
+
+
+@contextmanager
+def offline_gemini(
+    latency: float = 0.0,
+    turns: int = 24,
+    words_per_turn: int = 30,
+) -> Iterator[List[dict]]:
+    """
+    Patch the HTTP session run_gemini_agent posts through with a
+    stand-in that sleeps for latency seconds and returns a generated
+    script.
+
+    Yields:
+        List that collects every posted payload
+    """
+    calls: List[dict] = []
+    session = http_session(gemini_client.BASE_API_URL)
+
+    def post(url, headers=None, json=None, timeout=None):
+        calls.append(json)
+        time.sleep(latency)
+        script = make_script(turns, words_per_turn, seed=len(calls))
+        return OfflineResponse({
+            "candidates": [{"content": {"parts": [{"text": script.model_dump_json()}]}}],
+            "usageMetadata": {
+                "promptTokenCount": len(str(json)) // 4,
+                "candidatesTokenCount": len(script.model_dump_json()) // 4,
+                "totalTokenCount": (len(str(json)) + len(script.model_dump_json())) // 4,
+            },
+            "modelVersion": "offline",
+        })
+
+    # Shadows Session.post on this instance only
+    session.post = post
+    try:
+        yield calls
+    finally:
+        del session.post
+
+# ----------------------------------------------------------------------
+# Gemini TTS Endpoint
+# ----------------------------------------------------------------------
+
+
+def offline_tts(latency: float = 0.0, jitter: float = 0.0, seed: int = 0) -> SyntheticMultiSpeakerTTS:
+    return SyntheticMultiSpeakerTTS(SyntheticTTSConfig(latency=latency, jitter=jitter, seed=seed))
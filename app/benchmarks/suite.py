@@ -0,0 +1,384 @@
+"""
+Benchmark suite: schema, payload, validation, WAV I/O and end-to-end.
+
+Micro-benchmarks time single functions at representative sizes; the
+macro-benchmark runs episodes through the full AudioPipeline with the
+offline Gemini stand-ins from benchmarks.offline, so no network or API
+key is needed. Each run is compared against a baseline file and
+regressions beyond --threshold are flagged.
+
+Usage (from app/):
+    python -m benchmarks.suite                    # run, compare with baseline.json
+    python -m benchmarks.suite --quick            # skip 60-minute cases, fewer repeats
+    python -m benchmarks.suite --only wav --save  # run a subset and update the baseline
+    python -m benchmarks.suite --check            # exit 1 on regressions (CI)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+# Imported first: it sets the placeholder API key core.gemini_client needs
+from benchmarks.offline import make_script, offline_gemini, offline_tts
+
+from audio.google_tts import MultiSpeakerTTS
+from audio.google_tts_mult import PodcastTTSBuilder
+from audio.postprocess import PCM_RATE, AudioPostProcessor
+from core.gemini_client import build_gemini_payload
+from prompts.podcast import podcast_system_instruction
+from schemas.podcast import PodcastScript
+from services.audio_service import AudioPipeline, EpisodeRequest
+from utils.schema_adapter import pydantic_to_gemini_schema
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Relative slowdown of the median beyond which a result is a regression
+DEFAULT_THRESHOLD = 0.15
+
+WAV_MINUTES = (1, 10, 60)
+SCRIPT_TURNS = (100, 1000, 10000)
+
+# Seconds of audio per temp turn file in the merge benchmark
+MERGE_TURN_SECONDS = 15
+
+# ----------------------------------------------------------------------
+# Harness
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class Result:
+    name: str
+    seconds: float
+    runs: int
+    # Extra metrics (throughput, percentiles); higher/lower-is-better is
+    # encoded in the name suffix: *_per_s higher, *_s lower
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"seconds": self.seconds, "runs": self.runs, **self.metrics}
+
+
+def measure(
+    fn: Callable[[], Any],
+    repeat: int,
+    setup: Optional[Callable[[], Any]] = None,
+    warmup: int = 1,
+) -> List[float]:
+    """
+    Time fn() repeat times (after warmup runs); setup() runs untimed
+    before each call.
+    """
+    times = []
+    for index in range(warmup + repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        if index >= warmup:
+            times.append(elapsed)
+    return times
+
+
+def summarize(name: str, times: List[float], **metrics: float) -> Result:
+    return Result(name, statistics.median(times), len(times), metrics)
+
+
+def make_pcm(seconds: float) -> bytes:
+    # Content doesn't matter for I/O; a repeating ramp avoids zero pages
+    pattern = bytes(range(256)) * 375
+    total = int(seconds * PCM_RATE) * 2
+    return (pattern * (total // len(pattern) + 1))[:total]
+
+# ----------------------------------------------------------------------
+# Micro-Benchmarks
+# ----------------------------------------------------------------------
+
+
+def bench_schema(repeat: int) -> List[Result]:
+    times = measure(lambda: pydantic_to_gemini_schema(PodcastScript), repeat * 20)
+    return [summarize("schema.convert", times)]
+
+
+def bench_payload(repeat: int) -> List[Result]:
+    schema = pydantic_to_gemini_schema(PodcastScript)
+    instruction = podcast_system_instruction(2, ["kore", "puck"])
+    results = []
+    for chars in (5_000, 100_000):
+        input_text = ("lorem ipsum dolor sit amet " * (chars // 27 + 1))[:chars]
+        times = measure(
+            lambda: build_gemini_payload(instruction, input_text, schema), repeat * 20
+        )
+        results.append(summarize(f"payload.build[{chars // 1000}k chars]", times))
+        payload = build_gemini_payload(instruction, input_text, schema)
+        # requests serialises the body; include it as it scales with input
+        times = measure(lambda: json.dumps(payload), repeat * 5)
+        results.append(summarize(f"payload.serialize[{chars // 1000}k chars]", times))
+    return results
+
+
+def bench_validate(repeat: int) -> List[Result]:
+    results = []
+    for turns in SCRIPT_TURNS:
+        raw = make_script(turns).model_dump_json()
+        runs = max(repeat * 1000 // turns, 3)
+        times = measure(lambda: PodcastScript.model_validate_json(raw), runs)
+        median = statistics.median(times)
+        results.append(summarize(
+            f"script.validate[{turns} turns]", times, turns_per_s=turns / median
+        ))
+    return results
+
+
+def bench_save_wave(repeat: int, minutes: List[int], workdir: str) -> List[Result]:
+    results = []
+    path = os.path.join(workdir, "save.wav")
+    for length in minutes:
+        pcm = make_pcm(length * 60)
+        times = measure(
+            lambda: MultiSpeakerTTS.save_wave_file(path, pcm),
+            repeat if length < 60 else 1,
+        )
+        median = statistics.median(times)
+        results.append(summarize(
+            f"wav.save[{length} min]", times, x_realtime_per_s=length * 60 / median
+        ))
+        os.remove(path)
+    return results
+
+
+def bench_merge_wavs(repeat: int, minutes: List[int], workdir: str) -> List[Result]:
+    results = []
+    turn_pcm = make_pcm(MERGE_TURN_SECONDS)
+    builder = PodcastTTSBuilder({})
+    for length in minutes:
+        turn_dir = os.path.join(workdir, f"turns-{length}")
+        os.makedirs(turn_dir, exist_ok=True)
+        files = []
+        for index in range(length * 60 // MERGE_TURN_SECONDS):
+            path = os.path.join(turn_dir, f"{index:05d}.wav")
+            MultiSpeakerTTS.save_wave_file(path, turn_pcm)
+            files.append(path)
+
+        output = os.path.join(workdir, "merged.wav")
+        times = measure(
+            lambda: builder._merge_wavs(output, files), repeat if length < 60 else 1
+        )
+        median = statistics.median(times)
+        results.append(summarize(
+            f"wav.merge[{length} min]", times, x_realtime_per_s=length * 60 / median
+        ))
+        shutil.rmtree(turn_dir)
+        os.remove(output)
+    return results
+
+# ----------------------------------------------------------------------
+# Macro-Benchmark
+# ----------------------------------------------------------------------
+
+
+def bench_pipeline(
+    episodes: int,
+    turns: int,
+    script_latency: float,
+    tts_latency: float,
+    workdir: str,
+) -> List[Result]:
+    """
+    Episodes through generate → ... → encode, with run_gemini_agent
+    posting to the offline script endpoint and synthetic TTS.
+    """
+    latencies: Dict[str, float] = {}
+    started: Dict[str, float] = {}
+
+    def on_event(episode_id: str, event: str, data: dict) -> None:
+        if event == "encoded":
+            latencies[episode_id] = time.perf_counter() - started[episode_id]
+
+    pipeline = AudioPipeline(
+        tts=offline_tts(latency=tts_latency, jitter=tts_latency / 2),
+        postprocessor=AudioPostProcessor(),
+        on_event=on_event,
+    )
+    requests = [
+        EpisodeRequest(
+            episode_id=f"bench-{index}",
+            output_file=os.path.join(workdir, f"bench-{index}.wav"),
+            input_text=f"Offline benchmark document {index}",
+            speaker_voices=["kore", "puck"],
+        )
+        for index in range(episodes)
+    ]
+
+    with offline_gemini(latency=script_latency, turns=turns):
+        start = time.perf_counter()
+        for request in requests:
+            started[request.episode_id] = start
+        results = asyncio.run(pipeline.run(requests))
+        wall = time.perf_counter() - start
+
+    failed = [result for result in results if not result.ok]
+    if failed:
+        raise RuntimeError(f"{len(failed)} benchmark episodes failed: {failed[0].error}")
+
+    audio_seconds = sum(result.duration_seconds for result in results)
+    ordered = sorted(latencies.values())
+    return [Result(
+        f"pipeline.e2e[{episodes}x{turns} turns]",
+        wall,
+        1,
+        {
+            "episodes_per_s": episodes / wall,
+            "x_realtime_per_s": audio_seconds / wall,
+            "latency_p50_s": ordered[len(ordered) // 2],
+            "latency_p95_s": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        },
+    )]
+
+# ----------------------------------------------------------------------
+# Baseline
+# ----------------------------------------------------------------------
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: List[Result], previous: Dict[str, Any]) -> None:
+    merged = dict(previous.get("results", {}))
+    merged.update({result.name: result.to_dict() for result in results})
+    payload = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": dict(sorted(merged.items())),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def compare(
+    results: List[Result],
+    baseline: Dict[str, Any],
+    threshold: float,
+) -> List[str]:
+    """
+    Print each result against the baseline.
+
+    Returns:
+        Names of results that regressed beyond threshold
+    """
+    previous = baseline.get("results", {})
+    regressions = []
+    print(f"{'benchmark':<34} {'median':>10} {'baseline':>10} {'change':>8}")
+    for result in results:
+        line = f"{result.name:<34} {_fmt(result.seconds):>10}"
+        old = previous.get(result.name)
+        if old:
+            change = result.seconds / old["seconds"] - 1
+            flag = ""
+            if change > threshold:
+                flag = " ⚠️ slower"
+                regressions.append(result.name)
+            elif change < -threshold:
+                flag = " 🚀 faster"
+            line += f" {_fmt(old['seconds']):>10} {change * 100:+7.1f}%{flag}"
+        else:
+            line += f" {'-':>10} {'new':>8}"
+        print(line)
+
+        for metric, value in result.metrics.items():
+            metric_line = f"    {metric:<30} {value:>10.3f}"
+            if old and metric in old:
+                metric_line += f" {old[metric]:>10.3f}"
+            print(metric_line)
+    return regressions
+
+
+def _fmt(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+# ----------------------------------------------------------------------
+# Main
+# ----------------------------------------------------------------------
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Podcast generator benchmark suite")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per micro-benchmark (scaled per case)")
+    parser.add_argument("--quick", action="store_true", help="Skip 60-minute cases; fewer repeats")
+    parser.add_argument("--only", nargs="+", default=None,
+                        help="Run groups: schema payload validate wav pipeline")
+    parser.add_argument("--episodes", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=32)
+    parser.add_argument("--script-latency", type=float, default=0.5, help="Simulated script call seconds")
+    parser.add_argument("--tts-latency", type=float, default=0.3, help="Simulated TTS call seconds")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--save", action="store_true", help="Write these results into the baseline")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any benchmark regressed")
+    args = parser.parse_args()
+
+    repeat = 2 if args.quick else args.repeat
+    minutes = [m for m in WAV_MINUTES if not (args.quick and m >= 60)]
+    groups = set(args.only or ["schema", "payload", "validate", "wav", "pipeline"])
+
+    results: List[Result] = []
+    workdir = tempfile.mkdtemp(prefix="podcast-bench-")
+    try:
+        if "schema" in groups:
+            results += bench_schema(repeat)
+        if "payload" in groups:
+            results += bench_payload(repeat)
+        if "validate" in groups:
+            results += bench_validate(repeat)
+        if "wav" in groups:
+            results += bench_save_wave(repeat, minutes, workdir)
+            results += bench_merge_wavs(repeat, minutes, workdir)
+        if "pipeline" in groups:
+            results += bench_pipeline(
+                args.episodes, args.turns, args.script_latency, args.tts_latency, workdir
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = load_baseline(args.baseline)
+    regressions = compare(results, baseline, args.threshold)
+    if args.save:
+        save_baseline(args.baseline, results, baseline)
+        print(f"💾 Baseline updated: {args.baseline}")
+    if regressions:
+        print(f"⚠️ {len(regressions)} regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
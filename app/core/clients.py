@@ -0,0 +1,202 @@
+"""
+Process-wide API clients, shared by every TTS backend and script call.
+
+Building a genai.Client (and opening its first TLS connection) costs
+tens to hundreds of milliseconds; doing it per render or per TTS object
+was pure overhead. Clients here are created once per API key (and HTTP
+sessions once per endpoint), reused from any thread, optionally warmed
+at startup and closed at exit.
+
+The async side of a genai.Client (client.aio) keeps its connections on
+the event loop that first used it. Processes that make async calls run
+one long-lived loop (the worker's asyncio.Runner, the HTTP service), so
+sharing is safe there; don't share a client across separate
+asyncio.run() calls.
+
+    client = genai_client()                     # GEMINI_API_KEY
+    session = http_session(BASE_API_URL)        # pooled requests.Session
+    warm_up()                                   # in the background
+"""
+
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+from dotenv import load_dotenv
+from google import genai
+from requests.adapters import HTTPAdapter
+
+load_dotenv()
+
+logger = logging.getLogger("podcast-generator")
+
+T = TypeVar("T")
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+GEMINI_API_BASE_URL = os.getenv("GEMINI_API_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+
+# Pooled connections kept per HTTP endpoint; sized for the thread pool
+# that run_gemini_agent posts from
+HTTP_POOL_SIZE = int(os.getenv("PODCAST_HTTP_POOL_SIZE", "16"))
+
+# Set to 0 to skip warm-up requests (offline runs, tests)
+WARM_CLIENTS = os.getenv("PODCAST_WARM_CLIENTS", "1") != "0"
+WARM_UP_TIMEOUT = 10.0
+
+# ----------------------------------------------------------------------
+# Registry
+# ----------------------------------------------------------------------
+
+
+class ClientRegistry:
+    """
+    Thread-safe registry of long-lived clients keyed by (kind, key).
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, Hashable], Any] = {}
+        self._lock = threading.Lock()
+        self._closing = False
+
+    def get(self, kind: str, key: Hashable, factory: Callable[[], T]) -> T:
+        """
+        Return the client for (kind, key), building it on first use.
+        """
+        client = self._clients.get((kind, key))
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get((kind, key))
+            if client is None:
+                client = factory()
+                self._clients[(kind, key)] = client
+        return client
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def close_all(self) -> None:
+        """
+        Close every client that can be closed and forget them all.
+        """
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for (kind, _), client in clients.items():
+            close = getattr(client, "close", None)
+            if close is None:
+                continue
+            try:
+                close()
+            except Exception as e:
+                logger.debug(f"Closing {kind} client failed: {e}")
+
+
+registry = ClientRegistry()
+atexit.register(registry.close_all)
+
+# ----------------------------------------------------------------------
+# Clients
+# ----------------------------------------------------------------------
+
+
+def genai_client(api_key: Optional[str] = None) -> genai.Client:
+    """
+    Shared Gemini SDK client for an API key (GEMINI_API_KEY by default).
+    """
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY is missing")
+    return registry.get("genai", api_key, lambda: genai.Client(api_key=api_key))
+
+
+def _endpoint(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def http_session(url: str = GEMINI_API_BASE_URL) -> requests.Session:
+    """
+    Shared requests.Session with a connection pool for url's endpoint
+    (scheme and host), so calls reuse open TLS connections.
+    """
+    endpoint = _endpoint(url)
+
+    def build() -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount(f"{endpoint}/", adapter)
+        return session
+
+    return registry.get("http", endpoint, build)
+
+
+def shared(kind: str, key: Hashable, factory: Callable[[], T]) -> T:
+    """
+    Shared instance of any other client (e.g. an ElevenLabs SDK client).
+    """
+    return registry.get(kind, key, factory)
+
+# ----------------------------------------------------------------------
+# Warm-up
+# ----------------------------------------------------------------------
+
+
+def _warm(gemini_http: bool, gemini_sdk: bool) -> None:
+    api_key = os.getenv("GEMINI_API_KEY")
+    if gemini_http:
+        try:
+            # Any response will do; the point is the open connection
+            http_session(GEMINI_API_BASE_URL).get(
+                f"{GEMINI_API_BASE_URL}/models",
+                params={"pageSize": 1},
+                headers={"x-goog-api-key": api_key or ""},
+                timeout=WARM_UP_TIMEOUT,
+            )
+        except requests.RequestException as e:
+            logger.debug(f"HTTP warm-up failed: {e}")
+    if gemini_sdk and api_key:
+        try:
+            genai_client(api_key).models.list(config={"page_size": 1})
+        except Exception as e:
+            logger.debug(f"Gemini client warm-up failed: {e}")
+
+
+def warm_up(
+    gemini_http: bool = True,
+    gemini_sdk: bool = True,
+    background: bool = True,
+) -> Optional[threading.Thread]:
+    """
+    Build the shared clients and open their first connections, so the
+    first real request doesn't pay for DNS, TLS and client setup.
+    Failures are logged and ignored. A no-op when PODCAST_WARM_CLIENTS=0.
+
+    Args:
+        gemini_http: Warm the pooled session used for script generation
+        gemini_sdk: Warm the SDK client used for TTS
+        background: Run in a daemon thread (returned) instead of blocking
+    """
+    if not WARM_CLIENTS:
+        return None
+    if not background:
+        _warm(gemini_http, gemini_sdk)
+        return None
+    thread = threading.Thread(
+        target=_warm, args=(gemini_http, gemini_sdk), name="client-warm-up", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def close_all() -> None:
+    """
+    Close every shared client (also runs at exit).
+    """
+    registry.close_all()
@@ -2,11 +2,14 @@ import os
 import json
 import asyncio
 import logging
+import time
 import requests
 from typing import Type, TypeVar, Optional, Any, Dict, Union
 from schemas.podcast import PodcastScript
 from pydantic import BaseModel, ValidationError
 from utils.schema_adapter import pydantic_to_gemini_schema
+from core.clients import GEMINI_API_BASE_URL, http_session
+from core.tracing import set_attributes, span, traced, tracer
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -26,8 +29,41 @@ if not GEMINI_API_KEY:
         "GEMINI_API_KEY not found. "
         "Ensure .env exists at project root and is loaded."
     )
-BASE_API_URL = "https://generativelanguage.googleapis.com/v1beta"
+# Overridable (GEMINI_API_BASE_URL) so load tests can point script generation at a local stand-in
+BASE_API_URL = GEMINI_API_BASE_URL
 
+def build_gemini_payload(
+    instruction: str,
+    input_text: str,
+    response_schema: Dict[str, Any],
+    temperature: float = 0.7,
+) -> Dict[str, Any]:
+    """
+    Build the generateContent request body: the agent prompt goes in
+    'system_instruction' and the user input in 'contents'.
+    """
+    return {
+        "system_instruction": {
+            "parts": [{"text": instruction}]
+        },
+        "contents": [{
+            "role": "user",
+            "parts": [{"text": input_text}]
+        }],
+        "tools": [
+            {
+                "google_search": {}
+            }
+        ],
+        "generationConfig": {
+            "response_mime_type": "application/json",
+            "response_schema": response_schema,
+            "temperature": temperature
+        }
+    }
+
+
+@traced("gemini.agent")
 async def run_gemini_agent(
     instruction: Union[str, Any],
     user_input: Any,
@@ -59,6 +95,8 @@ async def run_gemini_agent(
         Optional[T]: Parsed instance of output_type, or None if generation/validation fails after all retries.
     """
     
+    set_attributes(model=model)
+
     # Handle Agent object passed as instruction
     real_instruction = instruction
     real_output_type = output_type
@@ -74,12 +112,14 @@ async def run_gemini_agent(
         return None
 
     # 1. Convert user_input to string format
-    if isinstance(user_input, BaseModel):
-        input_text = user_input.model_dump_json(indent=2)
-    elif isinstance(user_input, dict):
-        input_text = json.dumps(user_input, indent=2)
-    else:
-        input_text = str(user_input)
+    with span("gemini.prompt"):
+        if isinstance(user_input, BaseModel):
+            input_text = user_input.model_dump_json(indent=2)
+        elif isinstance(user_input, dict):
+            input_text = json.dumps(user_input, indent=2)
+        else:
+            input_text = str(user_input)
+    set_attributes(input_chars=len(input_text))
 
     # 2. Generate Gemini-compatible schema from Pydantic model
     try:
@@ -99,35 +139,23 @@ async def run_gemini_agent(
     }
 
     # 4. Build Payload
-    # We use 'system_instruction' for the agent prompt and 'contents' for the user input
-    payload = {
-        "system_instruction": {
-            "parts": [{"text": real_instruction}]
-        },
-        "contents": [{
-            "role": "user",
-            "parts": [{"text": input_text}]
-        }],
-         "tools": [
-      {
-        "google_search": {}
-      }
-    ],
-        "generationConfig": {
-            "response_mime_type": "application/json",
-            "response_schema": response_schema,
-            "temperature": temperature
-        }
-    }
+    payload = build_gemini_payload(real_instruction, input_text, response_schema, temperature)
 
     # 5. Execute API Call with Retry Logic
     for attempt in range(retries + 1):
         json_content = None # To hold raw response for error logging
         try:
             # logger.info(f"Calling Gemini API model: {model} (Attempt {attempt + 1}/{retries + 1})...")
-            response = await asyncio.to_thread(
-                requests.post, generate_url, headers=headers, json=payload, timeout=300
-            )
+            submitted = time.perf_counter()
+
+            def post():
+                # Time spent waiting for a thread-pool slot, then the call
+                tracer.record("gemini.threadpool_wait", submitted, time.perf_counter())
+                with span("gemini.http", attempt=attempt + 1):
+                    # Shared pooled session: no new connection per call
+                    return http_session(BASE_API_URL).post(generate_url, headers=headers, json=payload, timeout=300)
+
+            response = await asyncio.to_thread(post)
             response.raise_for_status()
             
             response_data = response.json()
@@ -145,7 +173,8 @@ async def run_gemini_agent(
             json_content = parts[0].get("text", "")
             
             # 6. Validate and Parse Result
-            result = real_output_type.model_validate_json(json_content)
+            with span("gemini.validate", chars=len(json_content)):
+                result = real_output_type.model_validate_json(json_content)
 
             model_version = response_data.get('modelVersion', model)  # Fallback to param
             usage_metadata = response_data.get("usageMetadata", {})
@@ -164,7 +193,8 @@ async def run_gemini_agent(
             if attempt < retries:
                 wait_time = initial_backoff ** attempt
                 logger.warning(f"Gemini agent execution failed (attempt {attempt+1}/{retries+1}): {e}. Retrying in {wait_time}s...")
-                await asyncio.sleep(wait_time)
+                with span("gemini.backoff", attempt=attempt + 1):
+                    await asyncio.sleep(wait_time)
             else:
                 logger.error(f"Gemini agent execution failed after {retries+1} attempts. Error: {e}")
                 # Log detailed error info for debugging
@@ -178,7 +208,8 @@ async def run_gemini_agent(
             if attempt < retries:
                 wait_time = initial_backoff ** attempt
                 logger.warning(f"Unexpected error in Gemini agent (attempt {attempt+1}/{retries+1}): {e}. Retrying in {wait_time}s...")
-                await asyncio.sleep(wait_time)
+                with span("gemini.backoff", attempt=attempt + 1):
+                    await asyncio.sleep(wait_time)
             else:
                 logger.error(f"Unexpected error in Gemini agent execution: {e}")
                 return None
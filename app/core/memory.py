@@ -0,0 +1,295 @@
+"""
+Optional memory instrumentation: peak RSS and Python allocations per
+stage.
+
+Profiling is off unless PODCAST_MEMORY_PROFILE is set (or enable() is
+called); a disabled stage costs one attribute check. When enabled:
+
+- A background thread samples the process RSS every SAMPLE_INTERVAL
+  seconds; each stage records the highest sample seen while it ran.
+- tracemalloc tracks Python allocations; each stage records the traced
+  peak while it ran. The peak is process-wide, so stages running
+  concurrently share it; the RSS start/end delta is the better per-stage
+  signal there.
+- Whenever a stage ends at a new traced high-water mark, a tracemalloc
+  snapshot is taken and its top allocation sites are kept, so the lines
+  holding the most memory at the worst moment are in the report.
+
+Stage figures are also attached to the enclosing tracing span, so they
+show up in Chrome traces. The report is written at exit as JSON to
+PODCAST_MEMORY_PROFILE ("{pid}" is replaced by the process id):
+
+    PODCAST_MEMORY_PROFILE=.cache/memory-{pid}.json python -m services.worker run
+    python -m core.memory .cache/memory-1234.json
+
+Instrument code with:
+    with memory_stage("pipeline.encode", job=episode_id):
+        ...
+"""
+
+import argparse
+import atexit
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import psutil
+
+from core.tracing import set_attributes
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+PROFILE_FILE = os.getenv("PODCAST_MEMORY_PROFILE")
+
+SAMPLE_INTERVAL = float(os.getenv("PODCAST_MEMORY_SAMPLE_INTERVAL", "0.05"))
+
+# Stack depth recorded by tracemalloc and allocation sites kept per snapshot
+TRACEMALLOC_FRAMES = 1
+TOP_ALLOCATIONS = 10
+
+# Stage records kept in memory before the oldest are dropped
+MAX_RECORDS = 50_000
+
+MIB = 1024 * 1024
+
+
+def current_rss() -> int:
+    """
+    Resident set size of this process, in bytes.
+    """
+    return psutil.Process().memory_info().rss
+
+# ----------------------------------------------------------------------
+# Profiler
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class StageMemory:
+    name: str
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    rss_start: int = 0
+    rss_end: int = 0
+    rss_peak: int = 0
+    # tracemalloc: traced bytes at start and the peak while the stage ran
+    traced_start: int = 0
+    traced_peak: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rss_delta(self) -> int:
+        return self.rss_end - self.rss_start
+
+
+class MemoryProfiler:
+    """
+    Records peak RSS and traced Python allocations per stage.
+    """
+
+    def __init__(self, enabled: bool = False, sample_interval: float = SAMPLE_INTERVAL):
+        self.enabled = False
+        self.sample_interval = sample_interval
+        self.records: List[StageMemory] = []
+        self.top_allocations: List[Dict[str, Any]] = []
+        self.high_water = 0
+        self._open: Dict[int, StageMemory] = {}
+        self._lock = threading.Lock()
+        self._process = psutil.Process()
+        self._sampler: Optional[threading.Thread] = None
+        if enabled:
+            self.start()
+
+    def start(self) -> "MemoryProfiler":
+        if self.enabled:
+            return self
+        self.enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._sampler = threading.Thread(
+            target=self._sample, name="memory-sampler", daemon=True
+        )
+        self._sampler.start()
+        return self
+
+    def stop(self) -> None:
+        self.enabled = False
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        tracemalloc.stop()
+
+    def _sample(self) -> None:
+        while self.enabled:
+            rss = self._process.memory_info().rss
+            with self._lock:
+                for record in self._open.values():
+                    record.rss_peak = max(record.rss_peak, rss)
+            time.sleep(self.sample_interval)
+
+    @contextmanager
+    def stage(self, name: str, **attributes: Any) -> Iterator[Optional[StageMemory]]:
+        if not self.enabled:
+            yield None
+            return
+
+        rss = self._process.memory_info().rss
+        traced, _ = tracemalloc.get_traced_memory()
+        record = StageMemory(
+            name=name,
+            attributes=attributes,
+            rss_start=rss,
+            rss_peak=rss,
+            traced_start=traced,
+        )
+        started = time.perf_counter()
+        with self._lock:
+            self._open[id(record)] = record
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - started
+            record.rss_end = self._process.memory_info().rss
+            _, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                del self._open[id(record)]
+                record.rss_peak = max(record.rss_peak, record.rss_end)
+                record.traced_peak = peak
+                # Peak is process-wide; reset it only once nothing else is measuring
+                if not self._open:
+                    tracemalloc.reset_peak()
+                self.records.append(record)
+                if len(self.records) > MAX_RECORDS:
+                    del self.records[: len(self.records) - MAX_RECORDS]
+                new_high = peak > self.high_water
+                if new_high:
+                    self.high_water = peak
+            if new_high:
+                self.snapshot(name)
+            set_attributes(
+                rss_peak_mib=round(record.rss_peak / MIB, 1),
+                traced_peak_mib=round(record.traced_peak / MIB, 1),
+            )
+
+    def snapshot(self, label: str, limit: int = TOP_ALLOCATIONS) -> List[Dict[str, Any]]:
+        """
+        Keep the top allocation sites currently held, by size.
+        """
+        if not tracemalloc.is_tracing():
+            return []
+        stats = tracemalloc.take_snapshot().statistics("lineno")[:limit]
+        top = [
+            {"site": str(stat.traceback), "size": stat.size, "count": stat.count}
+            for stat in stats
+        ]
+        with self._lock:
+            self.top_allocations = [{"label": label, "sites": top}]
+        return top
+
+    def clear(self) -> None:
+        with self._lock:
+            self.records = []
+            self.top_allocations = []
+            self.high_water = 0
+
+    # ------------------------------------------------------------------
+    # Report
+    # ------------------------------------------------------------------
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            records = list(self.records)
+            top = list(self.top_allocations)
+        return {
+            "pid": os.getpid(),
+            "rss_peak": max((r.rss_peak for r in records), default=0),
+            "stages": summarize_stages([asdict(r) for r in records]),
+            "records": [asdict(r) for r in records],
+            "top_allocations": top,
+        }
+
+    def export(self, path: str) -> str:
+        path = path.replace("{pid}", str(os.getpid()))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f)
+        os.replace(tmp_path, path)
+        return path
+
+
+def summarize_stages(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    Per stage name: runs, worst RSS peak, worst traced peak and the
+    largest RSS growth across one run, in MiB.
+    """
+    summary: Dict[str, Dict[str, float]] = {}
+    for record in records:
+        entry = summary.setdefault(record["name"], {
+            "runs": 0, "rss_peak_mib": 0.0, "traced_peak_mib": 0.0, "rss_growth_mib": 0.0,
+        })
+        entry["runs"] += 1
+        entry["rss_peak_mib"] = max(entry["rss_peak_mib"], record["rss_peak"] / MIB)
+        entry["traced_peak_mib"] = max(entry["traced_peak_mib"], record["traced_peak"] / MIB)
+        entry["rss_growth_mib"] = max(
+            entry["rss_growth_mib"], (record["rss_end"] - record["rss_start"]) / MIB
+        )
+    return dict(sorted(summary.items(), key=lambda item: -item[1]["rss_peak_mib"]))
+
+
+profiler = MemoryProfiler(enabled=bool(PROFILE_FILE))
+
+if PROFILE_FILE:
+    atexit.register(lambda: profiler.records and profiler.export(PROFILE_FILE))
+
+
+def enable(path: Optional[str] = None) -> MemoryProfiler:
+    """
+    Turn profiling on at runtime, exporting to path at exit if given.
+    """
+    profiler.start()
+    if path:
+        atexit.register(lambda: profiler.export(path))
+    return profiler
+
+
+def memory_stage(name: str, **attributes: Any):
+    """
+    Context manager recording the memory profile of a block.
+    """
+    return profiler.stage(name, **attributes)
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarise podcast memory profiles")
+    parser.add_argument("profile_files", nargs="+")
+    args = parser.parse_args()
+
+    for path in args.profile_files:
+        with open(path, encoding="utf-8") as f:
+            report = json.load(f)
+        print(f"\n🧠 {path} (pid {report['pid']}): peak RSS {report['rss_peak'] / MIB:.0f} MiB")
+        print("   stage                          runs  rss peak  traced peak  rss growth")
+        for name, stage in report["stages"].items():
+            print(
+                f"   {name:<30} {stage['runs']:>4}  {stage['rss_peak_mib']:>6.0f} MiB"
+                f"  {stage['traced_peak_mib']:>7.0f} MiB  {stage['rss_growth_mib']:>6.0f} MiB"
+            )
+        for snapshot in report["top_allocations"]:
+            print(f"   largest allocations at the high-water mark ({snapshot['label']}):")
+            for site in snapshot["sites"]:
+                print(f"     {site['size'] / MIB:8.1f} MiB  {site['count']:>7}  {site['site']}")
+
+
+if __name__ == "__main__":
+    main()
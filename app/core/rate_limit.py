@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+
+class AsyncRateLimiter:
+    """
+    Space out calls so at most `rate_per_minute` start in any minute.
+
+    Calls are released evenly (one every 60 / rate_per_minute seconds)
+    rather than in bursts, which keeps us clear of per-minute API quotas
+    while still letting concurrent workers overlap their requests.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.interval = 60.0 / rate_per_minute
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def __aenter__(self) -> "AsyncRateLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None
@@ -0,0 +1,381 @@
+"""
+Lightweight tracing spans with a Chrome trace-event exporter.
+
+Spans nest through contextvars, so they follow a job across awaits,
+asyncio tasks and asyncio.to_thread. Attributes set with trace_context()
+(job id, segment index, ...) are inherited by every span opened inside
+it, which is how a TTS call deep inside the pipeline is tied back to its
+episode.
+
+Tracing is off unless PODCAST_TRACE_FILE is set (or enable() is called);
+disabled spans cost one attribute check. When enabled, the trace is
+written at exit as JSON that chrome://tracing, Perfetto
+(ui.perfetto.dev) and speedscope open directly. "{pid}" in the path is
+replaced by the process id, so worker processes don't overwrite each
+other.
+
+    PODCAST_TRACE_FILE=.cache/trace-{pid}.json python -m services.batch docs/ --voices kore puck
+    python -m core.tracing .cache/trace-1234.json      # critical path per job
+
+Instrument code with:
+    with span("tts.synthesize", model=tts_model):
+        ...
+
+    @traced("schema.convert")
+    def pydantic_to_gemini_schema(...): ...
+"""
+
+import argparse
+import asyncio
+import atexit
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+TRACE_FILE = os.getenv("PODCAST_TRACE_FILE")
+
+# Spans kept in memory before the oldest are dropped
+MAX_SPANS = 200_000
+
+# ----------------------------------------------------------------------
+# Spans
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    span_id: int = 0
+    parent_id: Optional[int] = None
+    lane: str = ""
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "podcast_current_span", default=None
+)
+_context_attributes: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar(
+    "podcast_trace_attributes", default={}
+)
+
+
+def _lane() -> str:
+    """
+    Timeline row for the current span: the asyncio task if there is
+    one, otherwise the thread. Concurrent tasks on one thread get their
+    own rows so their spans don't overlap in the viewer.
+    """
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None:
+        return f"task {task.get_name()}"
+    return f"thread {threading.current_thread().name}"
+
+
+class Tracer:
+    """
+    Collects finished spans in memory and exports them.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+        # perf_counter is monotonic; anchor it to wall time for exports
+        self._epoch = time.time() - time.perf_counter()
+
+    def _new_id(self) -> int:
+        with self._lock:
+            self._next_id += 1
+            return self._next_id
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+            if len(self.spans) > MAX_SPANS:
+                del self.spans[: len(self.spans) - MAX_SPANS]
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        if not self.enabled:
+            yield None
+            return
+
+        parent = _current_span.get()
+        current = Span(
+            name=name,
+            start=time.perf_counter(),
+            attributes={**_context_attributes.get(), **attributes},
+            span_id=self._new_id(),
+            parent_id=parent.span_id if parent else None,
+            lane=_lane(),
+        )
+        token = _current_span.set(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current.end = time.perf_counter()
+            _current_span.reset(token)
+            self._finish(current)
+
+    def record(self, name: str, start: float, end: float, **attributes: Any) -> None:
+        """
+        Record a span measured elsewhere (e.g. time a call spent queued
+        for a thread-pool slot), as a child of the current span.
+        """
+        if not self.enabled:
+            return
+        parent = _current_span.get()
+        self._finish(Span(
+            name=name,
+            start=start,
+            end=end,
+            attributes={**_context_attributes.get(), **attributes},
+            span_id=self._new_id(),
+            parent_id=parent.span_id if parent else None,
+            lane=_lane(),
+        ))
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans = []
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        Spans as Chrome trace-event JSON ("X" complete events, in µs).
+        """
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+
+        lanes: Dict[str, int] = {}
+        events: List[Dict[str, Any]] = []
+        for span in sorted(spans, key=lambda s: s.start):
+            tid = lanes.setdefault(span.lane, len(lanes) + 1)
+            args = {key: _jsonable(value) for key, value in span.attributes.items()}
+            args["span_id"] = span.span_id
+            if span.parent_id is not None:
+                args["parent_id"] = span.parent_id
+            if span.error:
+                args["error"] = span.error
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": (self._epoch + span.start) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            })
+        for lane, tid in lanes.items():
+            events.append({
+                "name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                "args": {"name": lane},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str) -> str:
+        path = path.replace("{pid}", str(os.getpid()))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f)
+        os.replace(tmp_path, path)
+        return path
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+tracer = Tracer(enabled=bool(TRACE_FILE))
+
+if TRACE_FILE:
+    atexit.register(lambda: tracer.spans and tracer.export(TRACE_FILE))
+
+
+def enable(path: Optional[str] = None) -> Tracer:
+    """
+    Turn tracing on at runtime, exporting to path at exit if given.
+    """
+    tracer.enabled = True
+    if path:
+        atexit.register(lambda: tracer.export(path))
+    return tracer
+
+# ----------------------------------------------------------------------
+# Instrumentation Helpers
+# ----------------------------------------------------------------------
+
+
+def span(name: str, **attributes: Any):
+    """
+    Context manager timing a block as a span of the global tracer.
+    """
+    return tracer.span(name, **attributes)
+
+
+@contextmanager
+def trace_context(**attributes: Any) -> Iterator[None]:
+    """
+    Attach attributes (job, segment, ...) to every span opened inside.
+    """
+    token = _context_attributes.set({**_context_attributes.get(), **attributes})
+    try:
+        yield
+    finally:
+        _context_attributes.reset(token)
+
+
+def set_attributes(**attributes: Any) -> None:
+    """
+    Add attributes to the innermost open span.
+    """
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def traced(name: Optional[str] = None, **attributes: Any) -> Callable:
+    """
+    Decorator wrapping a sync or async function in a span.
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(span_name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+# ----------------------------------------------------------------------
+# Analysis
+# ----------------------------------------------------------------------
+
+
+def critical_path(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Walk back from the last span to finish, each time taking the span
+    that finished last before the current one started. Gaps between them
+    are reported as "(waiting)": time the job spent queued rather than
+    in any instrumented stage.
+
+    Args:
+        events: Top-level "X" events of one job (Chrome trace format)
+
+    Returns:
+        Path entries {name, start_ms, duration_ms}, earliest first
+    """
+    remaining = sorted(events, key=lambda e: e["ts"] + e["dur"])
+    if not remaining:
+        return []
+
+    origin = min(event["ts"] for event in events)
+    path: List[Dict[str, Any]] = []
+    cursor = float("inf")
+    while remaining:
+        candidates = [e for e in remaining if e["ts"] + e["dur"] <= cursor + 1]
+        if not candidates:
+            break
+        event = candidates[-1]
+        end = event["ts"] + event["dur"]
+        if cursor != float("inf") and cursor - end > 1000:
+            path.append({"name": "(waiting)", "start_ms": (end - origin) / 1000, "duration_ms": (cursor - end) / 1000})
+        path.append({"name": event["name"], "start_ms": (event["ts"] - origin) / 1000, "duration_ms": event["dur"] / 1000})
+        cursor = event["ts"]
+        remaining = [e for e in remaining if e["ts"] + e["dur"] <= cursor + 1]
+    return list(reversed(path))
+
+
+def summarize_trace(trace: Dict[str, Any], key: str = "job") -> Dict[str, Dict[str, Any]]:
+    """
+    Per job: wall time, time by span name, and the critical path through
+    the job's outermost spans.
+    """
+    events = [e for e in trace["traceEvents"] if e.get("ph") == "X"]
+    by_job: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for event in events:
+        if key in event["args"]:
+            by_job[str(event["args"][key])].append(event)
+
+    summary = {}
+    for job, job_events in by_job.items():
+        ids = {event["args"]["span_id"] for event in job_events}
+        outer = [e for e in job_events if e["args"].get("parent_id") not in ids]
+        totals: Dict[str, float] = defaultdict(float)
+        for event in job_events:
+            totals[event["name"]] += event["dur"] / 1000
+        start = min(e["ts"] for e in job_events)
+        end = max(e["ts"] + e["dur"] for e in job_events)
+        summary[job] = {
+            "wall_ms": (end - start) / 1000,
+            "span_ms": dict(sorted(totals.items(), key=lambda item: -item[1])),
+            "critical_path": critical_path(outer),
+        }
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarise a podcast trace file")
+    parser.add_argument("trace_files", nargs="+")
+    parser.add_argument("--key", default="job", help="Span attribute grouping spans into jobs")
+    args = parser.parse_args()
+
+    events: List[Dict[str, Any]] = []
+    for path in args.trace_files:
+        with open(path, encoding="utf-8") as f:
+            events.extend(json.load(f)["traceEvents"])
+
+    for job, info in summarize_trace({"traceEvents": events}, args.key).items():
+        print(f"\n🎙️ {job}: {info['wall_ms'] / 1000:.2f}s")
+        print("   critical path:")
+        for step in info["critical_path"]:
+            print(f"     {step['start_ms'] / 1000:8.2f}s  {step['duration_ms'] / 1000:7.2f}s  {step['name']}")
+        print("   time by span:")
+        for name, ms in list(info["span_ms"].items())[:10]:
+            print(f"     {ms / 1000:7.2f}s  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,669 @@
+"""
+Staged script → audio pipeline.
+
+Episodes flow through generate → validate → segment → synthesise →
+assemble → post-process → encode. Stages are connected by bounded
+asyncio queues, so a slow stage applies backpressure upstream instead of
+letting work pile up in memory, and each stage runs its own number of
+workers. Segment-level fan-out lets the TTS stage interleave segments of
+several episodes while later episodes are still being scripted and
+earlier ones are being encoded.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from typing import (
+    Any,
+    AsyncIterable,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from audio.estimator import TTSEstimator
+from audio.export import open_audio_writer
+from audio.google_tts import MultiSpeakerTTS
+from audio.postprocess import AudioPostProcessor
+from audio.providers import GeminiMultiSpeakerProvider, TTSScheduler, TTSSegment, scheduler_from_env
+from audio.spill import SPILL_THRESHOLD_BYTES, SegmentBuffer, projected_pcm_bytes, should_spill
+from audio.synthetic_tts import multi_speaker_tts_from_env
+from audio.tts_cache import TTSSegmentCache
+from core.memory import memory_stage
+from core.tracing import span, trace_context
+from core.gemini_client import build_speaker_voice_mapping, run_gemini_agent
+from prompts.podcast import podcast_system_instruction
+from schemas.podcast import PodcastScript
+from services.checkpoint import CheckpointStore
+
+logger = logging.getLogger("podcast-generator")
+
+# ----------------------------------------------------------------------
+# Generic Pipeline Engine
+# ----------------------------------------------------------------------
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    Args:
+        name: Stage name used in reports and error callbacks
+        handler: Coroutine taking one item; returns the item for the next
+            stage, None to drop it, or (with fan_out) a list of items
+        concurrency: Number of workers consuming this stage's queue
+        queue_size: Capacity of the stage's input queue
+        fan_out: Treat the handler's return value as several items
+    """
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    concurrency: int = 1
+    queue_size: int = 8
+    fan_out: bool = False
+
+
+@dataclass
+class StageStats:
+    processed: int = 0
+    emitted: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    # Time items spent queued before a worker picked them up
+    wait_seconds: float = 0.0
+    # Time workers spent blocked on a full downstream queue
+    blocked_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.busy_seconds / self.processed if self.processed else 0.0
+
+
+class Pipeline:
+    """
+    Run items through a sequence of async stages connected by bounded
+    queues. Handler exceptions are counted, reported to on_error and the
+    item is dropped; the rest of the pipeline keeps running.
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        on_error: Optional[Callable[[str, Any, BaseException], None]] = None,
+    ):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self.stages = list(stages)
+        self.on_error = on_error
+        self.stats: Dict[str, StageStats] = {}
+        self.wall_seconds = 0.0
+
+    async def _worker(
+        self,
+        stage: Stage,
+        stats: StageStats,
+        inbox: asyncio.Queue,
+        outbox: Optional[asyncio.Queue],
+        results: List[Any],
+    ) -> None:
+        while True:
+            entry = await inbox.get()
+            if entry is _DONE:
+                return
+            item, queued_at = entry
+
+            started = time.perf_counter()
+            stats.wait_seconds += started - queued_at
+            try:
+                output = await stage.handler(item)
+            except Exception as e:
+                stats.errors += 1
+                logger.warning(f"Pipeline stage '{stage.name}' failed: {e}")
+                if self.on_error is not None:
+                    self.on_error(stage.name, item, e)
+                continue
+            finally:
+                elapsed = time.perf_counter() - started
+                stats.processed += 1
+                stats.busy_seconds += elapsed
+                stats.max_seconds = max(stats.max_seconds, elapsed)
+
+            outputs = output if stage.fan_out else [output]
+            for value in outputs:
+                if value is None:
+                    continue
+                stats.emitted += 1
+                if outbox is None:
+                    results.append(value)
+                    continue
+                put_at = time.perf_counter()
+                await outbox.put((value, time.perf_counter()))
+                stats.blocked_seconds += time.perf_counter() - put_at
+
+    async def run(self, source: Union[Iterable[Any], AsyncIterable[Any]]) -> List[Any]:
+        """
+        Feed every item from source through all stages.
+
+        Returns:
+            Items emitted by the last stage, in completion order
+        """
+        started = time.perf_counter()
+        self.stats = {stage.name: StageStats() for stage in self.stages}
+        queues = [asyncio.Queue(stage.queue_size) for stage in self.stages]
+        results: List[Any] = []
+
+        workers = []
+        for index, stage in enumerate(self.stages):
+            outbox = queues[index + 1] if index + 1 < len(self.stages) else None
+            workers.append([
+                asyncio.create_task(
+                    self._worker(stage, self.stats[stage.name], queues[index], outbox, results)
+                )
+                for _ in range(stage.concurrency)
+            ])
+
+        async def feed() -> None:
+            source_stats = self.stats[self.stages[0].name]
+            if hasattr(source, "__aiter__"):
+                async for item in source:
+                    put_at = time.perf_counter()
+                    await queues[0].put((item, time.perf_counter()))
+                    source_stats.blocked_seconds += time.perf_counter() - put_at
+            else:
+                for item in source:
+                    await queues[0].put((item, time.perf_counter()))
+            for _ in range(self.stages[0].concurrency):
+                await queues[0].put(_DONE)
+
+        async def close(index: int) -> None:
+            # Once every worker of a stage exits, shut down the next stage
+            await asyncio.gather(*workers[index])
+            if index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1].concurrency):
+                    await queues[index + 1].put(_DONE)
+
+        try:
+            await asyncio.gather(feed(), *(close(i) for i in range(len(self.stages))))
+        finally:
+            for task in (t for stage_workers in workers for t in stage_workers):
+                task.cancel()
+            self.wall_seconds = time.perf_counter() - started
+        return results
+
+    def report(self) -> Dict[str, dict]:
+        return {
+            name: {**asdict(stats), "mean_seconds": stats.mean_seconds}
+            for name, stats in self.stats.items()
+        }
+
+    def format_report(self) -> str:
+        lines = [
+            f"{'stage':<12} {'items':>6} {'errors':>6} {'busy s':>9} "
+            f"{'mean s':>8} {'max s':>8} {'queued s':>9} {'blocked s':>9}"
+        ]
+        for name, stats in self.stats.items():
+            lines.append(
+                f"{name:<12} {stats.processed:>6} {stats.errors:>6} "
+                f"{stats.busy_seconds:>9.2f} {stats.mean_seconds:>8.3f} "
+                f"{stats.max_seconds:>8.3f} {stats.wait_seconds:>9.2f} "
+                f"{stats.blocked_seconds:>9.2f}"
+            )
+        lines.append(f"wall time: {self.wall_seconds:.2f}s")
+        return "\n".join(lines)
+
+# ----------------------------------------------------------------------
+# Episode Pipeline
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class EpisodeRequest:
+    """
+    One episode to produce. If script is given, generation is skipped.
+    """
+    episode_id: str
+    output_file: str
+    input_text: str = ""
+    speaker_voices: List[str] = field(default_factory=list)
+    script: Optional[PodcastScript] = None
+    output_format: str = "wav"
+
+
+@dataclass
+class EpisodeResult:
+    episode_id: str
+    output_file: Optional[str]
+    script: Optional[PodcastScript] = None
+    speaker_voice_map: Dict[str, str] = field(default_factory=dict)
+    usage: Dict[str, int] = field(default_factory=dict)
+    segments: int = 0
+    cached_segments: int = 0
+    # Synthesised speech before post-processing
+    duration_seconds: float = 0.0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class _Episode:
+    request: EpisodeRequest
+    started: float = field(default_factory=time.perf_counter)
+    script: Optional[PodcastScript] = None
+    speaker_voice_map: Dict[str, str] = field(default_factory=dict)
+    segments: List[List[Tuple[str, str]]] = field(default_factory=list)
+    pcm: Optional[SegmentBuffer] = None
+    remaining: int = 0
+    cached_segments: int = 0
+    rendered_bytes: int = 0
+    usage: Dict[str, int] = field(default_factory=dict)
+    blocks: Iterable[bytes] = field(default_factory=list)
+    finished: Optional[float] = None
+    error: Optional[str] = None
+
+    def result(self) -> EpisodeResult:
+        finished = self.finished or time.perf_counter()
+        return EpisodeResult(
+            episode_id=self.request.episode_id,
+            output_file=None if self.error else self.request.output_file,
+            script=self.script,
+            speaker_voice_map=self.speaker_voice_map,
+            usage=self.usage,
+            segments=len(self.segments),
+            cached_segments=self.cached_segments,
+            duration_seconds=self.rendered_bytes / (2 * 24000),
+            seconds=finished - self.started,
+            error=self.error,
+        )
+
+
+@dataclass
+class _Segment:
+    episode: _Episode
+    index: int
+    turns: List[Tuple[str, str]]
+    pcm: Optional[bytes] = None
+    usage: Optional[dict] = None
+
+
+DEFAULT_CONCURRENCY = {
+    "generate": 2,
+    "validate": 2,
+    "segment": 1,
+    "synthesize": 4,
+    "assemble": 1,
+    "postprocess": 2,
+    "encode": 2,
+}
+
+
+class AudioPipeline:
+    """
+    Produce many episodes with the stages overlapped.
+
+    Args:
+        tts: Multi-speaker TTS backend (defaults to the env-selected one)
+        scheduler: Routes segments between TTS providers (defaults to
+            one over tts, plus ElevenLabs when configured)
+        cache: Segment cache (optional)
+        postprocessor: Loudness/silence/crossfade stage (optional)
+        estimator: Enables truncation repair in the synthesise stage
+        script_generator: Coroutine producing a script for a request
+            (defaults to Gemini structured output)
+        text_model: Gemini text model for script generation
+        tts_model: Gemini TTS model name
+        temperature: Script generation creativity
+        turns_per_segment: Target number of turns per TTS call
+        concurrency: Per-stage worker counts, overriding DEFAULT_CONCURRENCY
+        queue_size: Capacity of each inter-stage queue
+        on_event: Called as on_event(episode_id, event, data) for
+            "resumed", "script", "segment", "encoded" and "failed" events
+        checkpoints: If set, the validated script, every rendered segment
+            and the final encode are checkpointed per episode id, and a
+            re-run of the same id resumes from them
+        spill_threshold: Projected PCM bytes above which an episode's
+            segments are spilled to disk and streamed into the encoder
+            (None never spills)
+    """
+
+    def __init__(
+        self,
+        tts: Optional[MultiSpeakerTTS] = None,
+        scheduler: Optional[TTSScheduler] = None,
+        cache: Optional[TTSSegmentCache] = None,
+        postprocessor: Optional[AudioPostProcessor] = None,
+        estimator: Optional[TTSEstimator] = None,
+        script_generator: Optional[Callable[[EpisodeRequest], Awaitable[Optional[PodcastScript]]]] = None,
+        text_model: str = "gemini-3-pro-preview",
+        tts_model: str = "gemini-2.5-flash-preview-tts",
+        temperature: float = 0.7,
+        turns_per_segment: int = 8,
+        concurrency: Optional[Dict[str, int]] = None,
+        queue_size: int = 8,
+        on_event: Optional[Callable[[str, str, dict], None]] = None,
+        checkpoints: Optional[CheckpointStore] = None,
+        spill_threshold: Optional[int] = SPILL_THRESHOLD_BYTES,
+    ):
+        self.tts = tts or multi_speaker_tts_from_env()
+        self.cache = cache
+        self.postprocessor = postprocessor
+        self.estimator = estimator
+        self.script_generator = script_generator or self._generate_with_gemini
+        self.text_model = text_model
+        self.tts_model = tts_model
+        self.temperature = temperature
+        self.turns_per_segment = turns_per_segment
+        self.concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        self.scheduler = scheduler or scheduler_from_env(self.tts, self.concurrency["synthesize"])
+        self.queue_size = queue_size
+        self.on_event = on_event
+        self.checkpoints = checkpoints
+        self.spill_threshold = spill_threshold
+        self.pipeline: Optional[Pipeline] = None
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+
+    def _emit(self, episode: _Episode, event: str, **data: Any) -> None:
+        if self.on_event is not None:
+            self.on_event(episode.request.episode_id, event, data)
+
+    async def _generate_with_gemini(self, request: EpisodeRequest) -> Optional[PodcastScript]:
+        return await run_gemini_agent(
+            instruction=podcast_system_instruction(
+                len(request.speaker_voices), request.speaker_voices
+            ),
+            user_input=request.input_text,
+            output_type=PodcastScript,
+            model=self.text_model,
+            temperature=self.temperature,
+            retries=2,
+        )
+
+    async def _resume(self, episode: _Episode) -> bool:
+        """
+        Restore checkpointed state. Returns True if the episode is already
+        fully encoded and needs no further work.
+        """
+        episode_id = episode.request.episode_id
+        final = await asyncio.to_thread(self.checkpoints.load_final, episode_id)
+        saved = await asyncio.to_thread(self.checkpoints.load_script, episode_id)
+        if saved is None:
+            return False
+
+        episode.script, episode.speaker_voice_map = saved
+        if final is not None and final["output_file"] == episode.request.output_file:
+            episode.finished = time.perf_counter()
+            self._emit(episode, "resumed", stage="done")
+            return True
+
+        done = await asyncio.to_thread(self.checkpoints.completed_segments, episode_id)
+        self._emit(episode, "resumed", stage="synthesize", segments=len(done))
+        return False
+
+    async def _generate(self, episode: _Episode) -> Optional[_Episode]:
+        if self.checkpoints is not None:
+            if await self._resume(episode):
+                return None
+            if episode.script is not None:
+                return episode
+
+        if episode.request.script is not None:
+            episode.script = episode.request.script
+            return episode
+        episode.script = await self.script_generator(episode.request)
+        if episode.script is None:
+            raise RuntimeError("Script generation failed")
+        return episode
+
+    async def _validate(self, episode: _Episode) -> _Episode:
+        script = episode.script
+        if not script.dialogue:
+            raise ValueError("Script has no dialogue")
+        episode.speaker_voice_map = build_speaker_voice_mapping(script)
+        unknown = {turn.speaker for turn in script.dialogue} - set(episode.speaker_voice_map)
+        if unknown:
+            raise ValueError(f"Dialogue uses undeclared speakers: {sorted(unknown)}")
+        if self.checkpoints is not None:
+            await asyncio.to_thread(
+                self.checkpoints.save_script,
+                episode.request.episode_id,
+                script,
+                episode.speaker_voice_map,
+            )
+        self._emit(episode, "script", script=script, speaker_voice_map=episode.speaker_voice_map)
+        return episode
+
+    async def _segment(self, episode: _Episode) -> List[_Segment]:
+        turns = [(turn.speaker, turn.text) for turn in episode.script.dialogue]
+        episode.segments = self.tts.segment_turns(turns, self.turns_per_segment)
+        projected = projected_pcm_bytes(
+            turns, episode.speaker_voice_map, self.tts_model, self.estimator
+        )
+        spill = should_spill(projected, self.spill_threshold)
+        if spill:
+            logger.info(
+                f"Episode {episode.request.episode_id}: ~{projected / 2**20:.0f} MiB of PCM "
+                f"projected, spilling segments to disk"
+            )
+        episode.pcm = await asyncio.to_thread(SegmentBuffer, len(episode.segments), spill)
+        episode.remaining = len(episode.segments)
+        return [
+            _Segment(episode, index, segment)
+            for index, segment in enumerate(episode.segments)
+        ]
+
+    async def _synthesize(self, segment: _Segment) -> Optional[_Segment]:
+        episode = segment.episode
+        if episode.error:
+            return None
+
+        episode_id = episode.request.episode_id
+        if self.checkpoints is not None:
+            segment.pcm = await asyncio.to_thread(
+                self.checkpoints.load_segment, episode_id, segment.index, segment.turns
+            )
+            if segment.pcm is not None:
+                return segment
+
+        speakers = list(episode.speaker_voice_map)
+        key = None
+        if self.cache is not None:
+            segment_text = "\n".join(f"{speaker}: {text}" for speaker, text in segment.turns)
+            key = self.cache.make_key(
+                self.tts_model,
+                episode.speaker_voice_map,
+                segment_text,
+                context=self.tts.build_dialogue_prompt([], speakers),
+            )
+            segment.pcm = await asyncio.to_thread(self.cache.get, key)
+            if segment.pcm is not None:
+                await self._checkpoint_segment(segment)
+                return segment
+
+        audio = await self.scheduler.render(
+            TTSSegment(segment.turns, episode.speaker_voice_map, self.tts_model, segment.index)
+        )
+        pcm, usage = audio.pcm, audio.usage
+        # Repair re-renders the missing turns through Gemini
+        if self.estimator is not None and audio.provider == GeminiMultiSpeakerProvider.name:
+            pcm, usage = await self.tts.arepair_truncated(
+                pcm, usage, segment.turns, episode.speaker_voice_map, self.tts_model, self.estimator
+            )
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, key, pcm)
+        segment.pcm, segment.usage = pcm, usage
+        await self._checkpoint_segment(segment)
+        return segment
+
+    async def _checkpoint_segment(self, segment: _Segment) -> None:
+        if self.checkpoints is not None:
+            await asyncio.to_thread(
+                self.checkpoints.save_segment,
+                segment.episode.request.episode_id,
+                segment.index,
+                segment.turns,
+                segment.pcm,
+            )
+
+    async def _assemble(self, segment: _Segment) -> Optional[_Episode]:
+        episode = segment.episode
+        if episode.error:
+            return None
+
+        episode.pcm.put(segment.index, segment.pcm)
+        episode.rendered_bytes += len(segment.pcm)
+        if segment.usage is None:
+            episode.cached_segments += 1
+        else:
+            for name, value in segment.usage.items():
+                episode.usage[name] = episode.usage.get(name, 0) + (value or 0)
+
+        episode.remaining -= 1
+        self._emit(
+            episode,
+            "segment",
+            index=segment.index,
+            turns=segment.turns,
+            done=len(episode.segments) - episode.remaining,
+            total=len(episode.segments),
+            cached=segment.usage is None,
+        )
+        return episode if episode.remaining == 0 else None
+
+    async def _postprocess(self, episode: _Episode) -> _Episode:
+        segments = episode.pcm
+        if segments.spilled:
+            # Streamed from disk through the post-processor while encoding
+            episode.blocks = segments if self.postprocessor is None else self.postprocessor.process(segments)
+            return episode
+
+        if self.postprocessor is None:
+            episode.blocks = list(segments)
+        else:
+            episode.blocks = await asyncio.to_thread(
+                lambda: list(self.postprocessor.process(segments))
+            )
+        segments.close()
+        return episode
+
+    async def _encode(self, episode: _Episode) -> _Episode:
+        request = episode.request
+
+        def write() -> None:
+            with open_audio_writer(request.output_file, request.output_format) as wf:
+                for block in episode.blocks:
+                    wf.writeframes(block)
+
+        try:
+            with span("audio.encode", format=request.output_format):
+                await asyncio.to_thread(write)
+        finally:
+            episode.pcm.close()
+        if self.checkpoints is not None:
+            await asyncio.to_thread(
+                self.checkpoints.save_final,
+                request.episode_id,
+                request.output_file,
+                {"usage": episode.usage, "duration_seconds": episode.rendered_bytes / (2 * 24000)},
+            )
+        episode.blocks = []
+        episode.finished = time.perf_counter()
+        self._emit(
+            episode,
+            "encoded",
+            output_file=request.output_file,
+            usage=episode.usage,
+            segments=len(episode.segments),
+            cached_segments=episode.cached_segments,
+            duration_seconds=episode.rendered_bytes / (2 * 24000),
+        )
+        return episode
+
+    @staticmethod
+    def _traced(name: str, handler: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+        """
+        Run a stage handler in a span tagged with the job (and segment),
+        so everything it calls is attributed to the episode.
+        """
+        async def run(item: Any) -> Any:
+            if isinstance(item, _Segment):
+                attributes = {"job": item.episode.request.episode_id, "segment": item.index}
+            else:
+                attributes = {"job": item.request.episode_id}
+            with trace_context(**attributes), span(f"pipeline.{name}"), \
+                    memory_stage(f"pipeline.{name}", **attributes):
+                return await handler(item)
+
+        return run
+
+    def build_stages(self) -> List[Stage]:
+        def stage(name, handler, fan_out=False) -> Stage:
+            return Stage(
+                name, self._traced(name, handler), self.concurrency[name], self.queue_size, fan_out
+            )
+
+        return [
+            stage("generate", self._generate),
+            stage("validate", self._validate),
+            stage("segment", self._segment, fan_out=True),
+            stage("synthesize", self._synthesize),
+            stage("assemble", self._assemble),
+            stage("postprocess", self._postprocess),
+            stage("encode", self._encode),
+        ]
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    def _on_error(self, stage: str, item: Any, error: BaseException) -> None:
+        episode = item.episode if isinstance(item, _Segment) else item
+        if episode.error is None:
+            episode.error = f"{stage}: {error}"
+            episode.finished = time.perf_counter()
+            if episode.pcm is not None:
+                episode.pcm.close()
+            self._emit(episode, "failed", stage=stage, error=str(error))
+
+    async def run(self, requests: Iterable[EpisodeRequest]) -> List[EpisodeResult]:
+        """
+        Produce every requested episode.
+
+        Returns:
+            One result per request, in request order; failed episodes
+            carry the stage and error message instead of an output file
+        """
+        episodes = [_Episode(request) for request in requests]
+        self.pipeline = Pipeline(self.build_stages(), on_error=self._on_error)
+        await self.pipeline.run(episodes)
+        return [episode.result() for episode in episodes]
+
+    async def serve(self, requests: AsyncIterable[EpisodeRequest]) -> None:
+        """
+        Long-running variant of run() for services: episodes are taken
+        from an async source as they arrive and completion is reported
+        only through on_event. Returns once the source is exhausted and
+        every episode has drained.
+        """
+        async def episodes():
+            async for request in requests:
+                yield _Episode(request)
+
+        self.pipeline = Pipeline(self.build_stages(), on_error=self._on_error)
+        await self.pipeline.run(episodes())
+
+    def report(self) -> Dict[str, dict]:
+        return self.pipeline.report() if self.pipeline else {}
@@ -0,0 +1,565 @@
+"""
+Bulk document → podcast conversion.
+
+Convert every document in a directory, glob or stdin stream in one run
+(from app/):
+    python -m services.batch docs/ --voices kore puck --out podcasts/
+    python -m services.batch "notes/**/*.md" --voices kore puck --workers 4 --concurrency 8
+    python -m services.batch "papers/*.pdf" --voices kore puck
+    cat docs.jsonl | python -m services.batch - --voices kore puck
+
+PDF, HTML, Markdown and text files are cleaned by services.ingest (and
+cached by content hash) before they reach the script model.
+
+Documents that are near-duplicates (by MinHash similarity, see
+services.near_duplicates) of one already converted, or of one earlier
+in the same batch, reuse its script and audio instead of being
+generated again. The index persists in <out>/near_duplicates/.
+
+Each worker process runs its share of the documents through one
+AudioPipeline, so script generation, TTS and encoding overlap inside a
+process and --workers multiplies that across cores. Outputs are keyed by
+document name plus a content hash: a re-run skips documents whose script
+and audio already exist, and interrupted ones resume from their
+checkpoints.
+
+Output layout:
+    <out>/scripts/<doc_id>.json     script + speaker-voice mapping
+    <out>/audio/<doc_id>.<ext>      encoded episode
+    <out>/summary.json              throughput, tokens, cost and failures
+    <out>/near_duplicates/          MinHash index of converted documents
+"""
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from audio.estimator import estimate_cost, load_estimator, record_run
+from audio.export import EXPORT_FORMATS, available_formats
+from audio.postprocess import AudioPostProcessor
+from audio.synthetic_tts import use_synthetic_backend
+from audio.tts_cache import TTSSegmentCache
+from core.clients import warm_up
+from services.audio_service import AudioPipeline, EpisodeRequest
+from services.checkpoint import CheckpointStore
+from services.ingest import ingest_file, supported_extensions
+from services.near_duplicates import DEFAULT_THRESHOLD, Match, NearDuplicateIndex
+
+logger = logging.getLogger("podcast-generator")
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+DOCUMENT_EXTENSIONS = tuple(supported_extensions())
+DEFAULT_CONCURRENCY = 4
+DEFAULT_WORKERS = 1
+
+# ----------------------------------------------------------------------
+# Documents
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class Document:
+    doc_id: str
+    source: str
+    text: str
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^0-9A-Za-z_-]+", "-", name).strip("-")[:60] or "doc"
+
+
+def make_document(name: str, source: str, text: str) -> Document:
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+    return Document(f"{_slug(name)}-{digest}", source, text)
+
+
+def _read_file(path: str) -> Document:
+    # Extracted, cleaned and cached by content hash (PDF, HTML, Markdown, text)
+    text = ingest_file(path).text
+    return make_document(os.path.splitext(os.path.basename(path))[0], path, text)
+
+
+def _read_stdin(stream) -> List[Document]:
+    """
+    JSON lines of {"id": ..., "text": ...} become one document each;
+    anything else is read as a single document.
+    """
+    raw = stream.read()
+    lines = [line for line in raw.splitlines() if line.strip()]
+    try:
+        records = [json.loads(line) for line in lines]
+    except json.JSONDecodeError:
+        records = None
+    if records and all(isinstance(r, dict) and "text" in r for r in records):
+        return [
+            make_document(str(record.get("id") or f"stdin-{index}"), "<stdin>", record["text"])
+            for index, record in enumerate(records)
+        ]
+    return [make_document("stdin", "<stdin>", raw)] if raw.strip() else []
+
+
+def discover_documents(inputs: Iterable[str], stdin=None) -> List[Document]:
+    """
+    Expand directories (recursively), globs and files into documents.
+    "-" reads stdin. Empty documents and duplicate ids are dropped.
+    """
+    paths: List[str] = []
+    documents: List[Document] = []
+    for spec in inputs:
+        if spec == "-":
+            documents.extend(_read_stdin(stdin or sys.stdin))
+        elif os.path.isdir(spec):
+            for root, _, files in os.walk(spec):
+                paths.extend(
+                    os.path.join(root, name)
+                    for name in sorted(files)
+                    if name.lower().endswith(DOCUMENT_EXTENSIONS)
+                )
+        elif os.path.isfile(spec):
+            paths.append(spec)
+        else:
+            matches = sorted(glob.glob(spec, recursive=True))
+            if not matches:
+                logger.warning(f"No documents match {spec}")
+            paths.extend(path for path in matches if os.path.isfile(path))
+
+    documents.extend(_read_file(path) for path in paths)
+
+    unique: Dict[str, Document] = {}
+    for document in documents:
+        if document.text.strip():
+            unique.setdefault(document.doc_id, document)
+    return list(unique.values())
+
+# ----------------------------------------------------------------------
+# Outputs
+# ----------------------------------------------------------------------
+
+
+def script_path(out_dir: str, doc_id: str) -> str:
+    return os.path.join(out_dir, "scripts", f"{doc_id}.json")
+
+
+def audio_path(out_dir: str, doc_id: str, output_format: str) -> str:
+    return os.path.join(out_dir, "audio", f"{doc_id}{EXPORT_FORMATS[output_format]['extension']}")
+
+
+def is_completed(out_dir: str, doc_id: str, output_format: str) -> bool:
+    return os.path.exists(script_path(out_dir, doc_id)) and os.path.exists(
+        audio_path(out_dir, doc_id, output_format)
+    )
+
+# ----------------------------------------------------------------------
+# Worker
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class BatchOptions:
+    out_dir: str
+    speaker_voices: List[str]
+    text_model: str = "gemini-3-pro-preview"
+    tts_model: str = "gemini-2.5-flash-preview-tts"
+    temperature: float = 0.7
+    output_format: str = "wav"
+    concurrency: int = DEFAULT_CONCURRENCY
+    max_cost_usd: Optional[float] = None
+    # Similarity above which a near-duplicate's outputs are reused; None disables
+    near_duplicate_threshold: Optional[float] = DEFAULT_THRESHOLD
+
+
+def _write_script(path: str, payload: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def run_shard(documents: List[Document], options: BatchOptions) -> List[Dict[str, Any]]:
+    """
+    Convert a list of documents in this process.
+
+    Returns:
+        One result dict per document
+    """
+    # TTS connections open while the first scripts are written
+    warm_up(gemini_sdk=not use_synthetic_backend())
+    estimator = load_estimator()
+
+    def on_event(episode_id: str, event: str, data: dict) -> None:
+        if event == "script":
+            estimate = estimator.estimate(data["script"], options.tts_model, data["speaker_voice_map"])
+            if options.max_cost_usd is not None and estimate.cost_usd > options.max_cost_usd:
+                raise RuntimeError(
+                    f"Estimated TTS cost ${estimate.cost_usd:.3f} exceeds the ${options.max_cost_usd:.2f} budget"
+                )
+
+    pipeline = AudioPipeline(
+        cache=TTSSegmentCache(),
+        postprocessor=AudioPostProcessor(),
+        estimator=estimator,
+        text_model=options.text_model,
+        tts_model=options.tts_model,
+        temperature=options.temperature,
+        concurrency={"generate": options.concurrency, "synthesize": options.concurrency},
+        on_event=on_event,
+        checkpoints=CheckpointStore(),
+    )
+    requests = [
+        EpisodeRequest(
+            episode_id=f"batch-{document.doc_id}",
+            output_file=audio_path(options.out_dir, document.doc_id, options.output_format),
+            input_text=document.text,
+            speaker_voices=options.speaker_voices,
+            output_format=options.output_format,
+        )
+        for document in documents
+    ]
+    results = asyncio.run(pipeline.run(requests))
+
+    rows = []
+    for document, result in zip(documents, results):
+        row = {
+            "doc_id": document.doc_id,
+            "source": document.source,
+            "ok": result.ok,
+            "error": result.error,
+            "seconds": result.seconds,
+            "duration_seconds": result.duration_seconds,
+            "segments": result.segments,
+            "cached_segments": result.cached_segments,
+            "input_tokens": result.usage.get("input_tokens", 0),
+            "output_tokens": result.usage.get("output_tokens", 0),
+            "reused_from": None,
+        }
+        row["cost_usd"] = estimate_cost(options.tts_model, row["input_tokens"], row["output_tokens"])
+        if result.ok:
+            _write_script(
+                script_path(options.out_dir, document.doc_id),
+                {
+                    "source": document.source,
+                    "script": result.script.model_dump(),
+                    "speaker_voice_map": result.speaker_voice_map,
+                },
+            )
+            if result.usage:
+                record_run(
+                    [(turn.speaker, turn.text) for turn in result.script.dialogue],
+                    result.speaker_voice_map,
+                    options.tts_model,
+                    {
+                        **result.usage,
+                        "segments": result.segments,
+                        "cached_segments": result.cached_segments,
+                        "duration_seconds": result.duration_seconds,
+                    },
+                )
+            print(f"✅ {document.doc_id} {result.duration_seconds / 60:.1f} min ${row['cost_usd']:.3f}", flush=True)
+        else:
+            print(f"❌ {document.doc_id} {result.error}", flush=True)
+        rows.append(row)
+    return rows
+
+
+def _init_worker() -> None:
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+    )
+
+# ----------------------------------------------------------------------
+# Near-Duplicates
+# ----------------------------------------------------------------------
+
+
+def index_dir(out_dir: str) -> str:
+    return os.path.join(out_dir, "near_duplicates")
+
+
+def _empty_row(document: Document, **fields: Any) -> Dict[str, Any]:
+    return {
+        "doc_id": document.doc_id,
+        "source": document.source,
+        "ok": True,
+        "error": None,
+        "seconds": 0.0,
+        "duration_seconds": 0.0,
+        "segments": 0,
+        "cached_segments": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cost_usd": 0.0,
+        "reused_from": None,
+        **fields,
+    }
+
+
+def reuse_outputs(document: Document, match: Match, options: BatchOptions) -> Dict[str, Any]:
+    """
+    Give document the script and audio of the near-duplicate it matched.
+    The audio is hard-linked where possible; the script is copied with
+    this document's source and where it came from.
+    """
+    with open(script_path(options.out_dir, match.doc_id), encoding="utf-8") as f:
+        payload = json.load(f)
+    payload.update(source=document.source, reused_from=match.doc_id, similarity=round(match.similarity, 3))
+
+    source = audio_path(options.out_dir, match.doc_id, options.output_format)
+    target = audio_path(options.out_dir, document.doc_id, options.output_format)
+    # Renaming over a link to the same file is a no-op that leaves tmp_path
+    if not (os.path.exists(target) and os.path.samefile(source, target)):
+        tmp_path = f"{target}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+    _write_script(script_path(options.out_dir, document.doc_id), payload)
+
+    print(f"♻️ {document.doc_id} reuses {match.doc_id} ({match.similarity:.0%} similar)", flush=True)
+    return _empty_row(document, duration_seconds=match.duration_seconds, reused_from=match.doc_id)
+
+
+def plan_reuse(
+    documents: List[Document],
+    pending: List[Document],
+    options: BatchOptions,
+    index: NearDuplicateIndex,
+    force: bool = False,
+) -> Tuple[List[Document], List[Dict[str, Any]], List[Tuple[Document, Match]]]:
+    """
+    Match pending documents against the index.
+
+    Converted documents missing from the index are added first. A pending
+    document matching a converted one reuses its outputs now (unless
+    force); one matching an earlier pending document waits for it.
+    Documents too short to have a signature are always rendered.
+
+    Returns:
+        (documents to render, rows of reused documents, waiting documents
+        with the match they wait for)
+    """
+    pending_ids = {document.doc_id for document in pending}
+    for document in documents:
+        if document.doc_id not in pending_ids and document.doc_id not in index:
+            signature = index.signature(document.text)
+            if signature is not None:
+                index.add(document.doc_id, signature)
+
+    render: List[Document] = []
+    reused: List[Dict[str, Any]] = []
+    waiting: List[Tuple[Document, Match]] = []
+    rendering = set()
+    for document in pending:
+        signature = index.signature(document.text)
+        if signature is None:
+            index.remove(document.doc_id)
+            render.append(document)
+            continue
+        match = index.query(signature, exclude=document.doc_id)
+        if match is not None and match.doc_id in rendering:
+            waiting.append((document, match))
+            continue
+        if match is not None and not force:
+            if is_completed(options.out_dir, match.doc_id, options.output_format):
+                reused.append(reuse_outputs(document, match, options))
+                index.add(document.doc_id, signature, match.duration_seconds)
+                continue
+            # Its outputs have been removed since it was indexed
+            index.remove(match.doc_id)
+        index.add(document.doc_id, signature)
+        rendering.add(document.doc_id)
+        render.append(document)
+    return render, reused, waiting
+
+# ----------------------------------------------------------------------
+# Batch
+# ----------------------------------------------------------------------
+
+
+def run_batch(
+    documents: List[Document],
+    options: BatchOptions,
+    workers: int = DEFAULT_WORKERS,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Convert documents across worker processes and write summary.json.
+
+    Returns:
+        The summary dict
+    """
+    os.makedirs(os.path.join(options.out_dir, "scripts"), exist_ok=True)
+    os.makedirs(os.path.join(options.out_dir, "audio"), exist_ok=True)
+
+    pending = [
+        document for document in documents
+        if force or not is_completed(options.out_dir, document.doc_id, options.output_format)
+    ]
+    skipped = len(documents) - len(pending)
+    if skipped:
+        print(f"⏭️ Skipping {skipped} already converted documents")
+
+    started = time.perf_counter()
+    near_index = None
+    reused: List[Dict[str, Any]] = []
+    waiting: List[Tuple[Document, Match]] = []
+    if options.near_duplicate_threshold is not None:
+        near_index = NearDuplicateIndex.load(index_dir(options.out_dir), options.near_duplicate_threshold)
+        pending, reused, waiting = plan_reuse(documents, pending, options, near_index, force=force)
+
+    workers = max(1, min(workers, len(pending)))
+    rows: List[Dict[str, Any]] = []
+    if workers == 1:
+        rows = run_shard(pending, options) if pending else []
+    else:
+        # Round-robin shards keep long and short documents spread out
+        shards = [pending[index::workers] for index in range(workers)]
+        with ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        ) as pool:
+            for shard_rows in pool.map(run_shard, shards, [options] * workers):
+                rows.extend(shard_rows)
+
+    if near_index is not None:
+        rendered = {row["doc_id"]: row for row in rows}
+        for document, match in waiting:
+            primary = rendered[match.doc_id]
+            if primary["ok"]:
+                match.duration_seconds = primary["duration_seconds"]
+                reused.append(reuse_outputs(document, match, options))
+                near_index.add(document.doc_id, near_index.signature(document.text), match.duration_seconds)
+            else:
+                reused.append(_empty_row(
+                    document, ok=False, error=f"Near-duplicate of {match.doc_id}, which failed"
+                ))
+        for row in rows:
+            if row["doc_id"] not in near_index:
+                continue
+            if row["ok"]:
+                near_index.set_duration(row["doc_id"], row["duration_seconds"])
+            else:
+                near_index.remove(row["doc_id"])
+        near_index.save(index_dir(options.out_dir))
+        rows.extend(reused)
+    wall_seconds = time.perf_counter() - started
+
+    completed = [row for row in rows if row["ok"]]
+    audio_seconds = sum(row["duration_seconds"] for row in completed)
+    summary = {
+        "documents": len(documents),
+        "completed": len(completed),
+        "failed": len(rows) - len(completed),
+        "skipped": skipped,
+        "reused": sum(1 for row in rows if row["ok"] and row["reused_from"]),
+        "workers": workers,
+        "concurrency": options.concurrency,
+        "wall_seconds": wall_seconds,
+        "audio_seconds": audio_seconds,
+        "realtime_factor": audio_seconds / wall_seconds if wall_seconds else 0.0,
+        "documents_per_hour": 3600 * len(completed) / wall_seconds if wall_seconds else 0.0,
+        "segments": sum(row["segments"] for row in rows),
+        "cached_segments": sum(row["cached_segments"] for row in rows),
+        "input_tokens": sum(row["input_tokens"] for row in rows),
+        "output_tokens": sum(row["output_tokens"] for row in rows),
+        "tts_cost_usd": sum(row["cost_usd"] for row in rows),
+        "options": asdict(options),
+        "results": rows,
+    }
+    with open(os.path.join(options.out_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    lines = [
+        f"📚 {summary['documents']} documents: {summary['completed']} converted, "
+        f"{summary['failed']} failed, {summary['skipped']} skipped, "
+        f"{summary['reused']} reused near-duplicates",
+        f"⏱️ {summary['wall_seconds']:.1f}s wall, {summary['audio_seconds'] / 60:.1f} min audio "
+        f"({summary['realtime_factor']:.1f}x realtime, {summary['documents_per_hour']:.0f} docs/hour)",
+        f"🔢 {summary['input_tokens']} input / {summary['output_tokens']} output TTS tokens, "
+        f"{summary['cached_segments']}/{summary['segments']} segments cached",
+        f"💵 ${summary['tts_cost_usd']:.3f} TTS cost",
+    ]
+    for row in summary["results"]:
+        if not row["ok"]:
+            lines.append(f"   ❌ {row['doc_id']}: {row['error']}")
+    return "\n".join(lines)
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+    )
+
+    parser = argparse.ArgumentParser(description="Convert a batch of documents into podcasts")
+    parser.add_argument("inputs", nargs="+", help="Directories, files, globs, or '-' for stdin")
+    parser.add_argument("--voices", nargs="+", required=True)
+    parser.add_argument("--out", default="podcasts")
+    parser.add_argument("--text-model", default="gemini-3-pro-preview")
+    parser.add_argument("--tts-model", default="gemini-2.5-flash-preview-tts")
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--format", default="wav", choices=list(EXPORT_FORMATS))
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Concurrent script and TTS requests per worker")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Worker processes")
+    parser.add_argument("--max-cost", type=float, default=None,
+                        help="Fail documents whose estimated TTS cost exceeds this (USD)")
+    parser.add_argument("--force", action="store_true", help="Re-convert completed documents")
+    parser.add_argument("--similarity", type=float, default=DEFAULT_THRESHOLD,
+                        help="Reuse the outputs of documents at least this similar (0-1)")
+    parser.add_argument("--no-reuse", action="store_true", help="Convert near-duplicates too")
+    args = parser.parse_args()
+
+    if args.format not in available_formats():
+        parser.error(f"--format {args.format} needs ffmpeg, which is not installed")
+
+    documents = discover_documents(args.inputs)
+    if not documents:
+        print("❌ No documents found.")
+        sys.exit(1)
+
+    options = BatchOptions(
+        out_dir=args.out,
+        speaker_voices=args.voices,
+        text_model=args.text_model,
+        tts_model=args.tts_model,
+        temperature=args.temperature,
+        output_format=args.format,
+        concurrency=args.concurrency,
+        max_cost_usd=args.max_cost,
+        near_duplicate_threshold=None if args.no_reuse else args.similarity,
+    )
+    summary = run_batch(documents, options, workers=args.workers, force=args.force)
+    print(format_summary(summary))
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
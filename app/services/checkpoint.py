@@ -0,0 +1,204 @@
+"""
+Per-episode checkpoints so an interrupted job resumes instead of
+starting over.
+
+Layout under <root>/<episode_id>/:
+    script.json             validated script + speaker-voice mapping
+    segments/<i>-<h>.pcm    rendered PCM for segment i (h = hash of its turns)
+    final.json              output file + metadata after the final encode
+
+Every file is written to a temporary name and renamed into place, so a
+crash mid-write never leaves a partial checkpoint behind. At most the
+segment that was in flight is lost.
+
+Checkpoints of jobs that failed for good are cleared; ones nobody came
+back for (e.g. a failed HTTP job that was never resubmitted) are pruned
+once they are older than DEFAULT_MAX_AGE_SECONDS.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from schemas.podcast import PodcastScript
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+DEFAULT_CHECKPOINT_DIR = os.getenv(
+    "PODCAST_CHECKPOINT_DIR", os.path.join(".cache", "checkpoints")
+)
+
+# Episode directories untouched for this long are removed by prune()
+DEFAULT_MAX_AGE_SECONDS = float(os.getenv("PODCAST_CHECKPOINT_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def turns_digest(turns: Sequence[Tuple[str, str]]) -> str:
+    text = "\n".join(f"{speaker}: {text}" for speaker, text in turns)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+# ----------------------------------------------------------------------
+# Store
+# ----------------------------------------------------------------------
+
+
+class CheckpointStore:
+    """
+    Filesystem checkpoints keyed by episode (job) id.
+    """
+
+    def __init__(self, root: str = DEFAULT_CHECKPOINT_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _episode_dir(self, episode_id: str) -> str:
+        return os.path.join(self.root, episode_id)
+
+    def _segment_path(self, episode_id: str, index: int, turns: Sequence[Tuple[str, str]]) -> str:
+        return os.path.join(
+            self._episode_dir(episode_id),
+            "segments",
+            f"{index:05d}-{turns_digest(turns)}.pcm",
+        )
+
+    # ------------------------------------------------------------------
+    # Script
+    # ------------------------------------------------------------------
+
+    def save_script(
+        self,
+        episode_id: str,
+        script: PodcastScript,
+        speaker_voice_map: Dict[str, str],
+    ) -> None:
+        os.makedirs(self._episode_dir(episode_id), exist_ok=True)
+        payload = {
+            "script": script.model_dump(),
+            "speaker_voice_map": speaker_voice_map,
+        }
+        _write_atomic(
+            os.path.join(self._episode_dir(episode_id), "script.json"),
+            json.dumps(payload).encode("utf-8"),
+        )
+
+    def load_script(self, episode_id: str) -> Optional[Tuple[PodcastScript, Dict[str, str]]]:
+        path = os.path.join(self._episode_dir(episode_id), "script.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        return PodcastScript(**payload["script"]), payload["speaker_voice_map"]
+
+    # ------------------------------------------------------------------
+    # Segments
+    # ------------------------------------------------------------------
+
+    def save_segment(
+        self,
+        episode_id: str,
+        index: int,
+        turns: Sequence[Tuple[str, str]],
+        pcm: bytes,
+    ) -> None:
+        path = self._segment_path(episode_id, index, turns)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, pcm)
+
+    def load_segment(
+        self,
+        episode_id: str,
+        index: int,
+        turns: Sequence[Tuple[str, str]],
+    ) -> Optional[bytes]:
+        path = self._segment_path(episode_id, index, turns)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def completed_segments(self, episode_id: str) -> List[int]:
+        segment_dir = os.path.join(self._episode_dir(episode_id), "segments")
+        if not os.path.isdir(segment_dir):
+            return []
+        return sorted(
+            int(name.split("-", 1)[0])
+            for name in os.listdir(segment_dir)
+            if name.endswith(".pcm")
+        )
+
+    # ------------------------------------------------------------------
+    # Final Encode
+    # ------------------------------------------------------------------
+
+    def save_final(self, episode_id: str, output_file: str, metadata: dict) -> None:
+        """
+        Record the finished output and drop the segment PCM, which is no
+        longer needed to recover.
+        """
+        os.makedirs(self._episode_dir(episode_id), exist_ok=True)
+        payload = {"output_file": output_file, **metadata}
+        _write_atomic(
+            os.path.join(self._episode_dir(episode_id), "final.json"),
+            json.dumps(payload).encode("utf-8"),
+        )
+        shutil.rmtree(os.path.join(self._episode_dir(episode_id), "segments"), ignore_errors=True)
+
+    def load_final(self, episode_id: str) -> Optional[dict]:
+        """
+        The final checkpoint, if it exists and its output file is intact.
+        """
+        path = os.path.join(self._episode_dir(episode_id), "final.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        if not os.path.exists(payload["output_file"]):
+            return None
+        return payload
+
+    def clear(self, episode_id: str) -> None:
+        shutil.rmtree(self._episode_dir(episode_id), ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Cleanup
+    # ------------------------------------------------------------------
+
+    def _last_modified(self, episode_id: str) -> float:
+        newest = 0.0
+        for directory, _, names in os.walk(self._episode_dir(episode_id)):
+            for path in [directory, *(os.path.join(directory, name) for name in names)]:
+                try:
+                    newest = max(newest, os.stat(path).st_mtime)
+                except FileNotFoundError:
+                    pass
+        return newest
+
+    def prune(self, max_age: float = DEFAULT_MAX_AGE_SECONDS, keep: Iterable[str] = ()) -> List[str]:
+        """
+        Remove episode directories with nothing written for max_age
+        seconds, except the ids in keep.
+
+        Returns:
+            Ids of the removed episodes
+        """
+        cutoff = time.time() - max_age
+        keep = set(keep)
+        removed = []
+        for episode_id in sorted(os.listdir(self.root)):
+            if episode_id in keep or not os.path.isdir(self._episode_dir(episode_id)):
+                continue
+            if self._last_modified(episode_id) < cutoff:
+                self.clear(episode_id)
+                removed.append(episode_id)
+        return removed
@@ -0,0 +1,650 @@
+"""
+Async HTTP API for podcast generation.
+
+All jobs share long-running AudioPipelines on a single event loop, so
+many generations overlap: scripts are written while other episodes are
+being synthesised and encoded, and each stage keeps its own concurrency
+limit no matter how many jobs are in flight.
+
+Endpoints:
+    POST /jobs                  submit a generation (JSON body, see
+                                parse_job_request); 202 with the job id
+    GET  /jobs                  recent jobs
+    GET  /jobs/<id>             job status
+    GET  /jobs/<id>/events      progress and partial transcript as
+                                server-sent events; honours Last-Event-ID
+    GET  /jobs/<id>/audio       finished audio, with range requests
+    GET  /healthz               liveness and pipeline stage stats
+
+Run (from app/):
+    python -m services.http_service --port 8600
+
+Job state lives in memory; audio and checkpoints are on disk, so a job
+re-submitted with the same job_id after a restart resumes from its
+checkpoints. Checkpoints of failed jobs are cleared once the job drops
+out of the in-memory table, and abandoned ones are pruned by age.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import tornado.ioloop
+import tornado.web
+from tornado.iostream import StreamClosedError
+
+from audio.estimator import TTSEstimator, load_estimator, record_run
+from audio.export import EXPORT_FORMATS, available_formats
+from audio.postprocess import AudioPostProcessor
+from audio.synthetic_tts import use_synthetic_backend
+from audio.tts_cache import TTSSegmentCache
+from core.clients import warm_up
+from core.gemini_client import run_gemini_agent
+from prompts.podcast import podcast_system_instruction
+from schemas.podcast import PodcastScript
+from services.audio_service import AudioPipeline, EpisodeRequest
+from services.checkpoint import CheckpointStore
+from services.job_queue import FAILED, QUEUED, RUNNING, SUCCEEDED
+from services.worker import DEFAULT_OUTPUT_DIR, PRUNE_INTERVAL, SCRIPT_PROGRESS, job_params
+
+logger = logging.getLogger("podcast-generator")
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+DEFAULT_PORT = int(os.getenv("PODCAST_HTTP_PORT", "8600"))
+
+# Stage concurrency for the shared pipeline; higher than the per-job
+# worker defaults because every request in the process shares it
+SERVICE_CONCURRENCY = {
+    "generate": 8,
+    "validate": 4,
+    "synthesize": 8,
+    "postprocess": 2,
+    "encode": 2,
+}
+
+# Comment line sent on idle event streams so proxies keep them open
+KEEPALIVE_SECONDS = 15.0
+
+MAX_INPUT_CHARS = 200_000
+
+# Job ids name output and checkpoint files, so they are limited to what
+# the /jobs/<id> routes accept
+JOB_ID_PATTERN = r"[0-9A-Za-z_-]+"
+MAX_JOB_ID_CHARS = 128
+MAX_FINISHED_JOBS = 1000
+
+# ----------------------------------------------------------------------
+# Jobs
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class JobEvent:
+    id: int
+    name: str
+    data: Dict[str, Any]
+
+    def to_sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.name}\ndata: {json.dumps(self.data)}\n\n"
+
+
+@dataclass
+class ServiceJob:
+    id: str
+    params: Dict[str, Any]
+    output_file: str
+    status: str = QUEUED
+    progress: float = 0.0
+    stage: Optional[str] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+    script: Optional[PodcastScript] = None
+    speaker_voice_map: Dict[str, str] = field(default_factory=dict)
+    transcript: List[Dict[str, Any]] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    events: List[JobEvent] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def publish(self, name: str, **data: Any) -> None:
+        """
+        Append an event and wake every stream waiting on this job.
+        """
+        self.events.append(JobEvent(len(self.events), name, data))
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self, cursor: int, timeout: float) -> bool:
+        """
+        Wait until there are events past cursor. Returns False on timeout.
+        """
+        changed = self._changed
+        if cursor < len(self.events) or self.finished:
+            return True
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "stage": self.stage,
+            "message": self.message,
+            "error": self.error,
+            "title": self.script.title if self.script else None,
+            "transcript_turns": len(self.transcript),
+            "result": self.result,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "events_url": f"/jobs/{self.id}/events",
+            "audio_url": f"/jobs/{self.id}/audio" if self.status == SUCCEEDED else None,
+        }
+
+
+def _number(body: Dict[str, Any], name: str, default: Optional[float]) -> Optional[float]:
+    value = body.get(name, default)
+    if value is None:
+        return None
+    # bool is an int subclass, but true is not a temperature
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+        raise ValueError(f"{name} must be a number")
+    return float(value)
+
+
+def parse_job_request(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate a POST /jobs body into job params.
+
+    Body fields: input_text (or a ready "script"), speaker_voices, and
+    optionally text_model, tts_model, temperature, output_format,
+    max_cost_usd and job_id (see parse_job_id).
+
+    Raises:
+        ValueError: If the body is missing fields or has bad values
+    """
+    if not isinstance(body, dict):
+        raise ValueError("body must be a JSON object")
+    script = body.get("script")
+    input_text = body.get("input_text") or ""
+    if not isinstance(input_text, str):
+        raise ValueError("input_text must be a string")
+    if not input_text.strip() and script is None:
+        raise ValueError("input_text or script is required")
+    if len(input_text) > MAX_INPUT_CHARS:
+        raise ValueError(f"input_text is longer than {MAX_INPUT_CHARS} characters")
+
+    speaker_voices = body.get("speaker_voices") or []
+    if script is None and (
+        not isinstance(speaker_voices, list)
+        or not speaker_voices
+        or not all(isinstance(voice, str) for voice in speaker_voices)
+    ):
+        raise ValueError("speaker_voices must be a non-empty list of voice ids")
+
+    output_format = body.get("output_format", "wav")
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError(f"output_format must be one of {list(EXPORT_FORMATS)}")
+    if output_format not in available_formats():
+        raise ValueError(f"output_format '{output_format}' needs ffmpeg, which is not installed")
+
+    text_model = body.get("text_model", "gemini-3-pro-preview")
+    tts_model = body.get("tts_model", "gemini-2.5-flash-preview-tts")
+    for name, model in (("text_model", text_model), ("tts_model", tts_model)):
+        if not isinstance(model, str) or not model.strip():
+            raise ValueError(f"{name} must be a non-empty string")
+
+    temperature = _number(body, "temperature", 0.7)
+    max_cost_usd = _number(body, "max_cost_usd", None)
+    if max_cost_usd is not None and max_cost_usd < 0:
+        raise ValueError("max_cost_usd must not be negative")
+
+    params = job_params(
+        input_text,
+        speaker_voices,
+        text_model=text_model,
+        tts_model=tts_model,
+        temperature=temperature,
+        output_format=output_format,
+        max_cost_usd=max_cost_usd,
+    )
+    if script is not None:
+        params["script"] = PodcastScript(**script).model_dump()
+    return params
+
+
+def parse_job_id(body: Dict[str, Any]) -> Optional[str]:
+    """
+    The optional job_id of a POST /jobs body.
+
+    Raises:
+        ValueError: If it is not a short string of letters, digits, "_" and "-"
+    """
+    job_id = body.get("job_id")
+    if job_id is None:
+        return None
+    if (
+        not isinstance(job_id, str)
+        or len(job_id) > MAX_JOB_ID_CHARS
+        or not re.fullmatch(JOB_ID_PATTERN, job_id)
+    ):
+        raise ValueError(
+            f"job_id must be 1-{MAX_JOB_ID_CHARS} letters, digits, '_' or '-'"
+        )
+    return job_id
+
+# ----------------------------------------------------------------------
+# Service
+# ----------------------------------------------------------------------
+
+
+class PodcastService:
+    """
+    Owns the in-memory job table and feeds submissions into shared
+    AudioPipelines running on the current event loop.
+
+    Jobs are grouped by TTS model, which is a pipeline-wide setting; the
+    text model and temperature are applied per job when the script is
+    generated.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = DEFAULT_OUTPUT_DIR,
+        estimator: Optional[TTSEstimator] = None,
+        concurrency: Optional[Dict[str, int]] = None,
+        **pipeline_options: Any,
+    ):
+        self.output_dir = output_dir
+        self.estimator = estimator or load_estimator()
+        self.concurrency = {**SERVICE_CONCURRENCY, **(concurrency or {})}
+        self.checkpoints: Optional[CheckpointStore] = pipeline_options.pop("checkpoints", CheckpointStore())
+        self.pipeline_options = pipeline_options
+        self.jobs: Dict[str, ServiceJob] = {}
+        self.pipelines: Dict[str, AudioPipeline] = {}
+        self._inboxes: Dict[str, asyncio.Queue] = {}
+        self._tasks: List[asyncio.Task] = []
+        os.makedirs(output_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Pipelines
+    # ------------------------------------------------------------------
+
+    def _pipeline_for(self, tts_model: str) -> asyncio.Queue:
+        if tts_model in self._inboxes:
+            return self._inboxes[tts_model]
+
+        pipeline = AudioPipeline(
+            **{
+                "cache": TTSSegmentCache(),
+                "postprocessor": AudioPostProcessor(),
+                "estimator": self.estimator,
+                "checkpoints": self.checkpoints,
+                "script_generator": self._generate_script,
+                **self.pipeline_options,
+            },
+            tts_model=tts_model,
+            concurrency=self.concurrency,
+            on_event=self._on_event,
+        )
+        inbox: asyncio.Queue = asyncio.Queue()
+        self.pipelines[tts_model] = pipeline
+        self._inboxes[tts_model] = inbox
+        self._tasks.append(asyncio.create_task(pipeline.serve(self._drain(inbox))))
+        return inbox
+
+    async def _generate_script(self, request: EpisodeRequest) -> Optional[PodcastScript]:
+        params = self.jobs[request.episode_id].params
+        return await run_gemini_agent(
+            instruction=podcast_system_instruction(
+                len(request.speaker_voices), request.speaker_voices
+            ),
+            user_input=request.input_text,
+            output_type=PodcastScript,
+            model=params["text_model"],
+            temperature=params["temperature"],
+            retries=2,
+        )
+
+    @staticmethod
+    async def _drain(inbox: asyncio.Queue) -> AsyncIterator[EpisodeRequest]:
+        while True:
+            request = await inbox.get()
+            if request is None:
+                return
+            yield request
+
+    async def close(self) -> None:
+        """
+        Stop accepting work and let in-flight jobs finish.
+        """
+        for inbox in self._inboxes.values():
+            inbox.put_nowait(None)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    def submit(self, params: Dict[str, Any], job_id: Optional[str] = None) -> ServiceJob:
+        if job_id is not None and not re.fullmatch(JOB_ID_PATTERN, job_id):
+            raise ValueError(f"Invalid job_id {job_id!r}")
+        job_id = job_id or uuid.uuid4().hex
+        existing = self.jobs.get(job_id)
+        if existing is not None and not existing.finished:
+            return existing
+
+        output_format = params["output_format"]
+        job = ServiceJob(
+            id=job_id,
+            params=params,
+            output_file=os.path.join(
+                self.output_dir, f"{job_id}{EXPORT_FORMATS[output_format]['extension']}"
+            ),
+        )
+        script = params.get("script")
+        request = EpisodeRequest(
+            episode_id=job_id,
+            output_file=job.output_file,
+            input_text=params["input_text"],
+            speaker_voices=params["speaker_voices"],
+            script=PodcastScript(**script) if script else None,
+            output_format=output_format,
+        )
+        # Only a job that reached its pipeline is tracked, so a failure
+        # here never leaves one stuck in RUNNING
+        inbox = self._pipeline_for(params["tts_model"])
+
+        self.jobs[job_id] = job
+        self._prune()
+        job.status, job.stage, job.message = RUNNING, "generate", "Writing script"
+        job.publish("status", status=job.status, progress=0.0, stage=job.stage, message=job.message)
+        inbox.put_nowait(request)
+        return job
+
+    def _prune(self) -> None:
+        finished = [job for job in self.jobs.values() if job.finished]
+        for job in sorted(finished, key=lambda j: j.finished_at)[:-MAX_FINISHED_JOBS]:
+            del self.jobs[job.id]
+            # Never resubmitted, so nothing will resume from these
+            if job.status == FAILED and self.checkpoints is not None:
+                self.checkpoints.clear(job.id)
+
+    async def prune_checkpoints(self) -> None:
+        """
+        Remove abandoned checkpoints, keeping those of unfinished jobs.
+        """
+        if self.checkpoints is not None:
+            keep = [job.id for job in self.jobs.values() if not job.finished]
+            await asyncio.to_thread(self.checkpoints.prune, keep=keep)
+
+    def _progress(self, job: ServiceJob, progress: float, stage: str, message: str) -> None:
+        job.progress, job.stage, job.message = progress, stage, message
+        job.publish("progress", progress=progress, stage=stage, message=message)
+
+    def _finish(self, job: ServiceJob, status: str, **data: Any) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        if status == SUCCEEDED:
+            job.progress, job.stage = 1.0, "done"
+        job.publish(status, **data)
+
+    def _on_event(self, episode_id: str, event: str, data: dict) -> None:
+        job = self.jobs.get(episode_id)
+        if job is None:
+            return
+
+        if event == "resumed":
+            if data["stage"] == "done":
+                self._finish(job, SUCCEEDED, audio_url=f"/jobs/{job.id}/audio", resumed=True)
+                return
+            self._progress(
+                job,
+                SCRIPT_PROGRESS,
+                data["stage"],
+                f"Resumed from checkpoint ({data.get('segments', 0)} segments done)",
+            )
+
+        elif event == "script":
+            script = data["script"]
+            job.script, job.speaker_voice_map = script, data["speaker_voice_map"]
+            estimate = self.estimator.estimate(script, job.params["tts_model"], job.speaker_voice_map)
+            max_cost = job.params.get("max_cost_usd")
+            if max_cost is not None and estimate.cost_usd > max_cost:
+                # Raising fails this episode in the validate stage
+                raise RuntimeError(
+                    f"Estimated TTS cost ${estimate.cost_usd:.3f} exceeds the ${max_cost:.2f} budget"
+                )
+            job.publish(
+                "script",
+                title=script.title,
+                description=script.description,
+                speakers=job.speaker_voice_map,
+                turns=len(script.dialogue),
+                estimated_seconds=estimate.duration_seconds,
+                estimated_cost_usd=estimate.cost_usd,
+            )
+            self._progress(
+                job,
+                SCRIPT_PROGRESS,
+                "synthesize",
+                f"Script ready (~{estimate.duration_seconds / 60:.1f} min, ~${estimate.cost_usd:.3f})",
+            )
+
+        elif event == "segment":
+            turns = [{"speaker": speaker, "text": text} for speaker, text in data["turns"]]
+            job.transcript.extend(turns)
+            job.publish("transcript", segment=data["index"], turns=turns)
+            self._progress(
+                job,
+                SCRIPT_PROGRESS + (1 - SCRIPT_PROGRESS) * 0.95 * data["done"] / data["total"],
+                "synthesize",
+                f"Segment {data['done']}/{data['total']}",
+            )
+
+        elif event == "encoded":
+            job.result = {
+                "output_format": job.params["output_format"],
+                "duration_seconds": data["duration_seconds"],
+                "segments": data["segments"],
+                "cached_segments": data["cached_segments"],
+                **data["usage"],
+            }
+            if job.script is not None:
+                record_run(
+                    [(turn.speaker, turn.text) for turn in job.script.dialogue],
+                    job.speaker_voice_map,
+                    job.params["tts_model"],
+                    {
+                        **data["usage"],
+                        "segments": data["segments"],
+                        "cached_segments": data["cached_segments"],
+                        "duration_seconds": data["duration_seconds"],
+                    },
+                )
+            self._finish(job, SUCCEEDED, audio_url=f"/jobs/{job.id}/audio", **job.result)
+
+        elif event == "failed":
+            job.error = f"{data['stage']}: {data['error']}"
+            self._finish(job, FAILED, stage=data["stage"], error=data["error"])
+
+# ----------------------------------------------------------------------
+# Handlers
+# ----------------------------------------------------------------------
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, service: PodcastService) -> None:
+        self.service = service
+
+    def write_error(self, status_code: int, **kwargs: Any) -> None:
+        self.finish({"error": self._reason})
+
+    def get_job(self, job_id: str) -> ServiceJob:
+        job = self.service.jobs.get(job_id)
+        if job is None:
+            raise tornado.web.HTTPError(404, reason=f"Unknown job {job_id}")
+        return job
+
+
+class JobsHandler(BaseHandler):
+    def get(self) -> None:
+        jobs = sorted(self.service.jobs.values(), key=lambda job: job.created_at, reverse=True)
+        self.write({"jobs": [job.to_dict() for job in jobs[:50]]})
+
+    def post(self) -> None:
+        try:
+            body = json.loads(self.request.body or b"{}")
+            params = parse_job_request(body)
+            job_id = parse_job_id(body)
+        except (ValueError, TypeError) as e:
+            raise tornado.web.HTTPError(400, reason=str(e))
+
+        job = self.service.submit(params, job_id=job_id)
+        self.set_status(202)
+        self.set_header("Location", f"/jobs/{job.id}")
+        self.write(job.to_dict())
+
+
+class JobHandler(BaseHandler):
+    def get(self, job_id: str) -> None:
+        self.write(self.get_job(job_id).to_dict())
+
+
+class EventsHandler(BaseHandler):
+    """
+    Server-sent events: replays the job's history (after Last-Event-ID
+    if the client is reconnecting), then streams new events until the
+    job finishes.
+    """
+
+    async def get(self, job_id: str) -> None:
+        job = self.get_job(job_id)
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        self.set_header("X-Accel-Buffering", "no")
+
+        last_id = self.request.headers.get("Last-Event-ID") or self.get_query_argument("after", "")
+        cursor = int(last_id) + 1 if last_id.lstrip("-").isdigit() else 0
+
+        try:
+            while True:
+                events = job.events[cursor:]
+                for event in events:
+                    self.write(event.to_sse())
+                cursor += len(events)
+                await self.flush()
+                if job.finished and cursor >= len(job.events):
+                    break
+                if not await job.wait(cursor, KEEPALIVE_SECONDS):
+                    self.write(": keepalive\n\n")
+        except StreamClosedError:
+            return
+
+
+class AudioHandler(tornado.web.StaticFileHandler):
+    """
+    Serve a finished job's audio. StaticFileHandler provides Range,
+    If-None-Match and HEAD handling.
+    """
+
+    def initialize(self, service: PodcastService) -> None:
+        self.service = service
+        super().initialize(path=os.path.abspath(service.output_dir))
+
+    async def get(self, job_id: str, include_body: bool = True) -> None:
+        job = self.service.jobs.get(job_id)
+        if job is None:
+            raise tornado.web.HTTPError(404, reason=f"Unknown job {job_id}")
+        if job.status != SUCCEEDED:
+            raise tornado.web.HTTPError(409, reason=f"Job {job_id} is {job.status}")
+        await super().get(os.path.basename(job.output_file), include_body)
+
+    def get_content_type(self) -> str:
+        return EXPORT_FORMATS[self.service.jobs[self.path_args[0]].params["output_format"]]["mime"]
+
+    def write_error(self, status_code: int, **kwargs: Any) -> None:
+        self.finish({"error": self._reason})
+
+
+class HealthHandler(BaseHandler):
+    def get(self) -> None:
+        counts: Dict[str, int] = {}
+        for job in self.service.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        self.write({
+            "status": "ok",
+            "jobs": counts,
+            "pipelines": {model: pipeline.report() for model, pipeline in self.service.pipelines.items()},
+        })
+
+
+def make_app(service: PodcastService) -> tornado.web.Application:
+    options = {"service": service}
+    return tornado.web.Application([
+        (r"/jobs", JobsHandler, options),
+        (rf"/jobs/({JOB_ID_PATTERN})", JobHandler, options),
+        (rf"/jobs/({JOB_ID_PATTERN})/events", EventsHandler, options),
+        (rf"/jobs/({JOB_ID_PATTERN})/audio", AudioHandler, options),
+        (r"/healthz", HealthHandler, options),
+    ])
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+
+async def serve(port: int, address: str, output_dir: str) -> None:
+    warm_up(gemini_sdk=not use_synthetic_backend())
+    service = PodcastService(output_dir)
+    server = make_app(service).listen(port, address)
+    await service.prune_checkpoints()
+    pruner = tornado.ioloop.PeriodicCallback(service.prune_checkpoints, PRUNE_INTERVAL * 1000)
+    pruner.start()
+    print(f"🎙️ Podcast API on http://{address}:{port} (Ctrl-C to stop)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        pruner.stop()
+        server.stop()
+        await service.close()
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+    )
+
+    parser = argparse.ArgumentParser(description="Podcast generation HTTP API")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--address", default="0.0.0.0")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.port, args.address, args.output_dir))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
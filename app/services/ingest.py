@@ -0,0 +1,572 @@
+"""
+Document ingestion: PDF, HTML, Markdown and text files to clean prose.
+
+Text copied out of PDFs arrives with hyphenated line breaks, hard-wrapped
+lines, running headers and footers, page numbers and arXiv stamps, all of
+which cost tokens and distract the script model. Documents are extracted
+page by page (PDF via pypdf, HTML with a streaming stdlib parser, text
+and Markdown line by line) and each page is normalised as it arrives and
+written straight to a cache keyed by the file's content hash. The raw
+document is never held in memory whole, and ingesting the same file
+again is a single file read.
+
+Ingest files and print what was saved (from app/):
+    python -m services.ingest paper.pdf page.html notes.md
+    python -m services.ingest paper.pdf --out cleaned.txt
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import unicodedata
+from dataclasses import asdict, dataclass
+from html.parser import HTMLParser
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDF support is optional
+    PdfReader = None
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+DEFAULT_CACHE_DIR = os.getenv("PODCAST_INGEST_CACHE_DIR", os.path.join(".cache", "ingest"))
+
+# Bump when normalisation changes, so cached text is re-extracted
+NORMALIZER_VERSION = 3
+
+KIND_BY_EXTENSION = {
+    ".pdf": "pdf",
+    ".html": "html",
+    ".htm": "html",
+    ".xhtml": "html",
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".txt": "text",
+}
+
+READ_CHUNK = 1 << 20
+HTML_CHUNK = 1 << 16
+# Text and Markdown are cut into pages at the first blank line after this many lines
+TEXT_PAGE_LINES = 200
+
+# Lines this short near the top or bottom of a PDF page can be running headers
+MAX_EDGE_LINE_CHARS = 120
+EDGE_LINES = 2
+
+# Lines shorter than this fraction of a page's typical (80th percentile)
+# line length end a paragraph, once lines are long enough to look wrapped
+SHORT_LINE_RATIO = 0.6
+WIDTH_PERCENTILE = 0.8
+MIN_WRAP_WIDTH = 40
+
+# A paragraph held back for the next page is emitted once it is this long
+MAX_CARRY_LINES = 200
+
+# A references heading only ends the document in its second half
+REFERENCES_MIN_POSITION = 0.5
+
+
+def pdf_available() -> bool:
+    return PdfReader is not None
+
+
+def supported_extensions() -> List[str]:
+    """
+    File extensions that can be ingested here (PDF only with pypdf).
+    """
+    return [
+        extension for extension, kind in KIND_BY_EXTENSION.items()
+        if kind != "pdf" or pdf_available()
+    ]
+
+
+def document_kind(path: str) -> str:
+    return KIND_BY_EXTENSION.get(os.path.splitext(path)[1].lower(), "text")
+
+# ----------------------------------------------------------------------
+# Normalisation
+# ----------------------------------------------------------------------
+
+PAGE_NUMBER = re.compile(r"^\s*(page\s+)?\d{1,4}(\s*(of|/)\s*\d{1,4})?\s*$", re.IGNORECASE)
+ARXIV_STAMP = re.compile(r"^\s*arXiv:\d{4}\.\d{4,5}(v\d+)?\b", re.IGNORECASE)
+REFERENCES_HEADING = re.compile(
+    r"^\s*(\d+\.?\s*)?(references|bibliography|works cited)\s*$", re.IGNORECASE
+)
+LIST_ITEM = re.compile(r"^\s*([•◦▪‣∙\-*+–]|\d{1,3}[.)])\s+")
+SECTION_HEADING = re.compile(r"^(\d+(\.\d+)*\.?|[IVX]+\.)\s+[A-Z]")
+LINE_END_HYPHEN = re.compile(r"([A-Za-z]+)-$")
+HYPHENATED_WORD = re.compile(r"\b[A-Za-z]+-[A-Za-z]+\b")
+SENTENCE_END = re.compile(r"[.!?:;\"'”’)\]]$")
+
+
+def _edge_key(line: str) -> str:
+    # Running headers differ only in their page number
+    return re.sub(r"\d+", "#", line.strip().lower())
+
+
+def _join_lines(lines: List[str], hyphenated: Optional[set] = None) -> str:
+    """
+    Join the hard-wrapped lines of one paragraph, undoing hyphenation
+    at line ends and keeping list items on their own lines.
+
+    A word split at a hyphen keeps it when the hyphenated form appears
+    elsewhere in hyphenated (e.g. "re-ranking").
+    """
+    parts: List[str] = []
+    previous = ""
+    for line in lines:
+        line = line.strip()
+        split = LINE_END_HYPHEN.search(previous)
+        if not parts:
+            parts.append(line)
+        elif LIST_ITEM.match(line):
+            parts.append("\n" + line)
+        elif split and line[:1].islower():
+            tail = re.match(r"\w+", line)
+            keep = hyphenated and tail and f"{split.group(1)}-{tail.group(0)}".lower() in hyphenated
+            if not keep:
+                parts[-1] = parts[-1][:-1]
+            parts.append(line)
+        else:
+            parts.append(" " + line)
+        previous = line
+    return re.sub(r"[ \t]+", " ", "".join(parts))
+
+
+class TextNormalizer:
+    """
+    Cleans extracted text page by page.
+
+    Keeps a little state between pages: paragraphs that run over a page
+    break are joined and (optionally) everything from a references
+    heading in the second half of a document is cut. With detect_headers
+    (PDF pages), page numbers, arXiv stamps and running headers and
+    footers seen at the edge of an earlier page are dropped too; without
+    it no line is removed, only rejoined.
+    """
+
+    def __init__(self, detect_headers: bool = False, drop_references: bool = True):
+        self.detect_headers = detect_headers
+        self.drop_references = drop_references
+        self.finished = False
+        self._carry: List[str] = []
+        self._edges: set = set()
+        self._hyphenated: set = set()
+
+    def _drop_edges(self, lines: List[str]) -> List[str]:
+        content = [i for i, line in enumerate(lines) if line.strip()]
+        # Short pages have lines that are both a first and a last one
+        edges = sorted(set(content[:EDGE_LINES] + content[-EDGE_LINES:]))
+        drop = set()
+        for i in edges:
+            if len(lines[i].strip()) > MAX_EDGE_LINE_CHARS:
+                continue
+            key = _edge_key(lines[i])
+            if key in self._edges:
+                drop.add(i)
+            self._edges.add(key)
+        return [line for i, line in enumerate(lines) if i not in drop]
+
+    def feed(self, page: str, position: Optional[float] = None) -> str:
+        """
+        Normalise one page.
+
+        Args:
+            page: Raw page text
+            position: Fraction of the document before this page, if known
+
+        Returns:
+            Finished paragraphs, separated by blank lines; the last
+            paragraph is held back if it may continue on the next page
+        """
+        if self.finished:
+            return ""
+
+        page = unicodedata.normalize("NFKC", page).replace("\u00ad", "")
+        lines = page.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        if self.detect_headers:
+            lines = self._drop_edges(lines)
+
+        # Hard-wrapped lines run close to the page's text width; a clearly
+        # shorter one ends its paragraph (PDF text rarely keeps blank lines)
+        lengths = sorted(len(line.strip()) for line in lines if line.strip())
+        width = lengths[int(WIDTH_PERCENTILE * (len(lengths) - 1))] if lengths else 0
+        short = SHORT_LINE_RATIO * width if width >= MIN_WRAP_WIDTH else 0
+
+        paragraphs: List[List[str]] = []
+        current = self._carry
+        self._carry = []
+        hyphenated = {word.lower() for word in HYPHENATED_WORD.findall(page)}
+        ended = False
+        # Blank lines end a paragraph only between text on this page
+        gap = on_page = False
+        for line in lines:
+            # Page furniture only exists on extracted pages; elsewhere a
+            # line like "2024" is content
+            if self.detect_headers and (PAGE_NUMBER.match(line) or ARXIV_STAMP.match(line)):
+                continue
+            if (
+                self.drop_references
+                and position is not None
+                and position >= REFERENCES_MIN_POSITION
+                and REFERENCES_HEADING.match(line)
+            ):
+                self.finished = True
+                break
+            stripped = line.strip()
+            if not stripped:
+                gap = on_page
+                continue
+            # A short line is a paragraph end unless the text carries on in
+            # lowercase; a short numbered heading also starts a new one
+            is_short = len(stripped) < short
+            if current and (
+                gap
+                or (ended and not stripped[:1].islower())
+                or (is_short and SECTION_HEADING.match(stripped))
+            ):
+                paragraphs.append(current)
+                current = []
+            gap = False
+            on_page = True
+            current.append(line)
+            ended = is_short and not stripped.endswith("-")
+
+        if current:
+            if (
+                self.finished
+                or ended
+                or SENTENCE_END.search(current[-1].strip())
+                or len(current) >= MAX_CARRY_LINES
+            ):
+                paragraphs.append(current)
+            else:
+                self._carry = current
+
+        self._hyphenated = hyphenated
+        return "\n\n".join(_join_lines(paragraph, hyphenated) for paragraph in paragraphs)
+
+    def flush(self) -> str:
+        carry, self._carry = self._carry, []
+        return _join_lines(carry, self._hyphenated) if carry else ""
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalise a whole text in one go (e.g. text pasted into the app).
+    """
+    normalizer = TextNormalizer(drop_references=False)
+    return "\n\n".join(part for part in (normalizer.feed(text), normalizer.flush()) if part)
+
+# ----------------------------------------------------------------------
+# Extraction
+# ----------------------------------------------------------------------
+
+
+def iter_pdf_pages(path: str) -> Iterator[Tuple[str, float]]:
+    """
+    Yield (text, position) per page; pypdf parses each page on access.
+    """
+    if PdfReader is None:
+        raise RuntimeError("PDF ingestion needs pypdf (pip install pypdf)")
+    reader = PdfReader(path)
+    total = len(reader.pages)
+    for index, page in enumerate(reader.pages):
+        yield page.extract_text() or "", index / total
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """
+    Collects the text of block elements, skipping scripts, styles and
+    page chrome (navigation, headers, footers, asides).
+    """
+
+    SKIP = {"script", "style", "noscript", "template", "svg", "head", "nav", "header", "footer", "aside", "form"}
+    BLOCK = {
+        "p", "div", "section", "article", "main", "li", "dt", "dd", "blockquote", "pre",
+        "h1", "h2", "h3", "h4", "h5", "h6", "tr", "figcaption", "table", "ul", "ol",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[str] = []
+        self._parts: List[str] = []
+        self._skip_depth = 0
+
+    def _flush(self) -> None:
+        text = " ".join("".join(self._parts).split())
+        if text:
+            self.blocks.append(text)
+        self._parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip_depth += 1
+        elif tag in self.BLOCK or tag == "br":
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in self.BLOCK:
+            self._flush()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "br":
+            self._flush()
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._parts.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def iter_html_pages(path: str) -> Iterator[Tuple[str, Optional[float]]]:
+    """
+    Feed the file to the parser in chunks and yield the blocks completed
+    by each chunk, one paragraph per block.
+    """
+    parser = _HTMLTextExtractor()
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while True:
+            chunk = f.read(HTML_CHUNK)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            if parser.blocks:
+                yield "\n\n".join(parser.blocks), None
+                parser.blocks = []
+    parser.close()
+    if parser.blocks:
+        yield "\n\n".join(parser.blocks), None
+
+
+MD_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+MD_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+MD_LINK_DEFINITION = re.compile(r"^\s*\[[^\]]+\]:\s+\S+")
+MD_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+")
+MD_EMPHASIS = re.compile(r"(?<!\w)([*_]{1,3})(?=\S)(.+?)(?<=\S)\1(?!\w)")
+MD_TABLE_RULE = re.compile(r"^\s*\|?[\s:|-]+\|[\s:|-]*$")
+MD_FENCE = re.compile(r"^\s*(```|~~~)")
+HTML_TAG = re.compile(r"<[^>]+>")
+
+
+def strip_markdown(line: str) -> str:
+    """
+    Markdown syntax removed from one line, keeping the words.
+    """
+    if MD_LINK_DEFINITION.match(line) or MD_TABLE_RULE.match(line):
+        return ""
+    heading = MD_HEADING.match(line)
+    line = MD_HEADING.sub("", line)
+    line = MD_IMAGE.sub("", line)
+    line = MD_LINK.sub(r"\1", line)
+    line = MD_EMPHASIS.sub(r"\2", line)
+    line = HTML_TAG.sub("", line).replace("`", "")
+    if line.count("|") >= 2:
+        line = " ".join(cell.strip() for cell in line.strip().strip("|").split("|"))
+    if heading:
+        # Headings are paragraphs of their own
+        line = f"\n{line.strip()}\n"
+    return line
+
+
+def iter_text_pages(path: str, markdown: bool = False) -> Iterator[Tuple[str, Optional[float]]]:
+    """
+    Yield the file in pages of roughly TEXT_PAGE_LINES lines, cut at
+    paragraph breaks.
+    """
+    lines: List[str] = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if markdown:
+                if MD_FENCE.match(line):
+                    continue
+                line = strip_markdown(line.rstrip("\n")) + "\n"
+            lines.append(line)
+            if len(lines) >= TEXT_PAGE_LINES and not line.strip():
+                yield "".join(lines), None
+                lines = []
+    if lines:
+        yield "".join(lines), None
+
+
+def iter_pages(path: str, kind: Optional[str] = None) -> Iterator[Tuple[str, Optional[float]]]:
+    kind = kind or document_kind(path)
+    if kind == "pdf":
+        return iter_pdf_pages(path)
+    if kind == "html":
+        return iter_html_pages(path)
+    return iter_text_pages(path, markdown=kind == "markdown")
+
+# ----------------------------------------------------------------------
+# Ingestion
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class IngestedDocument:
+    source: str
+    kind: str
+    key: str
+    text: str
+    pages: int
+    raw_chars: int
+    cached: bool = False
+
+    @property
+    def chars(self) -> int:
+        return len(self.text)
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(cache_dir: str, key: str) -> Tuple[str, str]:
+    base = os.path.join(cache_dir, key[:2], key)
+    return f"{base}.txt", f"{base}.json"
+
+
+def ingest_file(
+    path: str,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    drop_references: bool = True,
+    source: Optional[str] = None,
+    digest: Optional[str] = None,
+) -> IngestedDocument:
+    """
+    Extract and normalise a document, or return it from the cache.
+
+    Pages are normalised as they are extracted and appended to the cache
+    file, so memory use is bounded by a page plus the cleaned result.
+
+    Args:
+        path: File to ingest; its extension selects the extractor
+        cache_dir: Cache directory for extracted text
+        drop_references: Cut a trailing references section
+        source: Name to report (defaults to path)
+        digest: sha256 of the file, if already known
+
+    Returns:
+        The cleaned document
+    """
+    kind = document_kind(path)
+    digest = digest or file_digest(path)
+    key = hashlib.sha256(
+        f"{NORMALIZER_VERSION}:{kind}:{int(drop_references)}:{digest}".encode("utf-8")
+    ).hexdigest()
+    text_path, meta_path = _cache_paths(cache_dir, key)
+
+    if os.path.exists(text_path) and os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(text_path, encoding="utf-8") as f:
+            text = f.read()
+        return IngestedDocument(source or path, kind, key, text, meta["pages"], meta["raw_chars"], cached=True)
+
+    os.makedirs(os.path.dirname(text_path), exist_ok=True)
+    normalizer = TextNormalizer(detect_headers=kind == "pdf", drop_references=drop_references)
+    pages = raw_chars = 0
+    written = False
+    tmp_path = f"{text_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        def write(part: str) -> None:
+            nonlocal written
+            if part:
+                out.write(("\n\n" if written else "") + part)
+                written = True
+
+        for page, position in iter_pages(path, kind):
+            pages += 1
+            raw_chars += len(page)
+            write(normalizer.feed(page, position))
+            if normalizer.finished:
+                break
+        write(normalizer.flush())
+    os.replace(tmp_path, text_path)
+
+    meta = {"source": source or path, "kind": kind, "pages": pages, "raw_chars": raw_chars}
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    with open(text_path, encoding="utf-8") as f:
+        text = f.read()
+    return IngestedDocument(source or path, kind, key, text, pages, raw_chars)
+
+
+def ingest_stream(
+    stream: BinaryIO,
+    name: str,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    drop_references: bool = True,
+) -> IngestedDocument:
+    """
+    Ingest an uploaded file-like object. It is copied to a temporary
+    file in chunks (hashing as it goes) so extraction can stream from disk.
+    """
+    digest = hashlib.sha256()
+    suffix = os.path.splitext(name)[1].lower()
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        for chunk in iter(lambda: stream.read(READ_CHUNK), b""):
+            digest.update(chunk)
+            tmp.write(chunk)
+    try:
+        return ingest_file(
+            tmp.name, cache_dir, drop_references, source=name, digest=digest.hexdigest()
+        )
+    finally:
+        os.remove(tmp.name)
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Extract clean text from documents")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--out", default=None, help="Write the cleaned text here (a directory for several files)")
+    parser.add_argument("--keep-references", action="store_true", help="Keep a trailing references section")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--json", action="store_true", help="Print metadata as JSON lines")
+    args = parser.parse_args()
+
+    for path in args.files:
+        document = ingest_file(path, args.cache_dir, drop_references=not args.keep_references)
+        if args.json:
+            meta = asdict(document)
+            meta.pop("text")
+            print(json.dumps({**meta, "chars": document.chars}))
+        else:
+            saved = 1 - document.chars / max(document.raw_chars, 1)
+            print(
+                f"📄 {path}: {document.kind}, {document.pages} pages, "
+                f"{document.raw_chars:,} → {document.chars:,} chars ({saved:.0%} smaller, "
+                f"~{document.chars // 4:,} tokens){' [cached]' if document.cached else ''}"
+            )
+        if args.out:
+            if len(args.files) > 1:
+                os.makedirs(args.out, exist_ok=True)
+                target = os.path.join(args.out, os.path.splitext(os.path.basename(path))[0] + ".txt")
+            else:
+                target = args.out
+            text_path, _ = _cache_paths(args.cache_dir, document.key)
+            shutil.copyfile(text_path, target)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""
+SQLite-backed job queue shared by the app, the CLI and worker processes.
+
+Jobs move queued → running → succeeded | failed (or cancelled). Workers
+claim the oldest queued job inside an IMMEDIATE transaction, so several
+processes can poll the same database without handing a job out twice.
+Progress, stage, a short message and partial results (e.g. the script
+before its audio is ready) are written back while a job runs, so any
+client can poll (or iterate watch()) for updates. Running jobs
+heartbeat; ones whose worker disappears are requeued and resume from
+their checkpoints. Worker writes only apply while that worker still owns
+the running job, so a slow original worker cannot overwrite the job
+once it has been handed to another.
+"""
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+DEFAULT_DB_PATH = os.getenv("PODCAST_JOB_DB", os.path.join(".cache", "jobs.sqlite3"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# A running job whose worker hasn't written anything for this long is
+# assumed lost (crash, restart) and handed to another worker
+STALE_AFTER_SECONDS = float(os.getenv("PODCAST_JOB_STALE_SECONDS", "120"))
+MAX_ATTEMPTS = int(os.getenv("PODCAST_JOB_MAX_ATTEMPTS", "3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    stage TEXT,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    updated_at REAL NOT NULL,
+    finished_at REAL,
+    dedupe_key TEXT,
+    partial TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+# Applied after SCHEMA; databases created before a column existed get it here
+MIGRATIONS = (
+    ("dedupe_key", "ALTER TABLE jobs ADD COLUMN dedupe_key TEXT"),
+    ("partial", "ALTER TABLE jobs ADD COLUMN partial TEXT"),
+)
+INDEXES = """
+CREATE INDEX IF NOT EXISTS jobs_dedupe_key ON jobs (dedupe_key, created_at);
+"""
+
+# A job with the same dedupe key in one of these states is shared
+REUSABLE_STATES = (QUEUED, RUNNING, SUCCEEDED)
+
+# ----------------------------------------------------------------------
+# Job
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class Job:
+    id: str
+    status: str
+    params: Dict[str, Any]
+    progress: float
+    stage: Optional[str]
+    message: Optional[str]
+    result: Optional[Dict[str, Any]]
+    error: Optional[str]
+    worker: Optional[str]
+    attempts: int
+    created_at: float
+    started_at: Optional[float]
+    updated_at: float
+    finished_at: Optional[float]
+    dedupe_key: Optional[str] = None
+    # Results published while the job runs
+    partial: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        data = dict(row)
+        data["params"] = json.loads(data["params"])
+        data["result"] = json.loads(data["result"]) if data["result"] else None
+        data["partial"] = json.loads(data["partial"]) if data.get("partial") else None
+        return cls(**data)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+# ----------------------------------------------------------------------
+# Queue
+# ----------------------------------------------------------------------
+
+
+class JobQueue:
+    """
+    Thin wrapper over a jobs table. Every call opens its own short-lived
+    connection, so an instance can be shared across threads and the same
+    database used from several processes.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS:
+                if column not in columns:
+                    conn.execute(statement)
+            conn.executescript(INDEXES)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _update(self, job_id: str, worker_id: Optional[str] = None, **fields: Any) -> bool:
+        """
+        Returns:
+            Whether the row was updated; with worker_id, only a running job
+            claimed by that worker is
+        """
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        query = f"UPDATE jobs SET {assignments} WHERE id = ?"
+        args: tuple = (*fields.values(), job_id)
+        if worker_id is not None:
+            query += " AND worker = ? AND status = ?"
+            args += (worker_id, RUNNING)
+        with self._connect() as conn:
+            return conn.execute(query, args).rowcount == 1
+
+    # ------------------------------------------------------------------
+    # Producers
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        params: Dict[str, Any],
+        job_id: Optional[str] = None,
+        dedupe_key: Optional[str] = None,
+    ) -> str:
+        """
+        Queue a job.
+
+        With a dedupe_key, the latest job with the same key that is
+        queued, running or succeeded is returned instead of queuing a new
+        one, so identical requests share one job and its result.
+        """
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if dedupe_key is not None:
+                    row = conn.execute(
+                        "SELECT id, status FROM jobs WHERE dedupe_key = ? "
+                        "ORDER BY created_at DESC LIMIT 1",
+                        (dedupe_key,),
+                    ).fetchone()
+                    if row is not None and row["status"] in REUSABLE_STATES:
+                        conn.execute("COMMIT")
+                        return row["id"]
+                conn.execute(
+                    "INSERT INTO jobs (id, status, params, created_at, updated_at, dedupe_key) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, QUEUED, json.dumps(params), now, now, dedupe_key),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def unshare(self, job_id: str) -> None:
+        """
+        Stop handing this job out to submits with its dedupe key (e.g.
+        once its output is gone).
+        """
+        self._update(job_id, dedupe_key=None)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job that has not started yet.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = ?",
+                (CANCELLED, now, now, job_id, QUEUED),
+            )
+        return cursor.rowcount == 1
+
+    def retry(self, job_id: str) -> bool:
+        """
+        Queue a failed job again under the same id, so it resumes from
+        its checkpoints.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, error = NULL, finished_at = NULL, "
+                "message = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (QUEUED, "Retrying from checkpoint", time.time(), job_id, FAILED),
+            )
+        return cursor.rowcount == 1
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        """
+        Atomically move the oldest queued job to running.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                    (QUEUED,),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, "
+                    "started_at = ?, updated_at = ? WHERE id = ?",
+                    (RUNNING, worker_id, now, now, row["id"]),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"])
+
+    def update_progress(
+        self,
+        job_id: str,
+        progress: float,
+        stage: Optional[str] = None,
+        message: Optional[str] = None,
+        partial: Optional[Dict[str, Any]] = None,
+        worker_id: Optional[str] = None,
+    ) -> bool:
+        fields: Dict[str, Any] = {"progress": progress, "stage": stage, "message": message}
+        if partial is not None:
+            fields["partial"] = json.dumps(partial)
+        return self._update(job_id, worker_id, **fields)
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """
+        Returns:
+            False once the worker no longer owns the job
+        """
+        return self._update(job_id, worker_id)
+
+    def requeue_stale(
+        self,
+        stale_after: float = STALE_AFTER_SECONDS,
+        max_attempts: int = MAX_ATTEMPTS,
+        on_failed: Optional[Callable[[str], None]] = None,
+    ) -> int:
+        """
+        Put running jobs whose worker went silent back in the queue (they
+        resume from their checkpoints), or fail them after max_attempts.
+
+        Args:
+            on_failed: Called with the id of each job failed here, after
+                the transaction commits
+
+        Returns:
+            Number of jobs requeued or failed
+        """
+        now = time.time()
+        cutoff = now - stale_after
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                failed = [
+                    row["id"]
+                    for row in conn.execute(
+                        "SELECT id FROM jobs WHERE status = ? AND updated_at < ? AND attempts >= ?",
+                        (RUNNING, cutoff, max_attempts),
+                    ).fetchall()
+                ]
+                conn.executemany(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+                    [(FAILED, f"Worker lost {max_attempts} times", now, now, job_id) for job_id in failed],
+                )
+                requeued = conn.execute(
+                    "UPDATE jobs SET status = ?, worker = NULL, message = ?, updated_at = ? "
+                    "WHERE status = ? AND updated_at < ?",
+                    (QUEUED, "Requeued after worker was lost", now, RUNNING, cutoff),
+                ).rowcount
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if on_failed is not None:
+            for job_id in failed:
+                on_failed(job_id)
+        return len(failed) + requeued
+
+    def complete(self, job_id: str, result: Dict[str, Any], worker_id: str) -> bool:
+        return self._update(
+            job_id,
+            worker_id,
+            status=SUCCEEDED,
+            progress=1.0,
+            stage="done",
+            result=json.dumps(result),
+            finished_at=time.time(),
+        )
+
+    def fail(self, job_id: str, error: str, worker_id: str) -> bool:
+        return self._update(job_id, worker_id, status=FAILED, error=error, finished_at=time.time())
+
+    # ------------------------------------------------------------------
+    # Readers
+    # ------------------------------------------------------------------
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Job]:
+        query = "SELECT * FROM jobs"
+        args: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._connect() as conn:
+            rows = conn.execute(query, (*args, limit)).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def watch(
+        self,
+        job_id: str,
+        poll_interval: float = 0.5,
+        timeout: Optional[float] = None,
+    ) -> Iterator[Job]:
+        """
+        Yield the job each time it changes, until it finishes.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        last_update = None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                raise KeyError(f"Unknown job {job_id}")
+            if job.updated_at != last_update:
+                last_update = job.updated_at
+                yield job
+            if job.finished:
+                return
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Job {job_id} still {job.status}")
+            time.sleep(poll_interval)
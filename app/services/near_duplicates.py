@@ -0,0 +1,299 @@
+"""
+Near-duplicate detection for input documents (MinHash + LSH).
+
+Batch feeds carry syndicated and lightly edited copies of the same
+article. Their content hashes differ, so each copy used to cost a full
+script generation and TTS render. Each document is reduced to a MinHash
+signature over word 5-gram shingles; locality-sensitive hashing splits
+the signature into bands, and documents sharing any band are candidates
+whose estimated Jaccard similarity is then checked against a threshold.
+Documents shorter than one shingle have no signature and are never
+matched.
+
+Band keys live in one sorted NumPy array, so a lookup is two
+searchsorted calls plus a signature comparison over the few candidates,
+well under a millisecond with hundreds of thousands of documents.
+Recent additions sit in a small dict until they are merged in.
+
+    index = NearDuplicateIndex(threshold=0.85)
+    signature = index.signature(text)
+    if signature is not None and index.query(signature) is None:
+        index.add(doc_id, signature)
+    index.save(directory)
+
+Measure lookups (from app/):
+    python -m benchmarks.bench_near_duplicates --documents 200000
+"""
+
+import json
+import os
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+# Estimated Jaccard similarity at which a document counts as a duplicate
+DEFAULT_THRESHOLD = float(os.getenv("PODCAST_NEAR_DUPLICATE_THRESHOLD", "0.85"))
+
+NUM_PERM = 128
+SHINGLE_WORDS = 5
+SEED = 1
+
+# Shingles hashed per permutation block (bounds the temporary matrix)
+SHINGLE_CHUNK = 8192
+
+# Additions held in the pending dict before they are merged into the sorted keys
+MERGE_EVERY = 4096
+
+MASK_32 = np.uint64(0xFFFFFFFF)
+WORD = re.compile(r"\w+")
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """
+    (bands, rows) minimising the sum of false positive and false
+    negative probability mass around threshold.
+    """
+    similarity = np.linspace(0.0, 1.0, 201)
+    best, best_error = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        hit = 1 - (1 - similarity ** rows) ** bands
+        below = similarity < threshold
+        error = np.trapezoid(hit[below], similarity[below]) + np.trapezoid(1 - hit[~below], similarity[~below])
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+@dataclass
+class Match:
+    doc_id: str
+    similarity: float
+    duration_seconds: float = 0.0
+
+# ----------------------------------------------------------------------
+# Index
+# ----------------------------------------------------------------------
+
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures of indexed documents plus an LSH band index.
+
+    Removal leaves a tombstone; removed documents never match.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = NUM_PERM, seed: int = SEED):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.seed = seed
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: h(x) = ((a * x + b) mod 2**64) >> 32
+        self._a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self._band_mix = rng.integers(1, 2 ** 63, (self.bands, self.rows), dtype=np.uint64) | np.uint64(1)
+        self._band_salt = rng.integers(0, 2 ** 63, self.bands, dtype=np.uint64)
+
+        self.ids: List[str] = []
+        self.durations: List[float] = []
+        self._positions: Dict[str, int] = {}
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._row_keys = np.zeros((0, self.bands), dtype=np.uint64)
+        self._removed = np.zeros(0, dtype=bool)
+        # Merged band keys, sorted, and the row each belongs to
+        self._keys = np.zeros(0, dtype=np.uint64)
+        self._key_rows = np.zeros(0, dtype=np.int64)
+        self._merged = 0
+        self._pending: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids) - int(self._removed[: len(self.ids)].sum())
+
+    def __contains__(self, doc_id: str) -> bool:
+        position = self._positions.get(doc_id)
+        return position is not None and not self._removed[position]
+
+    # ------------------------------------------------------------------
+    # Signatures
+    # ------------------------------------------------------------------
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        MinHash signature of text's word 5-gram shingles, or None when
+        text has fewer than SHINGLE_WORDS words. Such short texts share
+        too little to tell a copy from a coincidence, so they are never
+        indexed or matched.
+        """
+        words = WORD.findall(text.lower())
+        if len(words) < SHINGLE_WORDS:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64, count=len(words)
+        )
+        shingles = np.zeros(len(hashes) - SHINGLE_WORDS + 1, dtype=np.uint64)
+        for offset in range(SHINGLE_WORDS):
+            shingles = shingles * np.uint64(0x100000001B3) + hashes[offset:len(shingles) + offset]
+        shingles = (shingles >> np.uint64(32)) ^ (shingles & MASK_32)
+        shingles = np.unique(shingles)
+
+        signature = np.full(self.num_perm, 0xFFFFFFFF, dtype=np.uint64)
+        for start in range(0, len(shingles), SHINGLE_CHUNK):
+            chunk = shingles[start:start + SHINGLE_CHUNK]
+            hashed = (self._a[:, None] * chunk[None, :] + self._b[:, None]) >> np.uint64(32)
+            np.minimum(signature, hashed.min(axis=1), out=signature)
+        return signature.astype(np.uint32)
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        # (n, num_perm) -> (n, bands); each band hashes to its own key space
+        bands = signatures[:, : self.bands * self.rows].astype(np.uint64)
+        bands = bands.reshape(len(signatures), self.bands, self.rows)
+        return (bands * self._band_mix).sum(axis=2, dtype=np.uint64) ^ self._band_salt
+
+    # ------------------------------------------------------------------
+    # Add / Query
+    # ------------------------------------------------------------------
+
+    def add(self, doc_id: str, signature: np.ndarray, duration_seconds: float = 0.0) -> None:
+        """
+        Index a document (replacing an earlier entry with the same id).
+        """
+        if doc_id in self._positions:
+            self.remove(doc_id)
+        row = len(self.ids)
+        self.ids.append(doc_id)
+        self.durations.append(duration_seconds)
+        self._positions[doc_id] = row
+        if row >= len(self._signatures):
+            capacity = max(1024, 2 * len(self._signatures))
+            self._signatures = np.resize(self._signatures, (capacity, self.num_perm))
+            self._row_keys = np.resize(self._row_keys, (capacity, self.bands))
+            self._removed = np.resize(self._removed, capacity)
+        keys = self._band_keys(signature[None, :])[0]
+        self._signatures[row] = signature
+        self._row_keys[row] = keys
+        self._removed[row] = False
+        for key in keys.tolist():
+            self._pending.setdefault(key, []).append(row)
+        if row + 1 - self._merged >= MERGE_EVERY:
+            self._merge()
+
+    def set_duration(self, doc_id: str, duration_seconds: float) -> None:
+        self.durations[self._positions[doc_id]] = duration_seconds
+
+    def remove(self, doc_id: str) -> None:
+        position = self._positions.pop(doc_id, None)
+        if position is not None:
+            self._removed[position] = True
+
+    def _merge(self) -> None:
+        # Sort the new keys, then merge the two sorted runs (timsort
+        # makes that linear)
+        count = len(self.ids)
+        keys = self._row_keys[self._merged:count].ravel()
+        rows = np.repeat(np.arange(self._merged, count, dtype=np.int64), self.bands)
+        order = np.argsort(keys, kind="stable")
+        keys = np.concatenate((self._keys, keys[order]))
+        rows = np.concatenate((self._key_rows, rows[order]))
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._key_rows = rows[order]
+        self._merged = count
+        self._pending = {}
+
+    def candidates(self, signature: np.ndarray) -> np.ndarray:
+        """
+        Rows sharing at least one band with signature.
+        """
+        keys = self._band_keys(signature[None, :])[0]
+        found: List[np.ndarray] = []
+        if len(self._keys):
+            lo = np.searchsorted(self._keys, keys, side="left")
+            hi = np.searchsorted(self._keys, keys, side="right")
+            found.extend(self._key_rows[start:end] for start, end in zip(lo.tolist(), hi.tolist()) if end > start)
+        if self._pending:
+            for key in keys.tolist():
+                rows = self._pending.get(key)
+                if rows:
+                    found.append(np.asarray(rows, dtype=np.int64))
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        rows = np.unique(np.concatenate(found))
+        return rows[~self._removed[rows]]
+
+    def query(self, signature: np.ndarray, exclude: Optional[str] = None) -> Optional[Match]:
+        """
+        The most similar indexed document at or above the threshold.
+        """
+        rows = self.candidates(signature)
+        if exclude is not None and exclude in self._positions:
+            rows = rows[rows != self._positions[exclude]]
+        if not len(rows):
+            return None
+        similarity = (self._signatures[rows] == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        if similarity[best] < self.threshold:
+            return None
+        row = int(rows[best])
+        return Match(self.ids[row], float(similarity[best]), self.durations[row])
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, directory: str) -> None:
+        """
+        Write live entries to directory (signatures.npy + index.json).
+        """
+        os.makedirs(directory, exist_ok=True)
+        live = np.flatnonzero(~self._removed[: len(self.ids)]).tolist()
+        meta = {
+            "num_perm": self.num_perm,
+            "seed": self.seed,
+            "ids": [self.ids[row] for row in live],
+            "durations": [self.durations[row] for row in live],
+        }
+        signatures_path = os.path.join(directory, "signatures.npy")
+        meta_path = os.path.join(directory, "index.json")
+        with open(f"{signatures_path}.tmp", "wb") as f:
+            np.save(f, self._signatures[live])
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{signatures_path}.tmp", signatures_path)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    @classmethod
+    def load(cls, directory: str, threshold: float = DEFAULT_THRESHOLD) -> "NearDuplicateIndex":
+        """
+        Load an index saved by save(), or an empty one if there is none.
+        Band keys are rebuilt, so the threshold may differ from the one
+        the index was saved with.
+        """
+        meta_path = os.path.join(directory, "index.json")
+        if not os.path.exists(meta_path):
+            return cls(threshold)
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(threshold, num_perm=meta["num_perm"], seed=meta["seed"])
+        signatures = np.load(os.path.join(directory, "signatures.npy"))
+        count = len(meta["ids"])
+        index.ids = list(meta["ids"])
+        index.durations = list(meta["durations"])
+        index._positions = {doc_id: row for row, doc_id in enumerate(index.ids)}
+        index._signatures = signatures
+        index._row_keys = np.concatenate(
+            [index._band_keys(signatures[start:start + SHINGLE_CHUNK]) for start in range(0, count, SHINGLE_CHUNK)]
+            or [np.zeros((0, index.bands), dtype=np.uint64)]
+        )
+        index._removed = np.zeros(count, dtype=bool)
+        if count:
+            index._merge()
+        return index
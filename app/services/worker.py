@@ -0,0 +1,440 @@
+"""
+Worker processes that run podcast jobs from the SQLite job queue.
+
+Start a standalone pool (from app/):
+    python -m services.worker run --workers 4
+
+Submit a job and follow its progress:
+    python -m services.worker submit notes.txt --voices kore puck --wait
+    python -m services.worker status <job_id>
+    python -m services.worker retry <job_id>
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, List, Optional
+
+from audio.estimator import load_estimator, record_run
+from audio.export import EXPORT_FORMATS
+from audio.google_tts import MultiSpeakerTTS
+from audio.postprocess import AudioPostProcessor
+from audio.synthetic_tts import multi_speaker_tts_from_env, use_synthetic_backend
+from audio.tts_cache import TTSSegmentCache
+from core.clients import warm_up
+from services.audio_service import AudioPipeline, EpisodeRequest
+from services.checkpoint import CheckpointStore
+from services.job_queue import DEFAULT_DB_PATH, MAX_ATTEMPTS, Job, JobQueue
+
+logger = logging.getLogger("podcast-generator")
+
+# ----------------------------------------------------------------------
+# Config
+# ----------------------------------------------------------------------
+
+DEFAULT_OUTPUT_DIR = os.getenv("PODCAST_OUTPUT_DIR", os.path.join(".cache", "podcasts"))
+DEFAULT_WORKERS = int(os.getenv("PODCAST_WORKERS", "2"))
+POLL_INTERVAL = 0.5
+HEARTBEAT_INTERVAL = 15.0
+# How often each worker prunes abandoned checkpoints
+PRUNE_INTERVAL = 3600.0
+
+# Share of the progress bar given to script generation; TTS gets the rest
+SCRIPT_PROGRESS = 0.15
+
+
+class JobLost(RuntimeError):
+    """
+    The job was handed to another worker (e.g. after a missed heartbeat).
+    """
+
+
+def job_params(
+    input_text: str,
+    speaker_voices: List[str],
+    text_model: str = "gemini-3-pro-preview",
+    tts_model: str = "gemini-2.5-flash-preview-tts",
+    temperature: float = 0.7,
+    output_format: str = "wav",
+    max_cost_usd: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Parameters for a podcast generation job (stored as JSON).
+    """
+    return {
+        "input_text": input_text,
+        "speaker_voices": speaker_voices,
+        "text_model": text_model,
+        "tts_model": tts_model,
+        "temperature": temperature,
+        "output_format": output_format,
+        "max_cost_usd": max_cost_usd,
+    }
+
+
+def job_key(params: Dict[str, Any]) -> str:
+    """
+    Digest of a job's parameters, so identical requests can share one
+    job. The budget is included, since a job that passed a larger budget
+    may have cost more than the caller allows.
+    """
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+# ----------------------------------------------------------------------
+# Running One Job
+# ----------------------------------------------------------------------
+
+
+def run_job(
+    job: Job,
+    queue: JobQueue,
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    runner: Optional[asyncio.Runner] = None,
+    tts: Optional[MultiSpeakerTTS] = None,
+) -> Dict[str, Any]:
+    """
+    Generate the podcast for one job, reporting progress to the queue.
+
+    The script and the turns of each rendered segment are published as
+    the job's partial result, so clients can show the transcript while
+    the audio is still being made.
+
+    Args:
+        runner: Long-lived event loop to run on; a worker keeps one for
+            all its jobs so the TTS client's connections survive between
+            jobs (a fresh loop per job if None)
+        tts: TTS backend shared across jobs (env-selected if None)
+
+    Returns:
+        Result dict stored on the job (output file, script, tokens)
+    """
+    params = job.params
+    output_format = params.get("output_format", "wav")
+    output_file = os.path.join(
+        output_dir, f"{job.id}{EXPORT_FORMATS[output_format]['extension']}"
+    )
+    os.makedirs(output_dir, exist_ok=True)
+
+    estimator = load_estimator()
+    tts_model = params["tts_model"]
+    max_cost = params.get("max_cost_usd")
+    partial: Dict[str, Any] = {"script": None, "segments": {}}
+
+    def update_progress(*args: Any) -> None:
+        # Raising fails the episode, so a worker that lost the job stops
+        if not queue.update_progress(job.id, *args, worker_id=job.worker):
+            raise JobLost(f"Job {job.id} is no longer owned by {job.worker}")
+
+    def on_event(episode_id: str, event: str, data: dict) -> None:
+        if event == "resumed":
+            update_progress(
+                SCRIPT_PROGRESS,
+                data["stage"],
+                f"Resumed from checkpoint ({data.get('segments', 0)} segments done)",
+            )
+        elif event == "script":
+            estimate = estimator.estimate(data["script"], tts_model, data["speaker_voice_map"])
+            message = f"Script ready (~{estimate.duration_seconds / 60:.1f} min, ~${estimate.cost_usd:.3f})"
+            if max_cost is not None and estimate.cost_usd > max_cost:
+                raise RuntimeError(
+                    f"Estimated TTS cost ${estimate.cost_usd:.3f} exceeds the ${max_cost:.2f} budget"
+                )
+            partial["script"] = data["script"].model_dump()
+            update_progress(SCRIPT_PROGRESS, "synthesize", message, partial)
+        elif event == "segment":
+            # Turns per finished segment; keys are str to survive JSON
+            partial["segments"][str(data["index"])] = len(data["turns"])
+            progress = SCRIPT_PROGRESS + (1 - SCRIPT_PROGRESS) * 0.95 * data["done"] / data["total"]
+            update_progress(progress, "synthesize", f"Segment {data['done']}/{data['total']}", partial)
+        elif event == "encoded":
+            update_progress(0.99, "encode", "Encoding finished")
+
+    pipeline = AudioPipeline(
+        tts=tts,
+        cache=TTSSegmentCache(),
+        postprocessor=AudioPostProcessor(),
+        estimator=estimator,
+        text_model=params["text_model"],
+        tts_model=tts_model,
+        temperature=params["temperature"],
+        on_event=on_event,
+        checkpoints=CheckpointStore(),
+    )
+
+    if job.attempts == 1:
+        update_progress(0.02, "generate", "Writing script")
+    request = EpisodeRequest(
+        episode_id=job.id,
+        output_file=output_file,
+        input_text=params["input_text"],
+        speaker_voices=params["speaker_voices"],
+        output_format=output_format,
+    )
+    run = runner.run if runner is not None else asyncio.run
+    (result,) = run(pipeline.run([request]))
+    if not result.ok:
+        raise RuntimeError(result.error)
+
+    turns = [(turn.speaker, turn.text) for turn in result.script.dialogue]
+    record_run(
+        turns,
+        result.speaker_voice_map,
+        tts_model,
+        {
+            **result.usage,
+            "segments": result.segments,
+            "cached_segments": result.cached_segments,
+            "duration_seconds": result.duration_seconds,
+        },
+    )
+
+    return {
+        "output_file": os.path.abspath(output_file),
+        "output_format": output_format,
+        "script": result.script.model_dump(),
+        "duration_seconds": result.duration_seconds,
+        "segments": result.segments,
+        "cached_segments": result.cached_segments,
+        "stages": pipeline.report(),
+        **result.usage,
+    }
+
+# ----------------------------------------------------------------------
+# Worker Loop
+# ----------------------------------------------------------------------
+
+
+def worker_main(
+    db_path: str = DEFAULT_DB_PATH,
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    stop_event: Optional[Any] = None,
+    poll_interval: float = POLL_INTERVAL,
+) -> None:
+    """
+    Claim and run jobs until stop_event is set.
+    """
+    queue = JobQueue(db_path)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Worker {worker_id} started")
+
+    # One event loop and TTS client for every job this worker runs,
+    # connected before the first job arrives
+    warm_up(gemini_sdk=not use_synthetic_backend())
+    with asyncio.Runner() as runner:
+        tts = multi_speaker_tts_from_env()
+        _work(queue, worker_id, output_dir, runner, tts, stop_event, poll_interval)
+
+    logger.info(f"Worker {worker_id} stopped")
+
+
+def _work(
+    queue: JobQueue,
+    worker_id: str,
+    output_dir: str,
+    runner: asyncio.Runner,
+    tts: MultiSpeakerTTS,
+    stop_event: Optional[Any],
+    poll_interval: float,
+) -> None:
+    checkpoints = CheckpointStore()
+    next_prune = time.monotonic()
+    while stop_event is None or not stop_event.is_set():
+        if time.monotonic() >= next_prune:
+            checkpoints.prune()
+            next_prune = time.monotonic() + PRUNE_INTERVAL
+        # Jobs failed for good will not resume, so their checkpoints go
+        queue.requeue_stale(on_failed=checkpoints.clear)
+        job = queue.claim(worker_id)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        logger.info(f"Worker {worker_id} running job {job.id} (attempt {job.attempts})")
+
+        # Keep the job fresh while long TTS calls run, so it isn't requeued
+        done = threading.Event()
+
+        def beat(job_id: str = job.id) -> None:
+            while not done.wait(HEARTBEAT_INTERVAL):
+                if not queue.heartbeat(job_id, worker_id):
+                    logger.warning(f"Worker {worker_id} no longer owns job {job_id}")
+                    return
+
+        heartbeat = threading.Thread(target=beat, daemon=True)
+        heartbeat.start()
+        try:
+            if not queue.complete(job.id, run_job(job, queue, output_dir, runner, tts), worker_id):
+                logger.warning(f"Job {job.id} was handed to another worker; result discarded")
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}\n{traceback.format_exc()}")
+            # A job handed to another worker is not ours to fail, and its
+            # checkpoints are in use
+            if queue.fail(job.id, str(e), worker_id) and job.attempts >= MAX_ATTEMPTS:
+                checkpoints.clear(job.id)
+        finally:
+            done.set()
+            heartbeat.join()
+
+
+class WorkerPool:
+    """
+    A pool of worker processes sharing one job database.
+
+    Uses the spawn start method so workers don't inherit the parent's
+    event loop, threads or open connections (e.g. from Streamlit).
+    """
+
+    def __init__(
+        self,
+        num_workers: int = DEFAULT_WORKERS,
+        db_path: str = DEFAULT_DB_PATH,
+        output_dir: str = DEFAULT_OUTPUT_DIR,
+    ):
+        self.num_workers = num_workers
+        self.db_path = db_path
+        self.output_dir = output_dir
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self.processes: List[multiprocessing.Process] = []
+
+    def start(self) -> "WorkerPool":
+        # Create the schema once before workers race to do it
+        JobQueue(self.db_path)
+        for index in range(self.num_workers):
+            process = self._context.Process(
+                target=worker_main,
+                args=(self.db_path, self.output_dir, self._stop),
+                name=f"podcast-worker-{index}",
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+        return self
+
+    def alive(self) -> int:
+        return sum(process.is_alive() for process in self.processes)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Let workers finish their current job, then exit.
+        """
+        self._stop.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+    def __enter__(self) -> "WorkerPool":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+
+def _print_job(job: Job) -> None:
+    line = f"{job.id} {job.status:<9} {job.progress * 100:5.1f}% {job.stage or '':<10} {job.message or ''}"
+    if job.error:
+        line += f" | {job.error}"
+    print(line)
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+    )
+
+    parser = argparse.ArgumentParser(description="Podcast job queue and workers")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run a worker pool until interrupted")
+    run.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    run.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+
+    submit = commands.add_parser("submit", help="Submit a job ('-' reads stdin)")
+    submit.add_argument("input_file")
+    submit.add_argument("--voices", nargs="+", required=True)
+    submit.add_argument("--text-model", default="gemini-3-pro-preview")
+    submit.add_argument("--tts-model", default="gemini-2.5-flash-preview-tts")
+    submit.add_argument("--temperature", type=float, default=0.7)
+    submit.add_argument("--format", default="wav", choices=list(EXPORT_FORMATS))
+    submit.add_argument("--max-cost", type=float, default=None)
+    submit.add_argument("--wait", action="store_true", help="Follow progress until done")
+
+    status = commands.add_parser("status", help="Show a job, or recent jobs")
+    status.add_argument("job_id", nargs="?")
+
+    retry = commands.add_parser("retry", help="Re-queue a failed job; it resumes from its checkpoints")
+    retry.add_argument("job_id")
+
+    args = parser.parse_args()
+    queue = JobQueue(args.db)
+
+    if args.command == "run":
+        pool = WorkerPool(args.workers, args.db, args.output_dir).start()
+        print(f"👷 {args.workers} workers polling {args.db} (Ctrl-C to stop)")
+        try:
+            while pool.alive():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool.stop()
+
+    elif args.command == "submit":
+        if args.input_file == "-":
+            input_text = sys.stdin.read()
+        else:
+            with open(args.input_file, encoding="utf-8") as f:
+                input_text = f.read()
+
+        job_id = queue.submit(
+            job_params(
+                input_text,
+                args.voices,
+                text_model=args.text_model,
+                tts_model=args.tts_model,
+                temperature=args.temperature,
+                output_format=args.format,
+                max_cost_usd=args.max_cost,
+            )
+        )
+        print(job_id)
+        if args.wait:
+            for job in queue.watch(job_id):
+                _print_job(job)
+            if job.result:
+                print(f"📁 {job.result['output_file']}")
+
+    elif args.command == "retry":
+        if queue.retry(args.job_id):
+            print(f"🔁 Re-queued {args.job_id}")
+        else:
+            print(f"❌ {args.job_id} is not a failed job")
+
+    elif args.command == "status":
+        jobs = [queue.get(args.job_id)] if args.job_id else queue.list_jobs()
+        for job in jobs:
+            if job is None:
+                print(f"❌ Unknown job {args.job_id}")
+                continue
+            _print_job(job)
+
+
+if __name__ == "__main__":
+    main()
@@ -347,15 +347,17 @@
 #         st.markdown(f"**{turn.speaker}:** {turn.text}")
 
 
-import asyncio
+import atexit
 import os
 import streamlit as st
 from typing import Dict
 
 from schemas.podcast import PodcastScript
-from prompts.podcast import podcast_system_instruction
-from core.gemini_client import run_gemini_agent, build_speaker_voice_mapping
-from audio.google_tts import MultiSpeakerTTS
+from audio.export import EXPORT_FORMATS, available_formats
+from audio.voice_bundle import VoiceBundle, load_voice_bundle
+from services.ingest import ingest_stream, normalize_text, supported_extensions
+from services.job_queue import FAILED, SUCCEEDED, Job, JobQueue
+from services.worker import WorkerPool, job_key, job_params
 
 # ------------------------------------------------------------------
 # Constants
@@ -383,29 +385,91 @@ AVAILABLE_VOICES = [
 ]
 
 
+# Set to 0 when a standalone pool (python -m services.worker run) is used
+EMBEDDED_WORKERS = int(os.getenv("PODCAST_EMBEDDED_WORKERS", "2"))
+
+# Larger audio isn't read into the page; the download reads it on click
+INLINE_AUDIO_MAX_BYTES = int(float(os.getenv("PODCAST_INLINE_AUDIO_MAX_MB", "64")) * 1024 * 1024)
+
+# Rendered episodes kept in memory for reruns and other sessions
+AUDIO_CACHE_ENTRIES = int(os.getenv("PODCAST_AUDIO_CACHE_ENTRIES", "8"))
+
+# Seconds between refreshes of a running job's progress
+PROGRESS_INTERVAL = float(os.getenv("PODCAST_PROGRESS_INTERVAL", "1.0"))
+
 # ------------------------------------------------------------------
-# Async Script Generator Wrapper
+# Background Jobs
 # ------------------------------------------------------------------
 
-async def generate_script_async(
-    input_text: str,
-    speaker_voices:list[str],
-    num_speakers: int,
-    model: str,
-    temperature: float,
-) -> PodcastScript | None:
-    return await run_gemini_agent(
-        instruction=podcast_system_instruction(num_speakers,speaker_voices),
-        user_input=input_text,
-        output_type=PodcastScript,
-        model=model,
-        temperature=temperature,
-        retries=2,
-    )
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    return JobQueue()
+
+
+@st.cache_resource
+def get_worker_pool() -> WorkerPool | None:
+    # One pool per server process, shared by every browser session
+    if EMBEDDED_WORKERS <= 0:
+        return None
+    pool = WorkerPool(num_workers=EMBEDDED_WORKERS).start()
+    atexit.register(pool.stop)
+    return pool
+
+
+@st.cache_resource(max_entries=AUDIO_CACHE_ENTRIES)
+def load_audio(path: str) -> bytes | None:
+    # A job's output never changes once written, so every session
+    # showing the job shares one copy; None if too large to inline
+    if os.path.getsize(path) > INLINE_AUDIO_MAX_BYTES:
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def voiced_turns(job: Job) -> int:
+    """
+    Number of leading script turns whose audio is rendered. Segments
+    finish out of order; only the unbroken run from the start counts.
+    """
+    segments = (job.partial or {}).get("segments", {})
+    turns = 0
+    index = 0
+    while str(index) in segments:
+        turns += segments[str(index)]
+        index += 1
+    return turns
+
+
+@st.fragment(run_every=PROGRESS_INTERVAL)
+def show_job_progress(job_id: str) -> None:
+    # Reruns on its own timer, so the rest of the page stays interactive
+    # while the job runs in a worker process
+    job = get_job_queue().get(job_id)
+    if job is None or job.finished:
+        # The full page shows the outcome
+        st.rerun()
+
+    st.progress(min(job.progress, 1.0))
+    st.info(f"⏳ {job.status.capitalize()}: {job.message or job.stage or 'waiting for a worker'}")
+
+    script = (job.partial or {}).get("script")
+    if script:
+        # Transcript grows as its audio is rendered
+        st.markdown(f"### {script['title']}")
+        voiced = voiced_turns(job)
+        for turn in script["dialogue"][:voiced]:
+            st.markdown(f"**{turn['speaker']}:** {turn['text']}")
+        if voiced < len(script["dialogue"]):
+            st.caption(f"🎙️ {len(script['dialogue']) - voiced} more turns being voiced…")
 
+# ------------------------------------------------------------------
+# Voice Previews
+# ------------------------------------------------------------------
 
-def generate_script(*args, **kwargs):
-    return asyncio.run(generate_script_async(*args, **kwargs))
+@st.cache_resource
+def get_voice_bundle() -> VoiceBundle:
+    # Packed once per process; reruns serve previews from memory
+    return load_voice_bundle(VOICE_SAMPLE_DIR)
 
 # ------------------------------------------------------------------
 # Streamlit Page Config
@@ -443,10 +507,24 @@ with st.sidebar:
     num_speakers = 2  # Fixed number of speakers
     temperature = st.slider("Creativity", 0.0, 1.0, 0.7)
 
+    audio_format = st.selectbox(
+        "Audio Format",
+        available_formats(),
+        format_func=lambda f: f.upper(),
+    )
+
+    tts_budget = st.number_input(
+        "Max TTS cost per episode (USD)",
+        min_value=0.0,
+        value=1.0,
+        step=0.25,
+    )
+
     st.divider()
     st.header("🔊 Voice Selection")
 
     selected_voices = []
+    voice_bundle = get_voice_bundle()
 
     for i in range(num_speakers):
         voice = st.selectbox(
@@ -458,11 +536,9 @@ with st.sidebar:
         selected_voices.append(voice)
 
         # 🔊 Voice sample preview
-        sample_path = os.path.join(VOICE_SAMPLE_DIR, f"{voice}.wav")
-        print(sample_path)
-        if os.path.exists(sample_path):
-            with open(sample_path, "rb") as f:
-                st.audio(f.read(), format="audio/wav")
+        preview = voice_bundle.preview(voice)
+        if preview is not None:
+            st.audio(preview, format=voice_bundle.mime)
         else:
             st.caption("⚠️ Sample not found")
 
@@ -472,62 +548,99 @@ with st.sidebar:
 
 st.subheader("📄 Input Content")
 
+uploaded = st.file_uploader(
+    "Upload a document (PDF, HTML, Markdown or text)",
+    type=[extension.lstrip(".") for extension in supported_extensions()],
+)
+
+# Extract once per upload; the cleaned text fills the text area for editing
+if uploaded is not None and st.session_state.get("ingested_file") != uploaded.file_id:
+    try:
+        with st.spinner("Extracting text..."):
+            document = ingest_stream(uploaded, uploaded.name)
+        st.session_state.input_text = document.text
+        st.session_state.ingest_summary = (
+            f"{document.pages} pages, {document.raw_chars:,} → {document.chars:,} characters"
+        )
+    except Exception as e:
+        st.error(f"Could not read {uploaded.name}: {e}")
+        st.session_state.pop("ingest_summary", None)
+    st.session_state.ingested_file = uploaded.file_id
+
+if uploaded is not None and "ingest_summary" in st.session_state:
+    st.caption(f"Extracted from {uploaded.name}: {st.session_state.ingest_summary}")
+
 input_text = st.text_area(
     "Paste article, paper, or notes here",
     height=280,
+    key="input_text",
 )
 
 # ------------------------------------------------------------------
-# Generate Script + Audio
+# Generate Script + Audio (background job)
 # ------------------------------------------------------------------
 
+job_queue = get_job_queue()
+get_worker_pool()
+
+# Re-attach to a job started before a reload
+if "job_id" not in st.session_state and "job" in st.query_params:
+    st.session_state.job_id = st.query_params["job"]
+
 if st.button("🚀 Generate Podcast Audio"):
     if not input_text.strip():
         st.error("Please provide input text")
     else:
-        with st.spinner("🧠 Generating podcast script…"):
-            script = generate_script(
-                input_text=input_text,
-                speaker_voices=selected_voices,
-                num_speakers=num_speakers,
-                model=text_model,
-                temperature=temperature,
-            )
-
-        if script is None:
-            st.error("Script generation failed")
-        else:
-            st.session_state.script = script
-
-            # speaker_voice_map = {
-            #     speaker.name: selected_voices[i]
-            #     for i, speaker in enumerate(script.speakers)
-            # }
-            speaker_voice_map = build_speaker_voice_mapping(script)
-            with st.spinner("🔊 Generating multi-speaker audio…"):
-                tts = MultiSpeakerTTS()
-
-                dialogue_text = "\n".join(
-                    f"{turn.speaker}: {turn.text}"
-                    for turn in script.dialogue
-                )
-
-                final_prompt = (
-                    f"TTS the following conversation between "
-                    f"{', '.join(speaker_voice_map.keys())}:\n{dialogue_text}"
-                )
-
-                output_file = "podcast_output.wav"
-
-                tts.generate_tts(
-                    dialogue=final_prompt,
-                    speaker_voice_map=speaker_voice_map,
-                    tts_model=tts_model,
-                    output_file=output_file,
-                )
-
-            st.session_state.audio_file = output_file
-            st.success("🎉 Podcast audio generated")
+        params = job_params(
+            # Pasted PDF text loses its hyphenation breaks and hard wraps
+            input_text=normalize_text(input_text),
+            speaker_voices=selected_voices,
+            text_model=text_model,
+            tts_model=tts_model,
+            temperature=temperature,
+            output_format=audio_format,
+            max_cost_usd=tts_budget,
+        )
+        # Identical settings and input reuse the job (and its script and
+        # audio) another rerun or session already started
+        st.session_state.job_id = job_queue.submit(params, dedupe_key=job_key(params))
+        st.query_params["job"] = st.session_state.job_id
+        st.session_state.pop("audio_file", None)
+        st.session_state.pop("script", None)
+
+if "job_id" in st.session_state and "audio_file" not in st.session_state:
+    job_id = st.session_state.job_id
+    job = job_queue.get(job_id)
+    status = st.empty()
+
+    if job is None:
+        status.error(f"Unknown job {job_id}")
+        del st.session_state.job_id
+        st.query_params.pop("job", None)
+    elif not job.finished:
+        show_job_progress(job_id)
+    elif job.status == SUCCEEDED and not os.path.exists(job.result["output_file"]):
+        # Shared job whose audio has since been removed; render it again
+        job_queue.unshare(job.id)
+        st.session_state.job_id = job_queue.submit(job.params, dedupe_key=job_key(job.params))
+        st.query_params["job"] = st.session_state.job_id
+        st.rerun()
+    elif job.status == SUCCEEDED:
+        st.session_state.script = PodcastScript(**job.result["script"])
+        st.session_state.audio_file = job.result["output_file"]
+        st.session_state.audio_format = job.result["output_format"]
+        status.success(
+            f"🎉 Podcast audio generated "
+            f"({job.result.get('duration_seconds', 0) / 60:.1f} min)"
+        )
+    elif job.status == FAILED:
+        status.error(f"Generation failed: {job.error}")
+        # Same job id: resumes from the saved script and rendered segments
+        if st.button("🔁 Retry"):
+            job_queue.retry(job_id)
+            st.rerun()
+    else:
+        status.warning(f"Job {job.status}")
 
 # ------------------------------------------------------------------
 # OUTPUT – Audio FIRST, then Script
@@ -536,13 +649,26 @@ if st.button("🚀 Generate Podcast Audio"):
 if "audio_file" in st.session_state:
     st.subheader("▶️ Podcast Audio")
 
-    with open(st.session_state.audio_file, "rb") as f:
-        st.audio(f.read(), format="audio/wav")
-        st.download_button(
-            "⬇️ Download WAV",
-            f,
-            file_name="podcast.wav",
-        )
+    spec = EXPORT_FORMATS[st.session_state.get("audio_format", "wav")]
+    audio_file = st.session_state.audio_file
+
+    audio_data = load_audio(audio_file)
+    if audio_data is not None:
+        # Player and download share the cached bytes
+        st.audio(audio_data, format=spec["mime"])
+    else:
+        st.audio(audio_file, format=spec["mime"])
+
+        def audio_data() -> bytes:
+            with open(audio_file, "rb") as f:
+                return f.read()
+
+    st.download_button(
+        f"⬇️ Download {st.session_state.get('audio_format', 'wav').upper()}",
+        audio_data,
+        file_name=f"podcast{spec['extension']}",
+        mime=spec["mime"],
+    )
 
 if "script" in st.session_state:
     script: PodcastScript = st.session_state.script
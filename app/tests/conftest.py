@@ -0,0 +1,21 @@
+"""
+Shared test setup: import modules from app/ and keep every test offline.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+os.environ["PODCAST_TTS_BACKEND"] = "synthetic"
+os.environ["PODCAST_WARM_CLIENTS"] = "0"
+
+# Module-level defaults (caches, checkpoints, run history) point here
+# rather than at .cache/ under the working directory
+SCRATCH_DIR = tempfile.mkdtemp(prefix="podcast-tests-")
+os.environ["TTS_CACHE_DIR"] = os.path.join(SCRATCH_DIR, "tts_segments")
+os.environ["TTS_HISTORY_PATH"] = os.path.join(SCRATCH_DIR, "tts_history.jsonl")
+os.environ["PODCAST_CHECKPOINT_DIR"] = os.path.join(SCRATCH_DIR, "checkpoints")
+os.environ["PODCAST_OUTPUT_DIR"] = os.path.join(SCRATCH_DIR, "podcasts")
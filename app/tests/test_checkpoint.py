@@ -0,0 +1,124 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from audio.synthetic_tts import SyntheticMultiSpeakerTTS
+from schemas.podcast import DialogueTurn, PodcastScript, Speaker
+from services.audio_service import AudioPipeline, EpisodeRequest
+from services.checkpoint import CheckpointStore
+
+SCRIPT = PodcastScript(
+    title="Checkpoints",
+    description="Resuming interrupted episodes",
+    speakers=[Speaker(name="Alex", voice_id="kore"), Speaker(name="Jamie", voice_id="puck")],
+    dialogue=[
+        DialogueTurn(speaker="Alex" if index % 2 == 0 else "Jamie", text=f"This is turn number {index}.")
+        for index in range(6)
+    ],
+)
+
+
+class FlakyTTS(SyntheticMultiSpeakerTTS):
+    """
+    Synthetic TTS that fails every call after the first fail_after ones.
+    """
+
+    def __init__(self, fail_after=None):
+        super().__init__()
+        self.fail_after = fail_after
+
+    async def asynthesize_pcm(self, dialogue, speaker_voice_map, tts_model):
+        if self.fail_after is not None and self.calls >= self.fail_after:
+            raise RuntimeError("connection reset")
+        return await super().asynthesize_pcm(dialogue, speaker_voice_map, tts_model)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(str(tmp_path / "checkpoints"))
+
+
+def run(store, tts, output_file, events=None):
+    scripts = []
+
+    async def script_generator(request):
+        scripts.append(request.episode_id)
+        return SCRIPT
+
+    pipeline = AudioPipeline(
+        tts=tts,
+        script_generator=script_generator,
+        turns_per_segment=2,
+        concurrency={"synthesize": 1},
+        checkpoints=store,
+        on_event=lambda episode_id, event, data: events.append((event, data)) if events is not None else None,
+    )
+    (result,) = asyncio.run(pipeline.run([EpisodeRequest("ep", output_file, "notes", ["kore", "puck"])]))
+    return result, scripts
+
+
+def test_segments_round_trip(store):
+    turns = [("Alex", "Hello"), ("Jamie", "Hi")]
+    assert store.load_segment("ep", 0, turns) is None
+    store.save_segment("ep", 0, turns, b"\x01\x02")
+    assert store.load_segment("ep", 0, turns) == b"\x01\x02"
+    # Edited turns do not match the old checkpoint
+    assert store.load_segment("ep", 0, [("Alex", "Hello there")]) is None
+    assert store.completed_segments("ep") == [0]
+
+
+def test_final_needs_output_file(store, tmp_path):
+    output = tmp_path / "ep.wav"
+    store.save_segment("ep", 0, [("Alex", "Hello")], b"pcm")
+    store.save_final("ep", str(output), {"segments": 1})
+    assert store.completed_segments("ep") == []
+    assert store.load_final("ep") is None
+    output.write_bytes(b"RIFF")
+    assert store.load_final("ep")["segments"] == 1
+
+
+def test_resume_after_failed_synthesis(store, tmp_path):
+    output = str(tmp_path / "ep.wav")
+
+    result, scripts = run(store, FlakyTTS(fail_after=1), output)
+    assert not result.ok
+    assert store.completed_segments("ep") == [0]
+
+    tts = FlakyTTS()
+    events = []
+    result, scripts = run(store, tts, output, events)
+    assert result.ok
+    assert os.path.exists(output)
+    # Script and first segment came from the checkpoint
+    assert scripts == []
+    assert result.segments > 1
+    assert tts.calls == result.segments - 1
+    assert ("resumed", {"stage": "synthesize", "segments": 1}) in events
+
+
+def test_resume_finished_episode(store, tmp_path):
+    output = str(tmp_path / "ep.wav")
+    result, _ = run(store, FlakyTTS(), output)
+    assert result.ok
+
+    tts = FlakyTTS()
+    events = []
+    result, scripts = run(store, tts, output, events)
+    assert scripts == []
+    assert tts.calls == 0
+    assert ("resumed", {"stage": "done"}) in events
+
+
+def test_prune_removes_only_stale_episodes(store):
+    for episode_id in ("old", "kept", "new"):
+        store.save_segment(episode_id, 0, [("Alex", "Hello")], b"pcm")
+    long_ago = time.time() - 30 * 24 * 3600
+    for episode_id in ("old", "kept"):
+        for directory, _, names in os.walk(store._episode_dir(episode_id)):
+            for path in [directory, *(os.path.join(directory, name) for name in names)]:
+                os.utime(path, (long_ago, long_ago))
+
+    assert store.prune(max_age=24 * 3600, keep=["kept"]) == ["old"]
+    assert sorted(os.listdir(store.root)) == ["kept", "new"]
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from audio.estimator import TTSEstimator
+from audio.synthetic_tts import SyntheticMultiSpeakerTTS
+
+VOICES = {"Alex": "kore", "Jamie": "puck"}
+DIALOGUE = "\n".join(
+    f"{'Alex' if index % 2 == 0 else 'Jamie'}: This is turn number {index}."
+    for index in range(12)
+)
+
+
+@pytest.mark.parametrize("agenerate", [False, True])
+@pytest.mark.parametrize("spill_threshold, segmented", [(None, False), (0, True)])
+def test_generate_tts_spills_large_episodes(tmp_path, agenerate, spill_threshold, segmented):
+    tts = SyntheticMultiSpeakerTTS()
+    output_file = str(tmp_path / "out.wav")
+    if agenerate:
+        result = asyncio.run(
+            tts.agenerate_tts(DIALOGUE, VOICES, output_file=output_file, spill_threshold=spill_threshold)
+        )
+    else:
+        result = tts.generate_tts(DIALOGUE, VOICES, output_file=output_file, spill_threshold=spill_threshold)
+
+    assert result["output_file"] == output_file
+    assert ("segments" in result) == segmented
+    assert tts.calls == result.get("segments", 1)
+    with open(output_file, "rb") as f:
+        assert f.read(4) == b"RIFF"
+
+
+class TruncatingTTS(SyntheticMultiSpeakerTTS):
+    """
+    Synthetic TTS whose first render stops a third of the way through.
+    """
+
+    def _render(self, dialogue, speaker_voice_map):
+        pcm, usage = super()._render(dialogue, speaker_voice_map)
+        if self.calls == 1:
+            pcm = pcm[: len(pcm) // 3 // 2 * 2]
+        return pcm, usage
+
+
+@pytest.mark.parametrize("arepair", [False, True])
+def test_repair_truncated_rerenders_missing_tail(arepair):
+    tts = TruncatingTTS()
+    turns = tts.parse_dialogue_prompt(DIALOGUE, list(VOICES))
+    estimator = TTSEstimator(default_seconds_per_char=1 / 15)
+    pcm, usage = tts.synthesize_pcm(DIALOGUE, VOICES, "model")
+    args = (pcm, usage, turns, VOICES, "model", estimator)
+    if arepair:
+        repaired, repaired_usage = asyncio.run(tts.arepair_truncated(*args))
+    else:
+        repaired, repaired_usage = tts.repair_truncated(*args)
+
+    assert tts.calls == 2
+    assert 0 < repaired_usage["repaired_turns"] <= len(turns)
+    assert repaired_usage["total_tokens"] > usage["total_tokens"]
+    assert len(repaired) > 2 * len(pcm)
@@ -0,0 +1,172 @@
+import json
+import os
+import shutil
+import tempfile
+
+import pytest
+from tornado.testing import AsyncHTTPTestCase
+
+from audio.tts_cache import TTSSegmentCache
+from services.checkpoint import CheckpointStore
+from services.http_service import (
+    MAX_INPUT_CHARS,
+    PodcastService,
+    make_app,
+    parse_job_id,
+    parse_job_request,
+)
+from services.job_queue import SUCCEEDED
+
+SCRIPT = {
+    "title": "T",
+    "description": "D",
+    "speakers": [{"name": "Alex", "voice_id": "kore"}, {"name": "Jamie", "voice_id": "puck"}],
+    "dialogue": [{"speaker": "Alex", "text": "Hi"}, {"speaker": "Jamie", "text": "Hello"}],
+}
+
+
+def test_parse_job_request_defaults():
+    params = parse_job_request({"input_text": "Some notes", "speaker_voices": ["kore", "puck"]})
+    assert params["input_text"] == "Some notes"
+    assert params["speaker_voices"] == ["kore", "puck"]
+    assert params["output_format"] == "wav"
+    assert params["temperature"] == 0.7
+    assert params["max_cost_usd"] is None
+    assert "script" not in params
+
+
+def test_parse_job_request_numbers():
+    params = parse_job_request(
+        {"input_text": "notes", "speaker_voices": ["kore"], "temperature": 1, "max_cost_usd": 0.5}
+    )
+    assert params["temperature"] == 1.0
+    assert params["max_cost_usd"] == 0.5
+
+
+def test_parse_job_request_accepts_script_without_text():
+    params = parse_job_request({"script": SCRIPT})
+    assert params["script"]["dialogue"][1]["text"] == "Hello"
+
+
+@pytest.mark.parametrize(
+    "body, message",
+    [
+        ([], "JSON object"),
+        ("notes", "JSON object"),
+        ({}, "input_text or script"),
+        ({"input_text": "   ", "speaker_voices": ["kore"]}, "input_text or script"),
+        ({"input_text": 5, "speaker_voices": ["kore"]}, "input_text must be a string"),
+        ({"input_text": "x" * (MAX_INPUT_CHARS + 1), "speaker_voices": ["kore"]}, "longer than"),
+        ({"input_text": "notes"}, "speaker_voices"),
+        ({"input_text": "notes", "speaker_voices": "kore"}, "speaker_voices"),
+        ({"input_text": "notes", "speaker_voices": ["kore", 3]}, "speaker_voices"),
+        ({"input_text": "notes", "speaker_voices": ["kore"], "output_format": "aiff"}, "output_format"),
+        ({"input_text": "notes", "speaker_voices": ["kore"], "temperature": "hot"}, "temperature"),
+        ({"input_text": "notes", "speaker_voices": ["kore"], "temperature": [1]}, "temperature"),
+        ({"input_text": "notes", "speaker_voices": ["kore"], "tts_model": ["a"]}, "tts_model"),
+        ({"input_text": "notes", "speaker_voices": ["kore"], "text_model": 3}, "text_model"),
+        ({"input_text": "notes", "speaker_voices": ["kore"], "tts_model": ""}, "tts_model"),
+        ({"input_text": "notes", "speaker_voices": ["kore"], "max_cost_usd": "cheap"}, "max_cost_usd"),
+        ({"input_text": "notes", "speaker_voices": ["kore"], "max_cost_usd": True}, "max_cost_usd"),
+        ({"input_text": "notes", "speaker_voices": ["kore"], "max_cost_usd": -1}, "max_cost_usd"),
+    ],
+)
+def test_parse_job_request_rejects(body, message):
+    with pytest.raises(ValueError, match=message):
+        parse_job_request(body)
+
+
+def test_parse_job_id():
+    assert parse_job_id({}) is None
+    assert parse_job_id({"job_id": "episode_01-b"}) == "episode_01-b"
+
+
+@pytest.mark.parametrize("job_id", ["", "../escaped", "a/b", "a b", "x" * 129, 5, ["a"]])
+def test_parse_job_id_rejects(job_id):
+    with pytest.raises(ValueError, match="job_id"):
+        parse_job_id({"job_id": job_id})
+
+
+class ServiceTest(AsyncHTTPTestCase):
+    """
+    The API end to end on the synthetic TTS backend.
+    """
+
+    def get_app(self):
+        self.scratch = tempfile.mkdtemp()
+        self.service = PodcastService(
+            output_dir=os.path.join(self.scratch, "podcasts"),
+            checkpoints=CheckpointStore(os.path.join(self.scratch, "checkpoints")),
+            cache=TTSSegmentCache(os.path.join(self.scratch, "tts_segments")),
+        )
+        return make_app(self.service)
+
+    def tearDown(self):
+        self.io_loop.run_sync(self.service.close)
+        super().tearDown()
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+    def submit(self, job_id, **fields):
+        body = {"script": SCRIPT, "job_id": job_id, **fields}
+        return self.fetch("/jobs", method="POST", body=json.dumps(body))
+
+    def events(self, job_id, last_event_id=None):
+        headers = {} if last_event_id is None else {"Last-Event-ID": str(last_event_id)}
+        response = self.fetch(f"/jobs/{job_id}/events", headers=headers)
+        assert response.code == 200
+        events = []
+        for block in response.body.decode("utf-8").split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+            if fields:
+                events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+        return events
+
+    def test_job_streams_events_and_serves_audio(self):
+        response = self.submit("ep-1")
+        assert response.code == 202
+        assert response.headers["Location"] == "/jobs/ep-1"
+
+        # The stream ends once the job has finished
+        events = self.events("ep-1")
+        names = [name for _, name, _ in events]
+        assert names[0] == "status"
+        assert "script" in names and "transcript" in names
+        assert names[-1] == "succeeded"
+        assert [event_id for event_id, _, _ in events] == list(range(len(events)))
+
+        # Reconnecting replays only what came after Last-Event-ID
+        replay = self.events("ep-1", last_event_id=events[2][0])
+        assert replay == events[3:]
+
+        status = json.loads(self.fetch("/jobs/ep-1").body)
+        assert status["status"] == SUCCEEDED
+
+        audio = self.fetch("/jobs/ep-1/audio", headers={"Range": "bytes=0-99"})
+        assert audio.code == 206
+        assert audio.body[:4] == b"RIFF"
+        assert len(audio.body) == 100
+        assert audio.headers["Content-Range"].startswith("bytes 0-99/")
+
+    def test_jobs_share_one_loop(self):
+        job_ids = [f"ep-{index}" for index in range(3)]
+        for job_id in job_ids:
+            assert self.submit(job_id).code == 202
+        for job_id in job_ids:
+            assert self.events(job_id)[-1][1] == "succeeded"
+        assert len(self.service.pipelines) == 1
+
+    def test_bad_request_is_not_tracked(self):
+        response = self.submit("ep-bad", tts_model=["a"])
+        assert response.code == 400
+        assert "ep-bad" not in self.service.jobs
+        assert self.fetch("/jobs/ep-bad").code == 404
+        assert self.submit("ep-bad").code == 202
+
+    def test_submit_failure_leaves_no_job(self):
+        params = {**parse_job_request({"script": SCRIPT}), "tts_model": ["a"]}
+        with pytest.raises(TypeError):
+            self.service.submit(params, job_id="ep-broken")
+        assert "ep-broken" not in self.service.jobs
+
+    def test_audio_of_unknown_or_running_job(self):
+        assert self.fetch("/jobs/nope/audio").code == 404
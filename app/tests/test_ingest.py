@@ -0,0 +1,97 @@
+import io
+
+import pytest
+
+from services.ingest import TextNormalizer, ingest_file, ingest_stream, normalize_text, strip_markdown
+
+LONG_LINE = "This paragraph is long enough to look like wrapped text in a PDF page"
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        # Digit-only lines are content outside extracted pages
+        ("The year was\n2024\nand it rained.", "The year was 2024 and it rained."),
+        ("Page 3\nof the novel.", "Page 3 of the novel."),
+        ("First line\ncontinues here.\n\nSecond paragraph.", "First line continues here.\n\nSecond paragraph."),
+        ("Items:\n- one\n- two\n1. three", "Items:\n- one\n- two\n1. three"),
+        ("The infor-\nmation step.", "The information step."),
+        # A hyphen seen elsewhere in the text is kept across the line break
+        ("We study re-ranking. The re-\nranking step.", "We study re-ranking. The re-ranking step."),
+        ("The ﬁle is co­operative.", "The file is cooperative."),
+        ("Windows\r\nline ends.", "Windows line ends."),
+        ("", ""),
+    ],
+)
+def test_normalize_text(text, expected):
+    assert normalize_text(text) == expected
+
+
+def test_normalize_text_keeps_references():
+    text = "Body text.\n\nReferences\n\n[1] A paper."
+    assert "[1] A paper." in normalize_text(text)
+
+
+def test_pdf_pages_drop_furniture_and_join_paragraphs():
+    normalizer = TextNormalizer(detect_headers=True)
+    first = normalizer.feed(
+        "Journal of Tests 12\n"
+        "arXiv:2401.01234v2 [cs.CL] 1 Jan 2024\n"
+        f"{LONG_LINE}\n"
+        "and it carries over to the next page without a full\n"
+        "3",
+        0.0,
+    )
+    second = normalizer.feed(
+        "Journal of Tests 13\n"
+        "stop, which is joined back onto the text of the previous page.\n"
+        "4",
+        0.4,
+    )
+    # The running header is only recognised once it repeats
+    assert first == "Journal of Tests 12"
+    assert second == (
+        f"{LONG_LINE} and it carries over to the next page without a full "
+        "stop, which is joined back onto the text of the previous page."
+    )
+    assert normalizer.flush() == ""
+
+
+def test_references_cut_only_late_in_document():
+    early = TextNormalizer(detect_headers=True)
+    assert "Cited work." in early.feed("Intro.\nReferences\nCited work.", 0.2)
+    assert not early.finished
+
+    late = TextNormalizer(detect_headers=True)
+    assert late.feed("Conclusion.\nReferences\n[1] Cited work.", 0.8) == "Conclusion."
+    assert late.finished
+    assert late.feed("More text.", 0.9) == ""
+
+
+def test_strip_markdown():
+    assert strip_markdown("## A [link](http://x) and **bold** `code`") == "\nA link and bold code\n"
+    assert strip_markdown("| a | b |") == "a b"
+    assert strip_markdown("|---|---|") == ""
+    assert strip_markdown("[ref]: http://example.com") == ""
+
+
+def test_ingest_file_caches_markdown(tmp_path):
+    path = tmp_path / "notes.md"
+    path.write_text("# Title\n\nSome *notes*\nwrapped here.\n\n```\ncode fence\n```\n", encoding="utf-8")
+    cache_dir = str(tmp_path / "cache")
+
+    document = ingest_file(str(path), cache_dir)
+    assert document.kind == "markdown"
+    assert document.text == "Title\n\nSome notes wrapped here.\n\ncode fence"
+    assert not document.cached
+
+    again = ingest_file(str(path), cache_dir)
+    assert again.cached
+    assert again.text == document.text
+
+
+def test_ingest_stream_uses_name_for_kind(tmp_path):
+    document = ingest_stream(io.BytesIO(b"<p>Hello <b>there</b></p><script>x()</script>"), "page.html", str(tmp_path))
+    assert document.kind == "html"
+    assert document.source == "page.html"
+    assert document.text == "Hello there"
@@ -0,0 +1,115 @@
+import pytest
+
+from services.job_queue import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_submit_dedupes_on_key(queue):
+    first = queue.submit({"input_text": "a"}, dedupe_key="k")
+    assert queue.submit({"input_text": "a"}, dedupe_key="k") == first
+    assert queue.submit({"input_text": "b"}, dedupe_key="other") != first
+    assert queue.submit({"input_text": "a"}) != first
+
+
+def test_submit_does_not_share_failed_jobs(queue):
+    first = queue.submit({}, dedupe_key="k")
+    queue.claim("w")
+    queue.fail(first, "boom", "w")
+    assert queue.submit({}, dedupe_key="k") != first
+
+
+def test_unshare_stops_dedupe(queue):
+    first = queue.submit({}, dedupe_key="k")
+    queue.unshare(first)
+    assert queue.submit({}, dedupe_key="k") != first
+
+
+def test_claim_takes_oldest_queued_job_once(queue):
+    first = queue.submit({"n": 1})
+    second = queue.submit({"n": 2})
+
+    job = queue.claim("w1")
+    assert job.id == first
+    assert job.status == RUNNING
+    assert job.worker == "w1"
+    assert job.attempts == 1
+    assert queue.claim("w2").id == second
+    assert queue.claim("w3") is None
+
+
+def test_complete_stores_result(queue):
+    job_id = queue.submit({})
+    queue.claim("w")
+    assert queue.complete(job_id, {"output_file": "x.wav"}, "w")
+    job = queue.get(job_id)
+    assert job.status == SUCCEEDED
+    assert job.result == {"output_file": "x.wav"}
+    assert job.finished
+
+
+def test_requeue_stale_requeues_then_fails(queue):
+    job_id = queue.submit({})
+    failed = []
+
+    for attempt in range(1, 3):
+        assert queue.claim("w").attempts == attempt
+        assert queue.requeue_stale(stale_after=0, max_attempts=3, on_failed=failed.append) == 1
+        assert queue.get(job_id).status == QUEUED
+
+    queue.claim("w")
+    assert queue.requeue_stale(stale_after=0, max_attempts=3, on_failed=failed.append) == 1
+    job = queue.get(job_id)
+    assert job.status == FAILED
+    assert job.attempts == 3
+    assert failed == [job_id]
+
+
+def test_lost_worker_cannot_update_job(queue):
+    job_id = queue.submit({})
+    queue.claim("w1")
+    queue.requeue_stale(stale_after=0)
+    queue.claim("w2")
+
+    assert not queue.heartbeat(job_id, "w1")
+    assert not queue.update_progress(job_id, 0.5, "writing", "late", worker_id="w1")
+    assert not queue.fail(job_id, "late", "w1")
+    assert queue.get(job_id).status == RUNNING
+
+    assert queue.heartbeat(job_id, "w2")
+    assert queue.complete(job_id, {"output_file": "x.wav"}, "w2")
+    assert not queue.fail(job_id, "late", "w2")
+    job = queue.get(job_id)
+    assert job.status == SUCCEEDED
+    assert job.error is None
+
+
+def test_requeue_stale_leaves_fresh_jobs(queue):
+    job_id = queue.submit({})
+    queue.claim("w")
+    assert queue.requeue_stale(stale_after=3600) == 0
+    assert queue.get(job_id).status == RUNNING
+
+
+def test_retry_requeues_only_failed_jobs(queue):
+    job_id = queue.submit({})
+    assert not queue.retry(job_id)
+
+    queue.claim("w")
+    queue.fail(job_id, "boom", "w")
+    assert queue.retry(job_id)
+    job = queue.get(job_id)
+    assert job.status == QUEUED
+    assert job.error is None
+    assert queue.claim("w").attempts == 2
+
+
+def test_cancel_only_queued_jobs(queue):
+    queued = queue.submit({})
+    running = queue.submit({})
+    assert queue.cancel(queued)
+    assert queue.claim("w").id == running
+    assert not queue.cancel(running)
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from services import near_duplicates
+from services.near_duplicates import NearDuplicateIndex
+
+
+def article(seed, words=400):
+    rng = np.random.default_rng(seed)
+    return " ".join(f"w{index}" for index in rng.integers(0, 5000, words))
+
+
+def edited(text):
+    words = text.split()
+    words[10:12] = ["syndicated", "copy"]
+    return "Republished from Example News. " + " ".join(words[:-5])
+
+
+@pytest.fixture
+def index():
+    return NearDuplicateIndex(threshold=0.8)
+
+
+def test_query_finds_edited_copy(index):
+    text = article(1)
+    index.add("original", index.signature(text), duration_seconds=60.0)
+    index.add("other", index.signature(article(2)))
+
+    match = index.query(index.signature(edited(text)))
+    assert match.doc_id == "original"
+    assert match.similarity >= 0.8
+    assert match.duration_seconds == 60.0
+    assert index.query(index.signature(article(3))) is None
+
+
+def test_query_can_exclude_itself(index):
+    signature = index.signature(article(1))
+    index.add("doc", signature)
+    assert index.query(signature).doc_id == "doc"
+    assert index.query(signature, exclude="doc") is None
+
+
+def test_short_text_has_no_signature(index):
+    assert index.signature("") is None
+    assert index.signature("Only four words here") is None
+    assert index.signature("Now there are five words") is not None
+
+
+def test_remove_and_replace(index):
+    text = article(1)
+    index.add("doc", index.signature(text))
+    assert "doc" in index and len(index) == 1
+
+    index.remove("doc")
+    assert "doc" not in index and len(index) == 0
+    assert index.query(index.signature(text)) is None
+
+    # Re-adding an id replaces its earlier entry
+    index.add("doc", index.signature(article(2)))
+    index.add("doc", index.signature(text))
+    assert len(index) == 1
+    assert index.query(index.signature(article(2))) is None
+    assert index.query(index.signature(text)).doc_id == "doc"
+
+
+def test_lookups_after_merge(index, monkeypatch):
+    monkeypatch.setattr(near_duplicates, "MERGE_EVERY", 8)
+    texts = [article(seed) for seed in range(20)]
+    for seed, text in enumerate(texts):
+        index.add(f"doc-{seed}", index.signature(text))
+    # Some entries are merged into the sorted keys, the rest still pending
+    assert 0 < index._merged < len(texts)
+    for seed, text in enumerate(texts):
+        assert index.query(index.signature(edited(text))).doc_id == f"doc-{seed}"
+
+
+def test_save_load_round_trip(index, tmp_path):
+    texts = {f"doc-{seed}": article(seed) for seed in range(5)}
+    for doc_id, text in texts.items():
+        index.add(doc_id, index.signature(text))
+    index.set_duration("doc-1", 42.0)
+    index.remove("doc-3")
+    index.save(str(tmp_path))
+
+    loaded = NearDuplicateIndex.load(str(tmp_path), threshold=0.8)
+    assert len(loaded) == 4
+    assert "doc-3" not in loaded
+    match = loaded.query(loaded.signature(edited(texts["doc-1"])))
+    assert match.doc_id == "doc-1"
+    assert match.duration_seconds == 42.0
+    assert loaded.query(loaded.signature(texts["doc-3"])) is None
+
+    # Loaded indexes keep accepting documents
+    loaded.add("doc-new", loaded.signature(article(9)))
+    assert loaded.query(loaded.signature(article(9))).doc_id == "doc-new"
+
+
+def test_load_missing_directory_is_empty(tmp_path):
+    index = NearDuplicateIndex.load(str(tmp_path / "missing"))
+    assert len(index) == 0
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from google.genai.errors import ClientError, ServerError
+
+from audio.providers import ProviderThrottled, SegmentAudio, TTSProvider, TTSScheduler, TTSSegment
+
+VOICES = {"Alex": "kore", "Jamie": "puck"}
+
+
+class FakeProvider(TTSProvider):
+    """
+    Renders instantly; raises the queued errors first, one per call.
+    """
+
+    def __init__(self, name, voices=("kore", "puck"), errors=(), max_concurrency=4, delay=0.0):
+        self.name = name
+        self.voices = set(voices)
+        self.errors = list(errors)
+        self.max_concurrency = max_concurrency
+        self.delay = delay
+        self.rendered = []
+
+    def supports(self, segment):
+        return segment.voices <= self.voices
+
+    async def render(self, segment):
+        await asyncio.sleep(self.delay)
+        if self.errors:
+            raise self.errors.pop(0)
+        self.rendered.append(segment.index)
+        return SegmentAudio(bytes(2 * segment.index), {}, self.name, self.delay, segment.index)
+
+
+def segment(index, voices=VOICES):
+    return TTSSegment([("Alex", f"Turn {index}")], voices, index=index)
+
+
+def throttled(name):
+    return ProviderThrottled(name, "429", retry_after=30.0)
+
+
+def test_throttled_provider_cools_down_and_segments_fail_over():
+    primary = FakeProvider("primary", errors=[throttled("primary")])
+    backup = FakeProvider("backup")
+    # primary is preferred on ties
+    scheduler = TTSScheduler([primary, backup])
+
+    async def run():
+        first = await scheduler.render(segment(0))
+        # Dispatched while primary is cooling down
+        rest = await scheduler.render_all([segment(index) for index in range(1, 4)])
+        return [first, *rest]
+
+    results = asyncio.run(run())
+
+    assert [audio.provider for audio in results] == ["backup"] * 4
+    assert primary.rendered == []
+    stats = scheduler.stats()
+    assert stats["primary"]["throttles"] == 1
+    assert stats["primary"]["cooling_down"]
+    assert stats["backup"]["completed"] == 4
+
+
+def test_throttled_only_provider_recovers_after_cooldown():
+    provider = FakeProvider("only", errors=[ProviderThrottled("only", "busy", retry_after=0.01)])
+    scheduler = TTSScheduler([provider])
+    assert asyncio.run(scheduler.render(segment(0))).provider == "only"
+    assert scheduler.stats()["only"]["throttles"] == 1
+
+
+def test_unsupported_voices_raise_at_once():
+    provider = FakeProvider("gemini")
+    scheduler = TTSScheduler([provider])
+    with pytest.raises(ValueError, match="No TTS provider"):
+        asyncio.run(scheduler.render(segment(0, {"Alex": "unknown"})))
+    assert provider.rendered == []
+
+
+def test_results_in_input_order():
+    fast = FakeProvider("fast", max_concurrency=2)
+    slow = FakeProvider("slow", max_concurrency=2, delay=0.02)
+    scheduler = TTSScheduler([slow, fast])
+    results = asyncio.run(scheduler.render_all([segment(index) for index in range(8)]))
+    assert [audio.index for audio in results] == list(range(8))
+    assert {audio.provider for audio in results} == {"fast", "slow"}
+
+
+def test_client_errors_are_not_retried():
+    error = ClientError(400, {"error": {"code": 400, "message": "bad voice", "status": "INVALID_ARGUMENT"}})
+    provider = FakeProvider("gemini", errors=[error, error])
+    scheduler = TTSScheduler([provider])
+    with pytest.raises(ClientError):
+        asyncio.run(scheduler.render(segment(0)))
+    assert scheduler.stats()["gemini"]["failures"] == 1
+
+
+def test_server_errors_are_retried_with_backoff():
+    error = ServerError(500, {"error": {"code": 500, "message": "internal", "status": "INTERNAL"}})
+    provider = FakeProvider("gemini", errors=[error, ConnectionResetError()])
+    scheduler = TTSScheduler([provider], retry_delay=0.01)
+    assert asyncio.run(scheduler.render(segment(0))).provider == "gemini"
+    assert scheduler.stats()["gemini"]["failures"] == 2
+
+
+def test_gives_up_after_max_attempts():
+    error = ServerError(500, {"error": {"code": 500, "message": "internal", "status": "INTERNAL"}})
+    provider = FakeProvider("gemini", errors=[error] * 3)
+    scheduler = TTSScheduler([provider], max_attempts=3, retry_delay=0.001)
+    with pytest.raises(RuntimeError, match="after 3 attempts"):
+        asyncio.run(scheduler.render(segment(0)))
@@ -18,7 +18,10 @@ Usage:
 from typing import Any, Dict
 from pydantic import BaseModel
 
+from core.tracing import traced
 
+
+@traced("schema.convert")
 def pydantic_to_gemini_schema(model: type[BaseModel]) -> Dict[str, Any]:
     """
     Convert a Pydantic model to Gemini's OpenAPI 3.0 Schema format.